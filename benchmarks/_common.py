@@ -0,0 +1,111 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The scripts are meant to be run from the repository root, for example:
+
+    python -m benchmarks.bench_query --sizes 10000 100000
+"""
+
+import random
+import resource
+import string
+import sys
+import time
+from urllib.parse import quote
+
+from src.string_factory import StringFactory
+
+ALPHABET = string.ascii_lowercase + "   "
+
+
+#################################################
+# @random_strings: builds a reproducible list   #
+# of distinct random strings                    #
+# returns: a list of strings                    #
+#################################################
+def random_strings(count: int, min_length: int = 1, max_length: int = 40, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    seen = set()
+    values = []
+    while len(values) < count:
+        length = rng.randint(min_length, max_length)
+        value = "".join(rng.choice(ALPHABET) for _ in range(length)).strip()
+        if value and value not in seen:
+            seen.add(value)
+            values.append(value)
+    return values
+
+
+#################################################
+# @make_record: builds the stored record for a  #
+# value without touching the global store       #
+# returns: a (digest, record) tuple             #
+#################################################
+def make_record(value: str):
+    record = StringFactory(value).create_record()
+    return record.digest, record
+
+
+#################################################
+# @best_of: times a callable several times      #
+# returns: the fastest run in seconds           #
+#################################################
+def best_of(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+#################################################
+# @percentile: the value below which a fraction #
+# of the samples fall                           #
+# returns: one of the samples                   #
+#################################################
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+#################################################
+# @peak_rss_bytes: the peak resident memory of  #
+# this process so far                           #
+# returns: a size in bytes                      #
+#################################################
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+#################################################
+# @asgi_request: sends one HTTP request         #
+# straight through the ASGI interface, without  #
+# an HTTP client in the way                     #
+# returns: the (status, body) of the response   #
+#################################################
+async def asgi_request(app, method: str, path: str, query_string: bytes = b"", body: bytes = b"",
+                       content_type: bytes = b"application/json") -> tuple:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": quote(path).encode(), "query_string": query_string,
+        "root_path": "", "headers": [(b"host", b"bench"), (b"content-type", content_type)],
+        "server": ("bench", 80), "client": ("bench", 1),
+    }
+    status_code = 0
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status_code, b"".join(chunks)
@@ -0,0 +1,94 @@
+"""
+Micro-benchmarks for the string analysis: each property and the full record,
+the original per-property implementations against the analysis engine, across
+string sizes.
+
+    python -m benchmarks.bench_analysis --sizes 100 10000 1000000 10000000
+"""
+
+import argparse
+import hashlib
+import random
+
+from src.string_analysis import analyze_string, count_characters, count_words
+
+from ._common import ALPHABET, best_of
+
+
+#################################################
+# The original StringFactory implementations,   #
+# kept here as the baseline                     #
+#################################################
+def legacy_is_palindrome(value: str) -> bool:
+    start = 0
+    end = len(value) - 1
+    while start < end:
+        if value[start] == value[end]:
+            start += 1
+            end -= 1
+            continue
+        else:
+            return False
+    return True
+
+
+def legacy_character_frequency_map(value: str) -> dict:
+    frequency_map = {}
+    for char in value:
+        if char not in frequency_map:
+            frequency_map[char] = 1
+        elif char in frequency_map:
+            frequency_map[char] += 1
+    return frequency_map
+
+
+def legacy_sha256_hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def legacy_payload(value: str) -> dict:
+    return {
+        "id": legacy_sha256_hash(value),
+        "length": len(value),
+        "is_palindrome": legacy_is_palindrome(value),
+        "unique_characters": len(set(value)),
+        "word_count": len(value.split()),
+        "sha256_hash": legacy_sha256_hash(value),
+        "character_frequency_map": legacy_character_frequency_map(value),
+        "key": legacy_sha256_hash(value),
+    }
+
+
+def palindrome_of(size: int, rng) -> str:
+    half = "".join(rng.choice(ALPHABET) for _ in range(size // 2))
+    return half + half[::-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'size':>10} {'property':<24} {'legacy ms':>12} {'engine ms':>12} {'speedup':>8}")
+    for size in args.sizes:
+        # A palindrome is the worst case for both palindrome checks
+        value = palindrome_of(size, rng)
+        cases = [
+            ("is_palindrome", lambda: legacy_is_palindrome(value), lambda: value == value[::-1]),
+            ("word_count", lambda: len(value.split()), lambda: count_words(value)),
+            ("character_frequency_map", lambda: legacy_character_frequency_map(value), lambda: count_characters(value)),
+            ("sha256 (x3 vs x1)", lambda: [legacy_sha256_hash(value) for _ in range(3)],
+             lambda: hashlib.sha256(value.encode("utf-8")).digest()),
+            ("full payload", lambda: legacy_payload(value), lambda: analyze_string(value)),
+        ]
+        for label, legacy, engine in cases:
+            legacy_time = best_of(legacy, args.repeat)
+            engine_time = best_of(engine, args.repeat)
+            print(f"{size:>10} {label:<24} {legacy_time * 1000:>12.3f} {engine_time * 1000:>12.3f} "
+                  f"{legacy_time / engine_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
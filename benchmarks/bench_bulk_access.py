@@ -0,0 +1,62 @@
+"""
+Compares looking up and deleting N strings with one request per string
+(GET and DELETE /strings/{string_value}) against one POST /strings/lookup or
+POST /strings/delete carrying all N, through the in-process ASGI app.
+
+    python -m benchmarks.bench_bulk_access --counts 10 100 1000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from ._common import asgi_request, random_strings
+
+
+async def measure(app, count: int, seed: int) -> dict:
+    values = random_strings(count, seed=seed)
+    body = json.dumps(values).encode()
+
+    async def store_all():
+        await asgi_request(app, "POST", "/strings/batch", body=body)
+
+    timings = {}
+    await store_all()
+    start = time.perf_counter()
+    for value in values:
+        await asgi_request(app, "GET", f"/strings/{value}")
+    timings["lookup, one request each"] = time.perf_counter() - start
+    start = time.perf_counter()
+    await asgi_request(app, "POST", "/strings/lookup", body=body)
+    timings["lookup, one batch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for value in values:
+        await asgi_request(app, "DELETE", f"/strings/{value}")
+    timings["delete, one request each"] = time.perf_counter() - start
+    await store_all()
+    start = time.perf_counter()
+    await asgi_request(app, "POST", "/strings/delete", body=body)
+    timings["delete, one batch"] = time.perf_counter() - start
+    return timings
+
+
+async def run(counts: list):
+    from main import app
+
+    print(f"{'strings':>8} {'operation':<26} {'ms':>10}")
+    for count in counts:
+        for name, elapsed in (await measure(app, count, seed=count)).items():
+            print(f"{count:>8} {name:<26} {elapsed * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    asyncio.run(run(args.counts))
+
+
+if __name__ == "__main__":
+    main()
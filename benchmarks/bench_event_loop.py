@@ -0,0 +1,70 @@
+"""
+Measures the latency of small GET /strings/{value} requests while large
+POST /strings requests run at the same time, for each executor mode.
+
+    python -m benchmarks.bench_event_loop --large-size 5000000 --large-posts 8
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+import src.executor as executor
+from main import app
+
+from ._common import ALPHABET, percentile, random_strings
+
+
+async def run_mode(mode: str, large_values: list, small_values: list) -> list:
+    executor.ANALYSIS_EXECUTOR = mode
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def large_posts():
+            await asyncio.gather(*(client.post("/strings", json={"value": value}) for value in large_values))
+
+        async def small_gets():
+            while not posting.done():
+                value = random.choice(small_values)
+                start = time.perf_counter()
+                await client.get(f"/strings/{value}")
+                latencies.append(time.perf_counter() - start)
+                # The in-process transport may complete a request without
+                # suspending; yield so the POSTs can make progress.
+                await asyncio.sleep(0)
+
+        posting = asyncio.ensure_future(large_posts())
+        await asyncio.gather(posting, small_gets())
+    return latencies
+
+
+async def main_async(args):
+    rng = random.Random(0)
+    small_values = random_strings(1000)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for value in small_values:
+            await client.post("/strings", json={"value": value})
+
+    print(f"{'executor':<10} {'GETs':>8} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for mode in args.modes:
+        large_values = ["".join(rng.choice(ALPHABET) for _ in range(1000)) * (args.large_size // 1000)
+                        for _ in range(args.large_posts)]
+        latencies = await run_mode(mode, large_values, small_values)
+        print(f"{mode:<10} {len(latencies):>8} {percentile(latencies, 0.5) * 1000:>10.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>10.2f} {max(latencies) * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--large-size", type=int, default=2_000_000)
+    parser.add_argument("--large-posts", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measures the cost of the built-in instrumentation: requests per second of
+point GETs and small POSTs with STRING_METRICS_ENABLED=0
+and =1. Each setting runs in its own process because the setting is read at
+import time; the processes alternate for several rounds and the best rate of
+each is kept, which evens out machine noise.
+
+    python -m benchmarks.bench_metrics_overhead --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+async def measure(requests: int) -> dict:
+    from main import app
+
+    from ._common import asgi_request, random_strings
+
+    values = random_strings(1000, seed=3)
+    body_values = random_strings(requests, seed=4)
+
+    async def post(value):
+        await asgi_request(app, "POST", "/strings", body=json.dumps({"value": value}).encode())
+
+    for value in values:
+        await post(value)
+
+    results = {}
+    start = time.perf_counter()
+    for number in range(requests):
+        await asgi_request(app, "GET", f"/strings/{values[number % len(values)]}")
+    results["GET /strings/{value}"] = requests / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for value in body_values:
+        await post(value)
+    results["POST /strings"] = requests / (time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure(args.requests))))
+        return
+
+    runs = {"0": {}, "1": {}}
+    for _ in range(args.rounds):
+        for enabled in ("0", "1"):
+            output = subprocess.run(
+                [sys.executable, "-W", "ignore", "-m", "benchmarks.bench_metrics_overhead", "--child",
+                 "--requests", str(args.requests)],
+                env={**os.environ, "STRING_METRICS_ENABLED": enabled}, check=True, capture_output=True, text=True,
+            ).stdout
+            for name, rate in json.loads(output).items():
+                runs[enabled][name] = max(rate, runs[enabled].get(name, 0))
+
+    print(f"{'request':<24} {'off req/s':>10} {'on req/s':>10} {'overhead':>9}")
+    for name, off in runs["0"].items():
+        on = runs["1"][name]
+        print(f"{name:<24} {off:>10.0f} {on:>10.0f} {(off / on - 1) * 100:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measures what GET /strings/filter-by-natural-language adds over a structured
+GET /strings query: the cost of parsing the query text, cold and cached, next
+to building the same filters from query parameters and running the query.
+
+    python -m benchmarks.bench_natural_language --size 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.local_data_store import LocalDataStore
+from src.natural_language import _parse_normalized, parse_natural_language_query
+from src.query_planner import build_plan
+
+from ._common import make_record, random_strings
+
+QUERIES = [
+    ("all single word palindromic strings", {"word_count": "1", "is_palindrome": "true"}),
+    ("strings longer than 10 characters", {"min_length": "11"}),
+    ("palindromic strings that contain the first vowel", {"is_palindrome": "true", "contains_character": "a"}),
+    ("single word palindromic strings longer than 10 characters containing z",
+     {"word_count": "1", "is_palindrome": "true", "min_length": "11", "contains_character": "z"}),
+    ("strings between 5 and 20 characters containing the letter q",
+     {"min_length": "5", "max_length": "20", "contains_character": "q"}),
+]
+
+
+#################################################
+# @structured_filters: the parameter handling   #
+# of GET /strings, kept here as the baseline    #
+#################################################
+def structured_filters(query_params: dict) -> dict:
+    param_dict = {}
+    if 'is_palindrome' in query_params:
+        param_dict['is_palindrome'] = query_params['is_palindrome'].lower() == 'true'
+    for name in ('min_length', 'max_length', 'word_count'):
+        if name in query_params:
+            param_dict[name] = int(query_params[name])
+    if 'contains_character' in query_params:
+        param_dict['contains_character'] = query_params['contains_character']
+    return param_dict
+
+
+#################################################
+# @per_call_us: average time of one call        #
+# returns: microseconds per call                #
+#################################################
+def per_call_us(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    store = LocalDataStore()
+    asyncio.run(store.commit_many([make_record(value)[1] for value in random_strings(args.size)]))
+
+    def parse_cold(text):
+        _parse_normalized.cache_clear()
+        return parse_natural_language_query(text)
+
+    print(f"{'query':<72} {'params us':>10} {'cold us':>9} {'cached us':>10} {'query us':>10}")
+    for text, query_params in QUERIES:
+        assert parse_natural_language_query(text) == structured_filters(query_params), text
+        params_us = per_call_us(lambda: structured_filters(query_params), args.calls)
+        cold_us = per_call_us(lambda: parse_cold(text), args.calls)
+        cached_us = per_call_us(lambda: parse_natural_language_query(text), args.calls)
+        plan = build_plan(structured_filters(query_params), "all")
+        query_us = per_call_us(lambda: asyncio.run(store.query_keys(plan)), 50)
+        print(f"{text[:72]:<72} {params_us:>10.2f} {cold_us:>9.2f} {cached_us:>10.2f} {query_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
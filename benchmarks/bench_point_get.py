@@ -0,0 +1,74 @@
+"""
+Requests per second of GET /strings/{value} when the payload dict is returned
+and serialized by FastAPI on every request (the previous route) versus the
+record's cached JSON bytes returned as a raw Response.
+
+Requests are driven straight through the ASGI interface so the numbers are
+not dominated by an HTTP client.
+
+    python -m benchmarks.bench_point_get --lengths 16 1000 20000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi import FastAPI, HTTPException
+
+from main import app
+from src.config import DB_INSTANCE_POOL
+from src.create_string import digest_of
+from src.string_factory import StringFactory
+
+from ._common import asgi_request
+
+# A wide alphabet so long strings carry large character frequency maps
+WIDE_ALPHABET = [chr(code) for code in range(0x4E00, 0x4E00 + 2000)] + list("abcdefghij ")
+
+baseline_app = FastAPI()
+
+
+@baseline_app.get('/strings/{string_value}')
+async def get_string_baseline(string_value: str):
+    found_record = await DB_INSTANCE_POOL.retrieve_from_db(digest_of(string_value))
+    if found_record is None:
+        raise HTTPException(status_code=404, detail="String does not exist in the system")
+    return found_record.to_payload()
+
+
+async def requests_per_second(target_app, paths: list, requests: int) -> float:
+    start = time.perf_counter()
+    for number in range(requests):
+        status_code, _ = await asgi_request(target_app, "GET", paths[number % len(paths)])
+        assert status_code == 200, status_code
+    return requests / (time.perf_counter() - start)
+
+
+async def main_async(args):
+    rng = random.Random(0)
+    print(f"{'length':>8} {'baseline req/s':>15} {'cached req/s':>13} {'speedup':>8}")
+    for length in args.lengths:
+        values = ["".join(rng.choice(WIDE_ALPHABET) for _ in range(length)).strip() or "x"
+                  for _ in range(args.strings)]
+        await DB_INSTANCE_POOL.commit_many([StringFactory(value).create_record() for value in values])
+        paths = [f"/strings/{value}" for value in values]
+        # Warm up both routes; this also fills the cached bytes
+        await requests_per_second(baseline_app, paths, len(paths))
+        await requests_per_second(app, paths, len(paths))
+
+        baseline = await requests_per_second(baseline_app, paths, args.requests)
+        cached = await requests_per_second(app, paths, args.requests)
+        print(f"{length:>8} {baseline:>15.0f} {cached:>13.0f} {cached / baseline:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[16, 1000, 20000])
+    parser.add_argument("--strings", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measures what the "fields" projection and the lazily computed character
+frequency map save:
+
+- memory per stored string, as stored by POST /strings (whose response
+  counts the frequencies without memoizing them) and once every frequency map
+  has been computed and memoized by a read;
+- JSON bytes per string and GET /strings pages per second for the whole
+  payload against several projections.
+
+Requests are driven straight through the ASGI interface, like
+bench_point_get.py.
+
+    python -m benchmarks.bench_projection --count 100000 --page 100
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from main import app
+from src.config import DB_INSTANCE_POOL
+from src.json_codec import encode_json
+from src.string_record import parse_fields
+
+from ._common import asgi_request, random_strings
+
+PROJECTIONS = (None, "id,value", "id,value,length,is_palindrome", "properties")
+
+
+#################################################
+# @measure: traces the memory held by the store #
+# while the values are sent to POST /strings,   #
+# then after their frequency maps are memoized  #
+# returns: the (posted, memoized) traced bytes  #
+#################################################
+def measure(loop, values: list) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    for value in values:
+        body = encode_json({"value": value})
+        status_code, _ = loop.run_until_complete(asgi_request(app, "POST", "/strings", body=body))
+        assert status_code == 201
+    gc.collect()
+    posted, _ = tracemalloc.get_traced_memory()
+    records = DB_INSTANCE_POOL.snapshot().values()
+    assert all(record.frequencies is None for record in records), "POST /strings memoized a frequency map"
+    for record in records:
+        record.character_frequency_map()
+    del records
+    gc.collect()
+    memoized, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return posted, memoized
+
+
+async def pages_per_second(fields, pages: int, page: int) -> float:
+    query_string = f"limit={page}" + ("" if fields is None else f"&fields={fields}")
+    start = time.perf_counter()
+    for _ in range(pages):
+        status_code, _ = await asgi_request(app, "GET", "/strings", query_string.encode())
+        assert status_code == 200
+    return pages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=100, help="strings per GET /strings page")
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    posted, memoized = measure(loop, random_strings(args.count))
+    print(f"{'memory':<32} {'MiB':>8} {'B/string':>9}")
+    print(f"{'after POST /strings':<32} {posted / 2**20:8.1f} {posted / args.count:9.1f}")
+    print(f"{'frequencies memoized':<32} {memoized / 2**20:8.1f} {memoized / args.count:9.1f}\n")
+
+    records = list(DB_INSTANCE_POOL.snapshot().values())
+    print(f"{'fields':<32} {'B/string':>9} {'pages/s':>9}")
+    for fields in PROJECTIONS:
+        projection = parse_fields(fields)
+        payload_bytes = sum(len(encode_json(record.to_payload(projection))) for record in records)
+        rate = loop.run_until_complete(pages_per_second(fields, args.pages, args.page))
+        print(f"{fields or '(whole payload)':<32} {payload_bytes / len(records):9.1f} {rate:9.0f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares GET /strings filter latency for a full scan against the planned,
+index-backed LocalDataStore.query_keys as the store grows.
+
+    python -m benchmarks.bench_query --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+
+from src.local_data_store import LocalDataStore
+from src.query_planner import build_plan
+
+from ._common import best_of, make_record, random_strings
+
+QUERIES = [
+    ({"is_palindrome": True}, "all"),
+    ({"word_count": 1}, "all"),
+    ({"min_length": 38}, "all"),
+    ({"contains_character": "q"}, "all"),
+    ({"contains_character": "q", "word_count": 1, "min_length": 30}, "all"),
+    ({"is_palindrome": True, "word_count": 1}, "any"),
+]
+
+
+#################################################
+# @full_scan: the pre-index query path, kept    #
+# here as the baseline                          #
+#################################################
+def full_scan(db: dict, filters: dict, match: str = "any") -> list:
+    combine = all if match == "all" else any
+    matching_records = []
+    for record in db.values():
+        checks = []
+        if 'is_palindrome' in filters:
+            checks.append(record.is_palindrome == filters['is_palindrome'])
+        if 'min_length' in filters:
+            checks.append(record.length >= filters['min_length'])
+        if 'max_length' in filters:
+            checks.append(record.length <= filters['max_length'])
+        if 'word_count' in filters:
+            checks.append(record.word_count == filters['word_count'])
+        if 'contains_character' in filters:
+            checks.append(filters['contains_character'] in record.value)
+        if combine(checks):
+            matching_records.append(record)
+    return matching_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'query':<70} {'scan ms':>10} {'index ms':>10} {'matches':>8}")
+    for size in args.sizes:
+        store = LocalDataStore()
+        asyncio.run(store.commit_many([make_record(value)[1] for value in random_strings(size)]))
+        records = store.snapshot()
+
+        for filters, match in QUERIES:
+            plan = build_plan(filters, match)
+            scan = best_of(lambda: full_scan(records, filters, match), repeat=3)
+            indexed = best_of(lambda: asyncio.run(store.query_keys(plan)), repeat=3)
+            matches = len(asyncio.run(store.query_keys(plan)))
+            label = f"{match} {filters}"
+            print(f"{size:>10} {label:<70} {scan * 1000:>10.2f} {indexed * 1000:>10.2f} {matches:>8}")
+
+
+if __name__ == "__main__":
+    main()
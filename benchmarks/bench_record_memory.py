@@ -0,0 +1,80 @@
+"""
+Measures the memory held per stored string by the original nested payload
+dicts against the compact StringRecord layout. Both figures include the
+stored (lowercased) value itself.
+
+    python -m benchmarks.bench_record_memory --count 1000000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime, timezone
+
+from src.string_factory import StringFactory
+
+from ._common import random_strings
+
+
+#################################################
+# @legacy_entry: the nested dict layout the     #
+# store used to keep                            #
+# returns: a (hex key, payload) tuple           #
+#################################################
+def legacy_entry(value: str):
+    factory = StringFactory(value)
+    created_at = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    payload = {
+        "id": factory.sha256_hash(),
+        "value": factory.string,
+        "properties": {
+            "length": factory.length_of_string(),
+            "is_palindrome": factory.is_palindrome(),
+            "unique_characters": factory.unique_characters(),
+            "word_count": factory.word_count(),
+            "sha256_hash": factory.sha256_hash(),
+            "character_frequency_map": factory.character_frequency_map(),
+        },
+        "created_at": str(created_at),
+    }
+    return factory.sha256_hash(), payload
+
+
+#################################################
+# @compact_entry: the StringRecord layout       #
+# returns: a (digest, record) tuple             #
+#################################################
+def compact_entry(value: str):
+    record = StringFactory(value).create_record()
+    return record.digest, record
+
+
+#################################################
+# @measure: traces the memory still held after  #
+# filling a store dict with the given entries   #
+# returns: the traced bytes                     #
+#################################################
+def measure(values: list, build_entry) -> int:
+    gc.collect()
+    tracemalloc.start()
+    db = dict(build_entry(value) for value in values)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del db
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    values = random_strings(args.count)
+    for label, build_entry in (("nested dicts", legacy_entry), ("StringRecord", compact_entry)):
+        used = measure(values, build_entry)
+        print(f"{label:<14} {used / 2**20:10.1f} MiB  {used / args.count:8.1f} B/string")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Measures how fast the service starts:
+
+- import time of the app (`python -X importtime -c "import main"`), with the
+  heaviest modules it imports directly;
+- time from starting `uvicorn main:app` to the first answered request and to
+  /ready reporting ready, for each STRING_STORE_WARMUP mode, with a persisted
+  store of --count strings to load.
+
+    python -m benchmarks.bench_startup --count 1000000 --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from src.local_data_store import LocalDataStore
+from src.persistence import StorePersistence
+
+from ._common import make_record, random_strings
+
+
+#################################################
+# @import_times: imports the app in a fresh     #
+# interpreter with -X importtime                #
+# returns: a dict of cumulative microseconds    #
+# per module imported directly by main, plus    #
+# main itself                                   #
+#################################################
+def import_times() -> dict:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            capture_output=True, text=True, check=True)
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[13:]:
+            continue
+        _, cumulative, name = line[13:].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # A module is listed after everything it imports, indented two spaces deeper
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == "main":
+                return {**children, "main": int(cumulative)}
+            children = {}
+    raise RuntimeError("main was not imported")
+
+
+def persisted_store(count: int) -> str:
+    directory = tempfile.mkdtemp(prefix="string-startup-")
+    store = LocalDataStore()
+    persistence = StorePersistence(directory, snapshot_every=0)
+    persistence.attach(store)
+    store.load_records([make_record(value)[1] for value in random_strings(count, max_length=60)])
+    persistence.snapshot()
+    persistence.close()
+    return directory
+
+
+#################################################
+# @start_server: starts uvicorn and polls       #
+# /ready                                        #
+# returns: seconds to the first answer and to   #
+# the first 200                                 #
+#################################################
+def start_server(env: dict, port: int) -> tuple:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    first_answer = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            while time.perf_counter() - start < 120:
+                try:
+                    status_code = client.get("/ready").status_code
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                if first_answer is None:
+                    first_answer = time.perf_counter() - start
+                if status_code == 200:
+                    return first_answer, time.perf_counter() - start
+                time.sleep(0.005)
+        raise RuntimeError("uvicorn did not become ready")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200_000, help="strings in the persisted store; 0 for none")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    print(f"import main: {statistics.median(run['main'] for run in runs) / 1000:.1f} ms (median of {args.runs})")
+    heaviest = sorted(runs[0], key=runs[0].get, reverse=True)
+    for name in [name for name in heaviest if name != "main"][:8]:
+        print(f"  {name:<28} {statistics.median(run.get(name, 0) for run in runs) / 1000:8.1f} ms")
+
+    directory = persisted_store(args.count) if args.count else None
+    print(f"\n{'warmup':<12} {'first answer s':>15} {'ready s':>9}  ({args.count} persisted strings)")
+    for warmup in ("blocking", "background"):
+        env = dict(os.environ, STRING_STORE_WARMUP=warmup, STRING_STORE_SNAPSHOT_EVERY="0")
+        if directory is not None:
+            env["STRING_STORE_DATA_DIR"] = directory
+        timings = [start_server(env, args.port) for _ in range(args.runs)]
+        first_answer = statistics.median(timing[0] for timing in timings)
+        ready = statistics.median(timing[1] for timing in timings)
+        print(f"{warmup:<12} {first_answer:>15.2f} {ready:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
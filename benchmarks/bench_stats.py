@@ -0,0 +1,58 @@
+"""
+Compares GET /strings/stats served from the counters LocalDataStore keeps up
+to date with computing the same statistics by scanning every stored string,
+across store sizes. Also reports the first read right after a bulk load, while
+the indexer thread is still counting the characters of the new strings (see
+store_stats.py), and checks that the counters equal the scan once it is done.
+
+    python -m benchmarks.bench_stats --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+
+from src.local_data_store import LocalDataStore
+from src.store_stats import StoreStats
+
+from ._common import best_of, make_record, random_strings
+
+
+def scan(store: LocalDataStore) -> dict:
+    stats = StoreStats()
+    for digest, record in store.snapshot().items():
+        stats.add(digest, record)
+    return stats.to_payload()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    read = lambda store: loop.run_until_complete(store.stats()).to_payload()
+    print(f"{'strings':>10} {'scan ms':>10} {'first read ms':>14} {'counters ms':>12}")
+    for size in args.sizes:
+        store = LocalDataStore()
+        store.load_records([make_record(value)[1] for value in random_strings(size, seed=size)])
+        # As StorePersistence.attach() does after a warm start
+        gc.freeze()
+
+        start = time.perf_counter()
+        assert read(store)["total_strings"] == size
+        first_read = time.perf_counter() - start
+        store.warm_indexes()
+        counted = read(store)
+        assert {key: value for key, value in counted.items() if key != "most_common_characters"} == \
+            {key: value for key, value in scan(store).items() if key != "most_common_characters"}
+
+        scanned = best_of(lambda: scan(store), repeat=3)
+        counters = best_of(lambda: read(store), repeat=20)
+        print(f"{size:>10} {scanned * 1000:>10.2f} {first_read * 1000:>14.2f} {counters * 1000:>12.3f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
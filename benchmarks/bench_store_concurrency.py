@@ -0,0 +1,76 @@
+"""
+Write throughput of LocalDataStore per shard count: threads commit, then
+delete, disjoint sets of strings. The guarantees under contention
+(insert-if-absent, point-in-time snapshots, index, statistics and log
+consistency) are checked by tests/test_local_data_store.py.
+
+    python -m benchmarks.bench_store_concurrency --threads 8 --strings 20000
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from src.local_data_store import LocalDataStore
+
+from ._common import make_record, random_strings
+
+
+def run_threads(target, count: int, *args):
+    errors = []
+
+    def guarded(number):
+        try:
+            target(number, *args)
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=guarded, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def throughput(args):
+    records = [make_record(value) for value in random_strings(args.strings, seed=12)]
+    print(f"{'shards':>7} {'threads':>8} {'commits/s':>12} {'deletes/s':>12}")
+    for shard_count in args.shards:
+        store = LocalDataStore(shard_count)
+        chunks = [records[number::args.threads] for number in range(args.threads)]
+
+        # Each thread runs its own event loop, as each uvicorn worker thread would
+        async def commit_chunk(number):
+            for digest, record in chunks[number]:
+                await store.commit_to_db(digest, record)
+
+        async def delete_chunk(number):
+            for digest, _ in chunks[number]:
+                await store.delete_from_db(digest)
+
+        commit = lambda number: asyncio.run(commit_chunk(number))
+        delete = lambda number: asyncio.run(delete_chunk(number))
+
+        start = time.perf_counter()
+        run_threads(commit, args.threads)
+        commits = len(records) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        run_threads(delete, args.threads)
+        deletes = len(records) / (time.perf_counter() - start)
+        print(f"{shard_count:>7} {args.threads:>8} {commits:>12.0f} {deletes:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--strings", type=int, default=20_000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 16], help="shard counts to time")
+    args = parser.parse_args()
+    throughput(args)
+
+
+if __name__ == "__main__":
+    main()
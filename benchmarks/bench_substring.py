@@ -0,0 +1,90 @@
+"""
+Compares substring queries (GET /strings?contains=...) answered by scanning
+every stored value with the trigram index, and reports the compressed size of
+the posting lists against the size of the stored text. Also reports the first
+query right after a bulk load, before the background indexer has split the
+new strings into trigrams. The results of both are checked to be identical,
+before indexing, and before and after deleting most strings (which compacts
+the posting lists).
+
+    python -m benchmarks.bench_substring --sizes 100000 1000000
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import time
+
+from src.local_data_store import LocalDataStore
+from src.query_planner import build_plan
+
+from ._common import best_of, make_record
+
+WORDS = ("the quick brown fox jumps over lazy dog level radar stats analyzer string query index "
+         "posting list search engine memory python async event loop cache shard trigram").split()
+SUBSTRINGS = ("ab", "fox", "radar", "trigram", "async event", "engine memory py", "zzz")
+
+
+def sentences(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    values = set()
+    while len(values) < count:
+        values.add(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8))) + f" {rng.randrange(1 << 30):x}")
+    return sorted(values)
+
+
+def scan(records: dict, substring: str) -> set:
+    return {key for key, record in records.items() if substring in record.value}
+
+
+def check(loop, store: LocalDataStore):
+    records = store.snapshot()
+    for substring in SUBSTRINGS:
+        indexed = loop.run_until_complete(store.query_keys(build_plan({"contains": substring})))
+        assert indexed == scan(records, substring), substring
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    for size in args.sizes:
+        store = LocalDataStore()
+        store.load_records([make_record(value)[1] for value in sentences(size, seed=size)])
+        # As StorePersistence.attach() does after a warm start
+        gc.freeze()
+        plan = build_plan({"contains": SUBSTRINGS[3]})
+        start = time.perf_counter()
+        loop.run_until_complete(store.query_keys(plan))
+        print(f"first {SUBSTRINGS[3]!r} query after the bulk load: {(time.perf_counter() - start) * 1000:.2f} ms")
+        check(loop, store)
+        store.warm_indexes()
+
+        corpus = sum(len(record.value.encode("utf-8")) for record in store.snapshot().values())
+        stats = [shard.index.substrings.stats() for shard in store.shards]
+        postings = sum(shard["postings"] for shard in stats)
+        posting_bytes = sum(shard["posting_bytes"] for shard in stats)
+        print(f"{size} strings, {corpus / (1 << 20):.1f} MiB of text: {postings} postings in "
+              f"{posting_bytes / (1 << 20):.1f} MiB ({posting_bytes / postings:.2f} bytes each, "
+              f"{posting_bytes / corpus:.2f}x the text)")
+
+        records = store.snapshot()
+        print(f"{'substring':<20} {'scan ms':>10} {'index ms':>10} {'matches':>8}")
+        for substring in SUBSTRINGS:
+            plan = build_plan({"contains": substring})
+            scanned = best_of(lambda: scan(records, substring), repeat=3)
+            indexed = best_of(lambda: loop.run_until_complete(store.query_keys(plan)), repeat=3)
+            matches = len(loop.run_until_complete(store.query_keys(plan)))
+            print(f"{substring!r:<20} {scanned * 1000:>10.2f} {indexed * 1000:>10.2f} {matches:>8}")
+
+        for key in random.Random(1).sample(sorted(records), size * 3 // 4):
+            loop.run_until_complete(store.delete_from_db(key))
+        check(loop, store)
+        print("results identical to a scan, before and after deletes\n")
+
+
+if __name__ == "__main__":
+    main()
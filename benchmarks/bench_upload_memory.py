@@ -0,0 +1,68 @@
+"""
+Peak memory of analyzing one large upload: the JSON body of POST /strings
+(parsed, lowercased and analyzed by StringFactory) versus the raw body of
+POST /strings/stream fed to StreamingAnalyzer in 64 KiB pieces.
+
+Peaks are measured with tracemalloc. The JSON body stays referenced by the
+request while it is analyzed, so its size is added to the JSON peak; the
+streamed pieces are released as they are consumed.
+
+    python -m benchmarks.bench_upload_memory --sizes 10 50 200
+"""
+
+import argparse
+import json
+import random
+import tracemalloc
+
+from src.string_analysis import StreamingAnalyzer
+from src.string_factory import StringFactory
+
+from ._common import ALPHABET
+
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+def json_path(body: bytes):
+    value = json.loads(body)["value"]
+    return StringFactory(value).analysis()
+
+
+def stream_path(body: bytes):
+    analyzer = StreamingAnalyzer()
+    view = memoryview(body)
+    for start in range(0, len(body), BODY_CHUNK_SIZE):
+        # Request.stream() hands over fresh bytes objects
+        analyzer.feed(bytes(view[start:start + BODY_CHUNK_SIZE]))
+    return analyzer.finish()
+
+
+def peak_mib(func, body: bytes) -> float:
+    tracemalloc.start()
+    analysis = func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del analysis
+    return peak / (1 << 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50], help="upload sizes in MiB")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    block = "".join(rng.choice(ALPHABET.upper() + ALPHABET) for _ in range(1 << 16))
+    print(f"{'MiB':>6} {'json peak MiB':>14} {'stream peak MiB':>16} {'json x':>8} {'stream x':>9}")
+    for size in args.sizes:
+        text = block * (size * (1 << 20) // len(block))
+        json_body = json.dumps({"value": text}).encode("utf-8")
+        raw_body = text.encode("utf-8")
+        del text
+        json_peak = peak_mib(json_path, json_body) + len(json_body) / (1 << 20)
+        stream_peak = peak_mib(stream_path, raw_body)
+        print(f"{size:>6} {json_peak:>14.1f} {stream_peak:>16.1f} {json_peak / size:>8.2f} {stream_peak / size:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures restart-to-ready time of a persisted LocalDataStore: memory-mapping
+and decoding the snapshot, rebuilding the indexes and replaying the log tail.
+
+    python -m benchmarks.bench_warm_start --count 5000000 --tail 50000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from src.local_data_store import LocalDataStore
+from src.persistence import StorePersistence
+
+from ._common import make_record, random_strings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1_000_000, help="strings in the snapshot")
+    parser.add_argument("--tail", type=int, default=10_000, help="commits in the log after the snapshot")
+    parser.add_argument("--directory", default=None, help="data directory (default: a temporary one)")
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp(prefix="string-store-")
+    values = random_strings(args.count + args.tail, max_length=60)
+
+    store = LocalDataStore()
+    persistence = StorePersistence(directory, snapshot_every=0)
+    persistence.attach(store)
+    store.load_records([make_record(value)[1] for value in values[:args.count]])
+    persistence.snapshot()
+    asyncio.run(store.commit_many([make_record(value)[1] for value in values[args.count:]]))
+    persistence.close()
+    del store, values
+
+    snapshot_size = os.path.getsize(os.path.join(directory, "snapshot.bin"))
+    log_size = os.path.getsize(os.path.join(directory, "wal.log"))
+
+    start = time.perf_counter()
+    warm_store = LocalDataStore()
+    StorePersistence(directory, snapshot_every=0).attach(warm_store)
+    elapsed = time.perf_counter() - start
+
+    count = asyncio.run(warm_store.count())
+    print(f"strings:        {count}")
+    print(f"snapshot:       {snapshot_size / 2**20:.1f} MiB")
+    print(f"log tail:       {log_size / 2**20:.1f} MiB")
+    print(f"ready in:       {elapsed:.2f} s ({elapsed / count * 1e6:.2f} us/string)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Measures API throughput as uvicorn workers are added, with the workers sharing
+one SQLite store. Each run starts `uvicorn main:app --workers N` on a local
+port and drives it from several client processes with a mix of POST and GET
+requests.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --clients 8 --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from ._common import random_strings
+
+
+async def drive(base_url: str, values: list, duration: float) -> int:
+    completed = 0
+    deadline = time.perf_counter() + duration
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        async def worker(offset: int):
+            nonlocal completed
+            position = offset
+            while time.perf_counter() < deadline:
+                value = values[position % len(values)]
+                # One write for every four reads
+                if position % 5 == 0:
+                    await client.post("/strings", json={"value": f"{value} {position}"})
+                else:
+                    await client.get(f"/strings/{value}")
+                completed += 1
+                position += 1
+
+        await asyncio.gather(*(worker(offset) for offset in range(16)))
+    return completed
+
+
+def client_process(base_url: str, values: list, duration: float, results):
+    results.put(asyncio.run(drive(base_url, values, duration)))
+
+
+def wait_until_ready(base_url: str, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn did not start")
+
+
+def run(workers: int, args, values: list) -> float:
+    directory = tempfile.mkdtemp(prefix="string-workers-")
+    env = dict(os.environ, STRING_STORE_BACKEND="sqlite",
+               STRING_STORE_SQLITE_PATH=os.path.join(directory, "strings.sqlite3"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(base_url)
+        with httpx.Client(base_url=base_url) as client:
+            client.post("/strings/batch", json=values)
+
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client_process, args=(base_url, values, args.duration, results))
+                   for _ in range(args.clients)]
+        for process in clients:
+            process.start()
+        total = sum(results.get() for _ in clients)
+        for process in clients:
+            process.join()
+        return total / args.duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    values = random_strings(5000)
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'scaling':>8}")
+    for workers in args.workers:
+        throughput = run(workers, args, values)
+        baseline = baseline or throughput
+        print(f"{workers:>8} {throughput:>10.0f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
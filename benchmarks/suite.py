@@ -0,0 +1,351 @@
+"""
+The reproducible benchmark suite. It covers three groups, each reported as
+machine-readable JSON so that runs can be stored and compared:
+
+- analysis: every StringFactory method across input sizes;
+- store: LocalDataStore commit, retrieve, query and delete at several store
+  sizes;
+- api: an in-process ASGI load generator driving POST /strings,
+  GET /strings/{value}, filtered GET /strings and DELETE with a configurable
+  mix and concurrency.
+
+Every result has a throughput (ops_per_sec) and p50/p99 latencies in
+microseconds, and every group records the peak RSS of the process after it ran.
+The api group measures the throughput of the mixed load as a whole; its
+per-operation entries only report latencies (ops_per_sec is null), since the
+operations share the same wall time. API responses are checked against the
+expected status of each operation and mismatches are counted in "errors".
+Inputs come from fixed seeds, so two runs on the same machine do the same work.
+
+    python -m benchmarks.suite run --output before.json
+    python -m benchmarks.suite run --store-sizes 10000 1000000 10000000 --output after.json
+    python -m benchmarks.suite compare before.json after.json --threshold 10
+
+run exits with status 1 when any request got an unexpected status. compare
+exits with status 1 when a result lost more than --threshold percent of its
+throughput, its p99 latency grew by more than that, or it has errors.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+from src.local_data_store import LocalDataStore
+from src.query_planner import build_plan
+from src.string_factory import StringFactory
+
+from ._common import ALPHABET, asgi_request, make_record, peak_rss_bytes, percentile, random_strings
+
+FACTORY_METHODS = (
+    "length_of_string",
+    "is_palindrome",
+    "unique_characters",
+    "word_count",
+    "sha256_hash",
+    "character_frequency_map",
+    "create_record",
+)
+
+QUERY_FILTERS = (
+    ({"is_palindrome": True}, "all"),
+    ({"word_count": 1}, "all"),
+    ({"min_length": 30}, "all"),
+    ({"contains_character": "q"}, "all"),
+    ({"contains_character": "q", "word_count": 2, "max_length": 20}, "all"),
+    ({"is_palindrome": True, "word_count": 1}, "any"),
+)
+
+DEFAULT_MIX = "post=20,get=50,query=20,delete=10"
+
+# The status each API operation answers with when it succeeds
+EXPECTED_STATUS = {"post": 201, "get": 200, "query": 200, "delete": 204}
+
+
+#################################################
+# @summarize: turns latency samples and a wall  #
+# time into one result entry; without a wall    #
+# time ops_per_sec is None                      #
+# returns: a dict                               #
+#################################################
+def summarize(group: str, name: str, size: int, operations: int, elapsed, latencies: list, errors: int = 0) -> dict:
+    return {
+        "group": group,
+        "name": name,
+        "size": size,
+        "operations": operations,
+        "ops_per_sec": None if elapsed is None else operations / elapsed if elapsed else 0.0,
+        "p50_us": percentile(latencies, 0.5) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "errors": errors,
+    }
+
+
+#################################################
+# @time_calls: runs func repeatedly in batches  #
+# so that even sub-microsecond calls are timed  #
+# above the clock resolution                    #
+# returns: (calls, elapsed, per-call latencies) #
+#################################################
+def time_calls(func, min_time: float, batch: int) -> tuple:
+    latencies = []
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        batch_start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        batch_end = time.perf_counter()
+        latencies.append((batch_end - batch_start) / batch)
+        calls += batch
+        if batch_end - start >= min_time and len(latencies) >= 5:
+            return calls, batch_end - start, latencies
+
+
+def run_analysis(args) -> list:
+    rng = random.Random(0)
+    results = []
+    for size in args.analysis_sizes:
+        value = "".join(rng.choice(ALPHABET) for _ in range(size))
+        batch = max(1, 100_000 // max(size, 1))
+        for method in FACTORY_METHODS:
+            # A fresh factory per call, so that memoized results are not reused
+            calls, elapsed, latencies = time_calls(
+                lambda: getattr(StringFactory(value), method)(), args.min_time, batch
+            )
+            results.append(summarize("analysis", method, size, calls, elapsed, latencies))
+    return results
+
+
+async def _store_operations(store: LocalDataStore, records: list, args) -> list:
+    size = len(records)
+    rng = random.Random(1)
+    results = []
+
+    latencies = []
+    start = time.perf_counter()
+    for digest, record in records:
+        call_start = time.perf_counter()
+        await store.commit_to_db(digest, record)
+        latencies.append(time.perf_counter() - call_start)
+    results.append(summarize("store", "commit", size, size, time.perf_counter() - start, latencies))
+
+    lookups = [rng.choice(records)[0] for _ in range(min(size, args.store_lookups))]
+    latencies = []
+    start = time.perf_counter()
+    for digest in lookups:
+        call_start = time.perf_counter()
+        await store.retrieve_from_db(digest)
+        latencies.append(time.perf_counter() - call_start)
+    results.append(summarize("store", "retrieve", size, len(lookups), time.perf_counter() - start, latencies))
+
+    plans = [build_plan(filters, match) for filters, match in QUERY_FILTERS]
+    latencies = []
+    start = time.perf_counter()
+    for plan in plans * args.store_query_rounds:
+        call_start = time.perf_counter()
+        await store.query_keys(plan)
+        latencies.append(time.perf_counter() - call_start)
+    results.append(summarize("store", "query", size, len(latencies), time.perf_counter() - start, latencies))
+
+    deletions = rng.sample(records, min(size, args.store_lookups))
+    latencies = []
+    start = time.perf_counter()
+    for digest, _ in deletions:
+        call_start = time.perf_counter()
+        await store.delete_from_db(digest)
+        latencies.append(time.perf_counter() - call_start)
+    results.append(summarize("store", "delete", size, len(deletions), time.perf_counter() - start, latencies))
+    return results
+
+
+def run_store(args) -> list:
+    results = []
+    for size in args.store_sizes:
+        records = [make_record(value) for value in random_strings(size, seed=size)]
+        results += asyncio.run(_store_operations(LocalDataStore(), records, args))
+        del records
+    return results
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("post", "get", "query", "delete"):
+            raise ValueError(f"unknown operation in --mix: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+async def _api_load(app, args) -> list:
+    rng = random.Random(2)
+    stored = random_strings(args.preload, seed=5)
+    for value in stored:
+        status_code, _ = await asgi_request(app, "POST", "/strings", body=json.dumps({"value": value}).encode())
+        if status_code != 201:
+            raise RuntimeError(f"preloading {value!r} answered {status_code}")
+    fresh = iter(random_strings(args.requests, seed=6, min_length=41, max_length=80))
+
+    mix = parse_mix(args.mix)
+    operations = rng.choices(list(mix), weights=list(mix.values()), k=args.requests)
+    latencies = {name: [] for name in mix}
+    errors = {name: 0 for name in mix}
+    queue = iter(operations)
+
+    async def worker():
+        for operation in queue:
+            if operation == "post":
+                value = next(fresh)
+                request = ("POST", "/strings", b"", json.dumps({"value": value}).encode())
+            elif operation == "get":
+                request = ("GET", f"/strings/{rng.choice(stored)}", b"", b"")
+            elif operation == "query":
+                filters, match = rng.choice(QUERY_FILTERS)
+                query = {key: str(value).lower() for key, value in filters.items()}
+                query.update(match=match, limit=str(args.page_size))
+                request = ("GET", "/strings", urlencode(query).encode(), b"")
+            else:
+                value = stored.pop(rng.randrange(len(stored)))
+                request = ("DELETE", f"/strings/{value}", b"", b"")
+            start = time.perf_counter()
+            status_code, _ = await asgi_request(app, request[0], request[1], query_string=request[2], body=request[3])
+            latencies[operation].append(time.perf_counter() - start)
+            if status_code != EXPECTED_STATUS[operation]:
+                errors[operation] += 1
+            elif operation == "post":
+                # Only offered to GET and DELETE once it is stored
+                stored.append(value)
+            # The in-process transport may never suspend; let the other workers run
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    results = [summarize("api", "mixed", args.preload, args.requests, elapsed, sum(latencies.values(), []),
+                         sum(errors.values()))]
+    for name, samples in latencies.items():
+        if samples:
+            # The operations ran interleaved, so none has a wall time of its own
+            results.append(summarize("api", name, args.preload, len(samples), None, samples, errors[name]))
+    return results
+
+
+def run_api(args) -> list:
+    from main import app
+    return asyncio.run(_api_load(app, args))
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "argv": sys.argv[1:],
+    }
+
+
+def run(args):
+    groups = {"analysis": run_analysis, "store": run_store, "api": run_api}
+    report = {"meta": metadata(), "results": [], "peak_rss_bytes": {}}
+    for group in args.groups:
+        report["results"] += groups[group](args)
+        report["peak_rss_bytes"][group] = peak_rss_bytes()
+        print(f"{group}: done, peak RSS {report['peak_rss_bytes'][group] / (1 << 20):.0f} MiB", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+
+    failed = [result for result in report["results"] if result["errors"]]
+    for result in failed:
+        print(f"{result['group']}/{result['name']}: {result['errors']} of {result['operations']} requests "
+              f"got an unexpected status", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+def compare(args):
+    with open(args.baseline) as baseline_file, open(args.candidate) as candidate_file:
+        baseline = json.load(baseline_file)
+        candidate = json.load(candidate_file)
+
+    key = lambda result: (result["group"], result["name"], result["size"])
+    baseline_results = {key(result): result for result in baseline["results"]}
+    regressions = 0
+    print(f"{'benchmark':<44} {'ops/s':>12} {'change':>8} {'p99 us':>12} {'change':>8}")
+    for result in candidate["results"]:
+        before = baseline_results.get(key(result))
+        if before is None:
+            continue
+        if result["ops_per_sec"] is not None and before.get("ops_per_sec"):
+            throughput_change = (result["ops_per_sec"] / before["ops_per_sec"] - 1) * 100
+            throughput = f"{result['ops_per_sec']:>12.1f} {throughput_change:>+7.1f}%"
+        else:
+            throughput_change = 0.0
+            throughput = f"{'-':>12} {'':>8}"
+        p99_change = (result["p99_us"] / before["p99_us"] - 1) * 100 if before["p99_us"] else 0.0
+        errors = result.get("errors", 0)
+        regressed = throughput_change < -args.threshold or p99_change > args.threshold or errors > 0
+        regressions += regressed
+        name = f"{result['group']}/{result['name']}@{result['size']}"
+        flags = (f"  {errors} ERRORS" if errors else "") + ("  REGRESSION" if regressed else "")
+        print(f"{name:<44} {throughput} {result['p99_us']:>12.1f} {p99_change:>+7.1f}%{flags}")
+
+    for group, peak in candidate.get("peak_rss_bytes", {}).items():
+        before = baseline.get("peak_rss_bytes", {}).get(group)
+        if before:
+            print(f"peak RSS after {group}: {peak / (1 << 20):.0f} MiB ({(peak / before - 1) * 100:+.1f}%)")
+    if regressions:
+        print(f"{regressions} regression(s) beyond {args.threshold}%")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write a JSON report")
+    run_parser.add_argument("--groups", nargs="+", choices=["analysis", "store", "api"], default=["analysis", "store", "api"])
+    run_parser.add_argument("--output", help="report file (default: stdout)")
+    run_parser.add_argument("--analysis-sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent on each analysis benchmark")
+    run_parser.add_argument("--store-sizes", type=int, nargs="+", default=[10_000, 100_000])
+    run_parser.add_argument("--store-lookups", type=int, default=10_000, help="retrieves and deletes per store size")
+    run_parser.add_argument("--store-query-rounds", type=int, default=5)
+    run_parser.add_argument("--preload", type=int, default=10_000, help="strings stored before the API load")
+    run_parser.add_argument("--requests", type=int, default=5_000, help="API requests in the mixed load")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="concurrent in-process API clients")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. post=20,get=50,query=20,delete=10")
+    run_parser.add_argument("--page-size", type=int, default=50, help="limit of the filtered queries")
+
+    compare_parser = commands.add_parser("compare", help="compare two reports and flag regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
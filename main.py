@@ -1,14 +1,25 @@
 from fastapi import FastAPI, Request, HTTPException, status
-import httpx
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from src.string_model import StringPayload
-from src.query_validator import get_validated_filters
-from src.create_string import create_and_save_string, get_payload_by_id, delete_payload_by_id, get_by_query
+from src.create_string import create_and_save_string, get_encoded_payload_by_id, delete_payload_by_id, get_by_query, get_matching_ids, paginate_ids
+from src.query_stream import join_json, stream_json, stream_ndjson
+from src.query_planner import MATCH_MODES
+from src.batch_ingest import create_and_save_batch, parse_batch_body
+from src.stream_ingest import create_and_save_stream
+from src.bulk_access import delete_strings, lookup_strings
+from src.natural_language import parse_natural_language_query
+from src.string_record import parse_fields
+from src.config import DB_INSTANCE_POOL, METRICS_ENABLED, QUERY_RESULT_CACHE, STORE_WARMUP
+from src.metrics import MetricsMiddleware, render_metrics, stage_timer
+from src.startup import WARMUP, WarmupGate, lifespan
+from src.store_stats import TOP_CHARACTERS
 from pydantic import ValidationError
-import json
-from typing import Optional
-import ast
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+if STORE_WARMUP == 'background':
+    app.add_middleware(WarmupGate)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 ###########################################################################################
 # Creates a new string payload in the system.                                            #
@@ -22,18 +33,19 @@ app = FastAPI()
 #     HTTPException: If the input payload is invalid, raises a 422 error.                #
 #                                                                                         #
 # Returns:                                                                                #
-#     Dict: The created string payload.                                                   #
+#     Response: The created string payload, encoded off the event loop.                   #
 ###########################################################################################
 @app.post('/strings', status_code=201)
 async def create_string(payload: dict):
     try:
-        # Validate the input payload against the StringPayload model
-        data = StringPayload(**payload)
-        # Ensure the string value does not already exist in the system
-        StringPayload.validate_existence(data.value)
+        with stage_timer('validation'):
+            # Validate the input payload against the StringPayload model
+            data = StringPayload(**payload)
+            # Ensure the string value does not already exist in the system
+            StringPayload.validate_existence(data.value)
         # Save the validated payload and return the response
-        response_payload = await create_and_save_string(data)
-        return response_payload
+        encoded_payload = await create_and_save_string(data)
+        return Response(content=encoded_payload, status_code=201, media_type="application/json")
     except ValidationError:
         # Raise an error if the input payload is invalid
         raise HTTPException(
@@ -42,6 +54,194 @@ async def create_string(payload: dict):
         )
 
 
+###########################################################################################
+# Creates many string payloads in one request.                                            #
+# The body is a JSON array, or NDJSON when sent as application/x-ndjson, of strings or    #
+# {"value": ...} objects. Every item gets its own status, so a duplicate or blank item    #
+# does not fail the rest of the batch.                                                    #
+#                                                                                         #
+# Raises:                                                                                 #
+#     HTTPException: If the body is not a JSON array or valid NDJSON, raises a 400 error. #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: The per-item results in request order and the number of items per status.     #
+###########################################################################################
+@app.post('/strings/batch', status_code=200)
+async def create_strings_batch(request: Request):
+    try:
+        items = parse_batch_body(await request.body(), request.headers.get('content-type', ''))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid request body (must be a JSON array or NDJSON)'
+        )
+
+    results = await create_and_save_batch(items)
+    summary = {"created": 0, "conflicts": 0, "invalid": 0}
+    for result in results:
+        if result["status"] == 201:
+            summary["created"] += 1
+        elif result["status"] == 409:
+            summary["conflicts"] += 1
+        else:
+            summary["invalid"] += 1
+    return {"results": results, **summary}
+
+
+###########################################################################################
+# Creates a new string from a raw UTF-8 request body, e.g. a large text file sent as      #
+# text/plain. The body is analyzed while it streams in instead of being parsed as JSON   #
+# first, so memory use stays close to the size of the stored string.                      #
+#                                                                                         #
+# Raises:                                                                                 #
+#     HTTPException: 400 if the body is blank, 422 if it is not UTF-8 text, 409 if the    #
+#     string already exists.                                                              #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: The created string payload.                                                   #
+###########################################################################################
+@app.post('/strings/stream', status_code=201)
+async def create_string_stream(request: Request):
+    encoded_payload = await create_and_save_stream(request.stream())
+    return Response(content=encoded_payload, status_code=201, media_type="application/json")
+
+
+###########################################################################################
+# Looks up many strings in one request. The body is a JSON array, or NDJSON when sent as  #
+# application/x-ndjson, of string values or ids (or {"value": ...} objects). Keys are     #
+# resolved and read in one pass instead of one GET /strings/{string_value} per string.    #
+#                                                                                         #
+# Args:                                                                                   #
+#     exists_only (str): "true" to only report which strings exist, without payloads.     #
+#                                                                                         #
+# Raises:                                                                                 #
+#     HTTPException: If the body is not a JSON array or valid NDJSON, raises a 400 error. #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: The per-item results in request order (200 with the payload, 404 or 422) and  #
+#     the number of items per status.                                                     #
+###########################################################################################
+@app.post('/strings/lookup', status_code=200)
+async def lookup_strings_batch(request: Request):
+    try:
+        items = parse_batch_body(await request.body(), request.headers.get('content-type', ''))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid request body (must be a JSON array or NDJSON)'
+        )
+    exists_only = request.query_params.get('exists_only', 'false').lower() == 'true'
+    return Response(content=await lookup_strings(items, exists_only), media_type="application/json")
+
+
+###########################################################################################
+# Deletes many strings in one request. The body has the same format as                   #
+# POST /strings/lookup; strings that do not exist are reported per item instead of        #
+# failing the request.                                                                    #
+#                                                                                         #
+# Raises:                                                                                 #
+#     HTTPException: If the body is not a JSON array or valid NDJSON, raises a 400 error. #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: The per-item results in request order (204, 404 or 422) and the number of    #
+#     items per status.                                                                   #
+###########################################################################################
+@app.post('/strings/delete', status_code=200)
+async def delete_strings_batch(request: Request):
+    try:
+        items = parse_batch_body(await request.body(), request.headers.get('content-type', ''))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid request body (must be a JSON array or NDJSON)'
+        )
+    return await delete_strings(items)
+
+
+###########################################################################################
+# Reports aggregate statistics of the stored strings: totals, palindrome counts, length   #
+# and word count histograms and the most common characters. The memory store keeps them  #
+# up to date on every write, so the response does not scan the strings.                  #
+#                                                                                         #
+# Args:                                                                                   #
+#     top (str): The number of most common characters to list (default 10).              #
+#                                                                                         #
+# Raises:                                                                                 #
+#     HTTPException: If top is not a non-negative integer, raises a 400 error.            #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: The statistics (see store_stats.py).                                          #
+###########################################################################################
+@app.get('/strings/stats', status_code=200)
+async def get_strings_stats(request: Request):
+    try:
+        top = int(request.query_params.get('top', TOP_CHARACTERS))
+        if top < 0:
+            raise ValueError('top must not be negative')
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid query parameters"
+        )
+    with stage_timer('store'):
+        stats = await DB_INSTANCE_POOL.stats()
+    return stats.to_payload(top)
+
+
+###########################################################################################
+# Filters strings with a natural language query such as                                   #
+# "single word palindromic strings longer than 10 characters containing z".               #
+# The query is parsed into the same filters GET /strings accepts; parsed queries are      #
+# cached, so a repeated query costs no more than a structured one.                        #
+#                                                                                         #
+# Args:                                                                                   #
+#     query (str): The natural language description of the filters.                      #
+#     limit (str): The maximum number of matches to return in one page.                   #
+#     cursor (str): The "next_cursor" of the previous page.                               #
+#                                                                                         #
+# Raises:                                                                                 #
+#     HTTPException: If the query cannot be parsed, raises a 400 error.                   #
+#     HTTPException: If the parsed filters conflict, raises a 422 error.                  #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: One page of matches, the total count, the interpreted query and next cursor.  #
+###########################################################################################
+@app.get('/strings/filter-by-natural-language', status_code=200)
+async def query_string_by_natural_language(request: Request):
+    query_params = request.query_params
+    query = query_params.get('query')
+    try:
+        if query is None:
+            raise ValueError('Missing query')
+        param_dict = parse_natural_language_query(query)
+        limit = query_params.get('limit')
+        if limit is not None:
+            limit = int(limit)
+        matching_ids = await get_matching_ids(param_dict, 'all')
+        page_ids, next_cursor = paginate_ids(matching_ids, limit, query_params.get('cursor'))
+    except LookupError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Query parsed but resulted in conflicting filters"
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unable to parse natural language query"
+        )
+
+    trailer = {
+        "count": len(matching_ids),
+        "interpreted_query": {
+            "original": query,
+            "parsed_filters": param_dict,
+        },
+        "next_cursor": next_cursor,
+    }
+    data = [payload async for payload in get_by_query(page_ids)]
+    return Response(content=join_json(data, trailer), media_type="application/json")
+
+
 ###########################################################################################
 # Retrieves a string payload from the system based on the provided string value.          #
 # The function attempts to locate the payload using the given string value and returns    #
@@ -49,22 +249,33 @@ async def create_string(payload: dict):
 #                                                                                         #
 # Args:                                                                                   #
 #     string_value (str): The string value to identify the payload to be retrieved.       #
+#     fields (str): Comma separated payload keys (id, value, properties, created_at)      #
+#     and property names to return instead of the whole payload.                          #
 #                                                                                         #
 # Raises:                                                                                 #
+#     HTTPException: If "fields" names an unknown field, raises a 400 error.              #
 #     HTTPException: If the string does not exist in the system, raises a 404 error.      #
 #                                                                                         #
 # Returns:                                                                                #
 #     Dict: The payload associated with the provided string value.                        #
 ###########################################################################################
 @app.get('/strings/{string_value}', status_code=200)
-async def get_string(string_value: str):
-    fetched_payload = await get_payload_by_id(string_value)
+async def get_string(string_value: str, request: Request):
+    try:
+        fields = parse_fields(request.query_params.get('fields'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid query parameters"
+        )
+    # The record keeps its encoded payload, so the bytes are sent as they are
+    fetched_payload = await get_encoded_payload_by_id(string_value, fields)
     if fetched_payload is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="String does not exist in the system"
         )
-    return fetched_payload
+    return Response(content=fetched_payload, media_type="application/json")
 
 
 
@@ -77,10 +288,18 @@ async def get_string(string_value: str):
 #    max_length (str): The maximum length of the string.                                  #
 #    word_count (str): The number of words the string should contain.                     #
 #    contains_character (str): A specific character that the string must contain.         #
+#    contains (str): A substring the string must contain, matched case-insensitively.     #
+#    match (str): "all" (default) to require every filter, "any" to require at least one. #
+#    limit (str): The maximum number of matches to return in one page.                    #
+#    cursor (str): The "next_cursor" of the previous page.                                #
+#    stream (str): "ndjson" or "json" to stream the page instead of buffering it.         #
+#    fields (str): Comma separated payload keys and property names to return per match.   #
 # Raises:                                                                                 #
 #     HTTPException: If any of the query parameters are empty or invalid.                 #
 # Returns:                                                                                #
-#     List[Dict]: A list of dictionaries containing the query results.                    #
+#     Dict: One page of matches, the total count, the filters and the next cursor.        #
+#     With "stream", a chunked response; for NDJSON the count and next cursor are sent    #
+#     in the X-Total-Count and X-Next-Cursor headers.                                     #
 ###########################################################################################
 
 @app.get('/strings')
@@ -118,22 +337,107 @@ async def query_string(request: Request):
                     detail="Invalid query parameters"
                 )
 
+        contains = query_params.get('contains')
+        if contains is not None:
+            # Stored values are lowercase, so the substring is matched case-insensitively
+            if len(contains) > 0:
+                param_dict['contains'] = contains.lower()
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid query parameters"
+                )
+
+        match = query_params.get('match', 'all')
+        if match not in MATCH_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid query parameters"
+            )
+
+        limit = query_params.get('limit')
+        if limit is not None:
+            limit = int(limit)
+        cursor = query_params.get('cursor')
+
+        stream = query_params.get('stream')
+        if stream is not None and stream not in ('ndjson', 'json'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid query parameters"
+            )
+
+        fields = parse_fields(query_params.get('fields'))
+
         # Validate and process the parameters
         #converted_payload_dict = get_validated_filters(param_dict)
-        query_results = await get_by_query(param_dict)
-        response = {
-            "data": query_results,
-            "count": len(query_results),
+        matching_ids = await get_matching_ids(param_dict, match)
+        page_ids, next_cursor = paginate_ids(matching_ids, limit, cursor)
+        query_results = get_by_query(page_ids, fields)
+
+        if stream == 'ndjson':
+            headers = {"X-Total-Count": str(len(matching_ids))}
+            if next_cursor is not None:
+                headers["X-Next-Cursor"] = next_cursor
+            return StreamingResponse(stream_ndjson(query_results), media_type="application/x-ndjson", headers=headers)
+
+        trailer = {
+            "count": len(matching_ids),
             "filters_applied": param_dict,
+            "match": match,
+            "next_cursor": next_cursor,
         }
+        if stream == 'json':
+            return StreamingResponse(stream_json(query_results, trailer), media_type="application/json")
 
-        return response
+        data = [payload async for payload in query_results]
+        return Response(content=join_json(data, trailer), media_type="application/json")
     except (ValueError, TypeError):
          raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Invalid query parameters"
                 )
 
+###########################################################################################
+# Reports the GET /strings query result cache counters.                                   #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: Whether the cache is enabled and its size, hit, miss, eviction and            #
+#     invalidation counters.                                                              #
+###########################################################################################
+@app.get('/cache/stats', status_code=200)
+async def query_cache_stats():
+    if QUERY_RESULT_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **QUERY_RESULT_CACHE.stats()}
+
+###########################################################################################
+# Exposes request latencies, stage timings, query counts, the store size, memory use and  #
+# the query result cache counters in the Prometheus text format.                          #
+###########################################################################################
+@app.get('/metrics', status_code=200)
+async def metrics():
+    store_strings = await DB_INSTANCE_POOL.count()
+    return PlainTextResponse(render_metrics(store_strings, QUERY_RESULT_CACHE), media_type="text/plain; version=0.0.4")
+
+###########################################################################################
+# Reports whether the store has finished warming up and the app serves every route. It    #
+# answers as soon as the server starts, also while STRING_STORE_WARMUP=background loads   #
+# the persisted strings.                                                                  #
+#                                                                                         #
+# Returns:                                                                                #
+#     Dict: {"ready": true} with 200 once warm, {"ready": false} with 503 before (with    #
+#     the reason if the warm-up failed).                                                  #
+###########################################################################################
+@app.get('/ready', status_code=200)
+async def ready():
+    if WARMUP.ready.is_set():
+        return {"ready": True}
+    content = {"ready": False}
+    if WARMUP.error is not None:
+        content["detail"] = f"Store warm-up failed: {WARMUP.error}"
+    return JSONResponse(content=content, status_code=503)
+
 @app.delete('/strings/{string_value}', status_code=204)
 ###########################################################################################
 # Deletes a string payload from the system based on the provided string value.            #
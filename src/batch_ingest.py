@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+
+from .config import BATCH_CHUNK_SIZE, DB_INSTANCE_POOL
+from .executor import run_cpu_bound
+from .metrics import stage_timer
+from .string_analysis import analyze_string
+from .string_record import StringRecord
+
+
+###########################################################################################
+# Parses the body of POST /strings/batch.                                                 #
+# The body is either a JSON array or newline-delimited JSON (one item per line). Each     #
+# item is either a string or an object with a "value" field.                              #
+#                                                                                         #
+# Args:                                                                                   #
+#     body (bytes): The raw request body.                                                 #
+#     content_type (str): The Content-Type header of the request.                         #
+#                                                                                         #
+# Returns:                                                                                #
+#     list: The items, in request order. Items are not validated here.                    #
+#                                                                                         #
+# Raises:                                                                                 #
+#     ValueError: If the body is not a JSON array or valid NDJSON.                        #
+###########################################################################################
+def parse_batch_body(body: bytes, content_type: str) -> list:
+    if 'ndjson' in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    items = json.loads(body)
+    if not isinstance(items, list):
+        raise ValueError('The batch body must be a JSON array')
+    return items
+
+
+###########################################################################################
+# Analyzes a chunk of strings. Module level so that it can run in a worker process.       #
+#                                                                                         #
+# Args:                                                                                   #
+#     values (list): The strings to analyze, not yet lowercased.                          #
+#                                                                                         #
+# Returns:                                                                                #
+#     list: One StringAnalysis per value, or None for a value that cannot be analyzed     #
+#     (e.g. a lone surrogate, which has no UTF-8 encoding to hash).                       #
+###########################################################################################
+def analyze_chunk(values: list) -> list:
+    return [_analyze_item(value) for value in values]
+
+
+def _analyze_item(value: str):
+    try:
+        return analyze_string(value.lower())
+    except UnicodeError:
+        return None
+
+
+###########################################################################################
+# Creates and saves every string of a batch.                                              #
+#                                                                                         #
+# Items are validated without pydantic, analyzed chunk by chunk and each chunk is         #
+# committed under one store lock acquisition. Every chunk goes through run_cpu_bound,     #
+# sized by its total characters rather than its item count, so a few large strings are   #
+# offloaded like many small ones; the chunks are dispatched at once, so that a process    #
+# pool analyzes them in parallel while the earlier ones are committed. A failing item    #
+# never fails the batch; it gets its own status instead.                                  #
+#                                                                                         #
+# Args:                                                                                   #
+#     items (list): The parsed items of the request body.                                 #
+#                                                                                         #
+# Returns:                                                                                #
+#     list: One result per item, in request order, with "index" and "status" (201, 400,   #
+#     409 or 422) and either the created "id" or an error "detail".                       #
+###########################################################################################
+async def create_and_save_batch(items: list) -> list:
+    results = [None] * len(items)
+    pending = []
+    for position, item in enumerate(items):
+        value = item.get('value') if isinstance(item, dict) else item
+        if not isinstance(value, str):
+            results[position] = {"index": position, "status": 422, "detail": 'Invalid data type for "value" (must be string)'}
+        elif len(value.strip()) == 0:
+            results[position] = {"index": position, "status": 400, "detail": 'Invalid request body or missing "value" field'}
+        else:
+            pending.append((position, value))
+
+    chunks = [pending[start:start + BATCH_CHUNK_SIZE] for start in range(0, len(pending), BATCH_CHUNK_SIZE)]
+    analyses = [asyncio.ensure_future(_analyze_chunk([value for _, value in chunk])) for chunk in chunks]
+    try:
+        for chunk, analysis in zip(chunks, analyses):
+            with stage_timer('analysis'):
+                chunk_analyses = await analysis
+            with stage_timer('store'):
+                await _commit_chunk(chunk, chunk_analyses, results)
+            # Let other requests run between chunks
+            await asyncio.sleep(0)
+    finally:
+        for analysis in analyses:
+            analysis.cancel()
+
+    return results
+
+
+async def _analyze_chunk(values: list) -> list:
+    return await run_cpu_bound(analyze_chunk, values, size=sum(map(len, values)))
+
+
+async def _commit_chunk(chunk: list, chunk_analyses: list, results: list):
+    created_at = time.time_ns() // 1_000_000
+    analyzed = []
+    records = []
+    for (position, _), analysis in zip(chunk, chunk_analyses):
+        if analysis is None:
+            results[position] = {"index": position, "status": 422, "detail": '"value" is not valid Unicode text'}
+        else:
+            analyzed.append(position)
+            records.append(StringRecord.from_analysis(analysis, created_at))
+    save_statuses = await DB_INSTANCE_POOL.commit_many(records)
+    for position, record, already_exists in zip(analyzed, records, save_statuses):
+        if already_exists:
+            results[position] = {"index": position, "status": 409, "detail": "String already exists in the system"}
+        else:
+            results[position] = {"index": position, "status": 201, "id": record.id}
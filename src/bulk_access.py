@@ -0,0 +1,97 @@
+from .config import DB_INSTANCE_POOL
+from .create_string import encode_record, resolve_digests
+from .json_codec import encode_json
+from .metrics import stage_timer
+
+INVALID_ITEM = 'Invalid data type for "value" (must be string)'
+MISSING_ITEM = 'String does not exist in the system'
+
+
+def _split_items(items: list) -> tuple:
+    results = [None] * len(items)
+    positions = []
+    values = []
+    for position, item in enumerate(items):
+        value = item.get('value') if isinstance(item, dict) else item
+        if isinstance(value, str):
+            positions.append(position)
+            values.append(value)
+        else:
+            results[position] = {"index": position, "status": 422, "detail": INVALID_ITEM}
+    return results, positions, values
+
+
+###########################################################################################
+# Looks up many strings at once for POST /strings/lookup.                                 #
+#                                                                                         #
+# Every key is resolved in one pass (see resolve_digests) and the store is read with one  #
+# mget, or one mexists when only existence is asked for. The found payloads are written   #
+# from the JSON encodings cached on their records (see encode_record), so the response    #
+# is joined from bytes instead of being serialized again.                                 #
+#                                                                                         #
+# Args:                                                                                   #
+#     items (list): The parsed items of the request body: string values or ids, or       #
+#     {"value": ...} objects.                                                             #
+#     exists_only (bool): Leave the payloads out and only report which strings exist.    #
+#                                                                                         #
+# Returns:                                                                                #
+#     bytes: The JSON response: one result per item in request order, with "index" and    #
+#     "status" (200, 404 or 422) and the "data" payload (or the "id" when exists_only),   #
+#     then the "found", "missing" and "invalid" counts.                                   #
+###########################################################################################
+async def lookup_strings(items: list, exists_only: bool = False) -> bytes:
+    results, positions, values = _split_items(items)
+    digests = await resolve_digests(values)
+    with stage_timer('store'):
+        if exists_only:
+            found = await DB_INSTANCE_POOL.mexists(digests)
+        else:
+            found = await DB_INSTANCE_POOL.mget(digests)
+
+    summary = {"found": 0, "missing": 0, "invalid": len(items) - len(positions)}
+    with stage_timer('serialization'):
+        parts = [None] * len(items)
+        for position, result in enumerate(results):
+            if result is not None:
+                parts[position] = encode_json(result)
+        for position, digest, record in zip(positions, digests, found):
+            if record is None or record is False:
+                parts[position] = encode_json({"index": position, "status": 404, "detail": MISSING_ITEM})
+                summary["missing"] += 1
+                continue
+            if exists_only:
+                parts[position] = encode_json({"index": position, "status": 200, "id": digest.hex()})
+            else:
+                encoded_payload = await encode_record(record)
+                parts[position] = b'{"index":%d,"status":200,"data":%s}' % (position, encoded_payload)
+            summary["found"] += 1
+        return b'{"results":[%s],%s' % (b','.join(parts), encode_json(summary)[1:])
+
+
+###########################################################################################
+# Deletes many strings at once for POST /strings/delete, resolving every key in one pass  #
+# and deleting them with one mdelete.                                                     #
+#                                                                                         #
+# Args:                                                                                   #
+#     items (list): The parsed items of the request body: string values or ids, or       #
+#     {"value": ...} objects.                                                             #
+#                                                                                         #
+# Returns:                                                                                #
+#     dict: One result per item in request order, with "index" and "status" (204, 404 or  #
+#     422), then the "deleted", "missing" and "invalid" counts.                           #
+###########################################################################################
+async def delete_strings(items: list) -> dict:
+    results, positions, values = _split_items(items)
+    digests = await resolve_digests(values)
+    with stage_timer('store'):
+        deleted = await DB_INSTANCE_POOL.mdelete(digests)
+
+    summary = {"deleted": 0, "missing": 0, "invalid": len(items) - len(positions)}
+    for position, was_deleted in zip(positions, deleted):
+        if was_deleted:
+            results[position] = {"index": position, "status": 204}
+            summary["deleted"] += 1
+        else:
+            results[position] = {"index": position, "status": 404, "detail": MISSING_ITEM}
+            summary["missing"] += 1
+    return {"results": results, **summary}
@@ -1,6 +1,135 @@
+import os
+
 from .local_data_store import LocalDataStore
+from .query_cache import QueryResultCache
+
+#############################################
+# Store backend                             #
+# STORE_BACKEND: "memory" (one process) or  #
+# "sqlite" (shared by uvicorn workers)      #
+# STORE_SQLITE_PATH: the SQLite file        #
+# STORE_SQLITE_THREADS: threads running the #
+# blocking sqlite3 calls off the event loop #
+# STORE_SHARDS: lock stripes of the memory  #
+# store, from 1 to 256                      #
+# STORE_TRIGRAM_MAX_LENGTH: longest value   #
+# the memory store indexes for substring    #
+# queries; 0 scans every value              #
+#############################################
+STORE_BACKEND = os.environ.get('STRING_STORE_BACKEND', 'memory')
+STORE_SQLITE_PATH = os.environ.get('STRING_STORE_SQLITE_PATH', 'strings.sqlite3')
+STORE_SQLITE_THREADS = int(os.environ.get('STRING_STORE_SQLITE_THREADS', '4'))
+STORE_SHARDS = int(os.environ.get('STRING_STORE_SHARDS', '16'))
+STORE_TRIGRAM_MAX_LENGTH = int(os.environ.get('STRING_STORE_TRIGRAM_MAX_LENGTH', '1024'))
+
+#############################################
+# Optional persistence of the memory store  #
+# STORE_DATA_DIR: directory for the log and #
+# snapshots; unset keeps the store in memory#
+# only                                      #
+# STORE_FSYNC_INTERVAL_MS: group commit     #
+# window; 0 fsyncs every write              #
+# STORE_SNAPSHOT_EVERY: logged writes       #
+# between snapshots; 0 disables them        #
+# STORE_WARMUP: "blocking" loads the data   #
+# before the app serves; "background" loads #
+# it while /ready answers 503 (startup.py)  #
+#############################################
+STORE_DATA_DIR = os.environ.get('STRING_STORE_DATA_DIR')
+STORE_FSYNC_INTERVAL_MS = int(os.environ.get('STRING_STORE_FSYNC_INTERVAL_MS', '50'))
+STORE_SNAPSHOT_EVERY = int(os.environ.get('STRING_STORE_SNAPSHOT_EVERY', '100000'))
+STORE_WARMUP = os.environ.get('STRING_STORE_WARMUP', 'blocking')
+if STORE_WARMUP not in ('blocking', 'background'):
+    raise ValueError(f'Unknown STRING_STORE_WARMUP: {STORE_WARMUP}')
 
 #############################################
 # Local database instance Global in scope   #
+# Creating it touches no file: the SQLite   #
+# schema is created on first connection and #
+# persisted data is loaded by the lifespan  #
+# hook in startup.py                        #
 ############################################
-DB_INSTANCE_POOL = LocalDataStore()
\ No newline at end of file
+if STORE_BACKEND == 'sqlite':
+    from .sqlite_data_store import SQLiteDataStore
+    DB_INSTANCE_POOL = SQLiteDataStore(STORE_SQLITE_PATH, threads=STORE_SQLITE_THREADS)
+elif STORE_BACKEND == 'memory':
+    DB_INSTANCE_POOL = LocalDataStore(STORE_SHARDS, STORE_TRIGRAM_MAX_LENGTH)
+else:
+    raise ValueError(f'Unknown STRING_STORE_BACKEND: {STORE_BACKEND}')
+
+#############################################
+# GET /strings query result cache           #
+# QUERY_CACHE_ENTRIES: cached queries; 0    #
+# disables the cache                        #
+# QUERY_CACHE_MAX_BYTES: total size of the  #
+# cached id sets                            #
+# Only the memory store reports its writes; #
+# the SQLite file can be written by other   #
+# workers, so it is never cached            #
+#############################################
+QUERY_CACHE_ENTRIES = int(os.environ.get('STRING_QUERY_CACHE_ENTRIES', '256'))
+QUERY_CACHE_MAX_BYTES = int(os.environ.get('STRING_QUERY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+if STORE_BACKEND == 'memory' and QUERY_CACHE_ENTRIES > 0:
+    QUERY_RESULT_CACHE = QueryResultCache(QUERY_CACHE_ENTRIES, QUERY_CACHE_MAX_BYTES)
+    DB_INSTANCE_POOL.query_cache = QUERY_RESULT_CACHE
+else:
+    QUERY_RESULT_CACHE = None
+
+#############################################
+# GET /strings pagination                   #
+# QUERY_DEFAULT_LIMIT: page size when the   #
+# request gives no limit                    #
+# QUERY_MAX_LIMIT: largest accepted limit   #
+#############################################
+QUERY_DEFAULT_LIMIT = int(os.environ.get('STRING_QUERY_DEFAULT_LIMIT', '100'))
+QUERY_MAX_LIMIT = int(os.environ.get('STRING_QUERY_MAX_LIMIT', '1000'))
+
+#############################################
+# POST /strings/batch tuning                #
+# BATCH_CHUNK_SIZE: strings analyzed and    #
+# committed per store lock acquisition      #
+#############################################
+BATCH_CHUNK_SIZE = int(os.environ.get('STRING_BATCH_CHUNK_SIZE', '1000'))
+
+#############################################
+# CPU-bound work offloading (executor.py)   #
+# ANALYSIS_EXECUTOR: "thread", "process" or #
+# "inline" (never offload); threads still   #
+# share the GIL with the event loop (see    #
+# run_cpu_bound)                            #
+# ANALYSIS_INLINE_MAX_CHARS: inputs shorter #
+# than this always run inline               #
+# ANALYSIS_THREAD_WORKERS: thread pool size #
+# (None for the ThreadPoolExecutor default) #
+# PROCESS_POOL_WORKERS: process pool size   #
+# (defaults to the CPU count)               #
+#############################################
+ANALYSIS_EXECUTOR = os.environ.get('STRING_ANALYSIS_EXECUTOR', 'thread')
+ANALYSIS_INLINE_MAX_CHARS = int(os.environ.get('STRING_ANALYSIS_INLINE_MAX_CHARS', str(64 * 1024)))
+ANALYSIS_THREAD_WORKERS = int(os.environ.get('STRING_ANALYSIS_THREAD_WORKERS', '0')) or None
+PROCESS_POOL_WORKERS = int(os.environ.get('STRING_PROCESS_POOL_WORKERS', '0')) or os.cpu_count()
+
+#############################################
+# GET/DELETE /strings/{string_value} keys   #
+# KEY_MEMO_SIZE: recent value to digest     #
+# mappings kept; 0 disables the memo        #
+# KEY_MEMO_MAX_CHARS: longer values are     #
+# always hashed, never memoized             #
+#############################################
+KEY_MEMO_SIZE = int(os.environ.get('STRING_KEY_MEMO_SIZE', '4096'))
+KEY_MEMO_MAX_CHARS = int(os.environ.get('STRING_KEY_MEMO_MAX_CHARS', '256'))
+
+#############################################
+# Instrumentation (metrics.py)              #
+# METRICS_ENABLED: request and stage        #
+# timings served at /metrics; 0 disables    #
+# PROFILE_SLOW_MS: requests at least this   #
+# slow dump a sampled profile; 0 disables   #
+# PROFILE_INTERVAL_MS: sampling interval    #
+# PROFILE_DIR: where profiles are written   #
+#############################################
+METRICS_ENABLED = os.environ.get('STRING_METRICS_ENABLED', '1') != '0'
+PROFILE_SLOW_MS = float(os.environ.get('STRING_PROFILE_SLOW_MS', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('STRING_PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.environ.get('STRING_PROFILE_DIR', 'profiles')
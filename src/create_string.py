@@ -1,96 +1,311 @@
+import hashlib
+import heapq
+import re
+from functools import lru_cache
+from fastapi import HTTPException, status
 from .string_factory import StringFactory
 from .string_model import StringPayload
-from .config import DB_INSTANCE_POOL
+from .config import (DB_INSTANCE_POOL, KEY_MEMO_MAX_CHARS, KEY_MEMO_SIZE, QUERY_DEFAULT_LIMIT, QUERY_MAX_LIMIT,
+                     QUERY_RESULT_CACHE)
+from .executor import run_cpu_bound
+from .json_codec import encode_json
+from .metrics import count_query, stage_timer
+from .query_planner import build_plan
 
+HEX_ID = re.compile(r'[0-9a-fA-F]{64}')
 
 
 ##################################################################################
 #    Asynchronously creates and saves a string payload.                          #
 #                                                                                #
-#    This function takes a `StringPayload` object, uses it to create an instance #
-#    of `StringFactory`, generates a response payload, and returns the stored    #
-#    payload as a dictionary.                                                    #
-#                                                                                #       
+#    This function takes a `StringPayload` object, analyzes its value and builds #
+#    the encoded response through the executor layer, so that neither a large   #
+#    string's analysis nor its character frequency map blocks the event loop,   #
+#    then stores the record. The frequencies in the response are not memoized    #
+#    on the stored record.                                                       #
+#                                                                                #
 #    Args:                                                                       #
 #        payload (StringPayload): The input payload containing the string value. #
 #                                                                                #
 #    Returns:                                                                    #
-#   dict: The stored response payload generated by the `StringFactory` instance. #
+#        bytes: The JSON encoded response payload.                               #
+#                                                                                #
+#    Raises:                                                                     #
+#        HTTPException: 422 if the value is not valid Unicode text (a lone       #
+#        surrogate), 409 if the string already exists.                           #
 ##################################################################################
-async def create_and_save_string(payload: StringPayload) -> dict:
-    string_factory_instance = StringFactory(payload.value)
-    stored_payload = string_factory_instance.create_response_payload()
-    return stored_payload
+async def create_and_save_string(payload: StringPayload) -> bytes:
+    try:
+        with stage_timer('analysis'):
+            record, encoded_payload = await run_cpu_bound(analyzed_record, payload.value, size=len(payload.value))
+    except UnicodeError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail='"value" is not valid Unicode text'
+        )
+    with stage_timer('store'):
+        await StringFactory.save_record(record)
+    return encoded_payload
+
+
+#################################################
+# @analyzed_record: analyzes a value and builds #
+# its record and encoded payload; the CPU-bound #
+# half of create_and_save_string                #
+# returns: a (StringRecord, bytes) tuple        #
+#################################################
+def analyzed_record(value: str) -> tuple:
+    return StringFactory(value).create_response_payload()
+
+
+#################################################
+# @digest_of: lowercases and hashes a value the #
+# same way the store keys are built, without    #
+# building a StringFactory; short values are    #
+# memoized so hot keys are hashed once          #
+# returns: the 32-byte digest                   #
+#################################################
+def digest_of(value: str) -> bytes:
+    if len(value) <= KEY_MEMO_MAX_CHARS:
+        return _memoized_digest(value)
+    return hashlib.sha256(value.lower().encode('utf-8')).digest()
+
+
+@lru_cache(maxsize=KEY_MEMO_SIZE)
+def _memoized_digest(value: str) -> bytes:
+    return hashlib.sha256(value.lower().encode('utf-8')).digest()
+
+
+#################################################################################
+# Finds the stored record of a path value of GET /strings/{value}.              #
+# A 64-character hex path is first looked up as an id, so clients holding the   #
+# id skip hashing; if no string has that id it is treated as a value. The       #
+# record found by the id lookup is returned as is, not read a second time.      #
+# Args:                                                                         #
+#     string_value (str): The string value or hex id from the path.             #
+# Returns:                                                                      #
+#     StringRecord | None: The stored record, or None if not found.             #
+#################################################################################
+async def find_record(string_value: str):
+    if _is_hex_id(string_value):
+        with stage_timer('store'):
+            found_record = await DB_INSTANCE_POOL.retrieve_from_db(bytes.fromhex(string_value))
+        if found_record is not None:
+            return found_record
+    digest = await _hashed_digest(string_value)
+    with stage_timer('store'):
+        return await DB_INSTANCE_POOL.retrieve_from_db(digest)
+
+
+def _is_hex_id(string_value: str) -> bool:
+    return len(string_value) == 64 and HEX_ID.fullmatch(string_value) is not None
+
+
+async def _hashed_digest(string_value: str) -> bytes:
+    with stage_timer('hashing'):
+        return await run_cpu_bound(digest_of, string_value, size=len(string_value))
+
+
+#################################################################################
+# Resolves the store keys of many values or ids in one pass, like               #
+# find_record: the 64-character hex ids are checked with one mexists call       #
+# and every remaining value is hashed in one executor job.                      #
+# Args:                                                                         #
+#     string_values (list): The string values or hex ids.                       #
+# Returns:                                                                      #
+#     list: The 32-byte digest of each value, in the same order.                #
+#################################################################################
+async def resolve_digests(string_values: list) -> list:
+    digests = [None] * len(string_values)
+    id_positions = [position for position, string_value in enumerate(string_values) if _is_hex_id(string_value)]
+    if id_positions:
+        ids = [bytes.fromhex(string_values[position]) for position in id_positions]
+        for position, digest, exists in zip(id_positions, ids, await DB_INSTANCE_POOL.mexists(ids)):
+            if exists:
+                digests[position] = digest
+
+    pending = [position for position, digest in enumerate(digests) if digest is None]
+    if pending:
+        values = [string_values[position] for position in pending]
+        with stage_timer('hashing'):
+            hashed = await run_cpu_bound(digests_of, values, size=sum(map(len, values)))
+        for position, digest in zip(pending, hashed):
+            digests[position] = digest
+    return digests
+
+
+#################################################
+# @digests_of: digest_of for a list of values,  #
+# so a batch is hashed in one executor job      #
+# returns: the digests in the same order        #
+#################################################
+def digests_of(values: list) -> list:
+    return [digest_of(value) for value in values]
+
+
+#################################################################################
+# Retrieves the JSON encoded payload of a string by its value or id.           #
+# The encoding is cached on the stored record, so repeated lookups of the same  #
+# string skip serialization entirely. A projection is encoded on every call.    #
+# Args:                                                                         #
+#     string_value (str): The string value or hex id to search for.             #
+#     fields (frozenset | None): The fields to keep (see parse_fields).         #
+# Returns:                                                                      #
+#     bytes | None: The JSON encoded payload, or None if not found.             #
+#################################################################################
+async def get_encoded_payload_by_id(string_value: str, fields=None) -> bytes | None:
+    found_record = await find_record(string_value)
+    if found_record is None:
+        return None
+    with stage_timer('serialization'):
+        return await encode_record(found_record, fields)
 
 
 #################################################################################
-# Retrieves a payload from the database by its string value.                    #
-# The string value is hashed using SHA-256 to locate the corresponding payload. #
+# Encodes the payload of a stored record. Counting the character frequencies    #
+# and encoding a large value take time proportional to its length, so they     #
+# run through the executor layer like the analysis of a new string; the        #
+# frequencies and the whole-payload encoding are then memoized on the record.  #
 # Args:                                                                         #
-#     string_value (str): The string value to search for in the database.       #
+#     record (StringRecord): The stored record.                                 #
+#     fields (frozenset | None): The fields to keep (see parse_fields).         #
 # Returns:                                                                      #
-#     dict | None: The found payload as a dictionary, or None if not found.     #
+#     bytes: The JSON encoded payload.                                          #
 #################################################################################
-async def get_payload_by_id(string_value: str) -> dict | None:                  
-    string_factory_instance = StringFactory(string_value)                               
-    generated_hash = string_factory_instance.sha256_hash()                      
-    found_payload = await DB_INSTANCE_POOL.retrieve_from_db(generated_hash)     
-    return found_payload                                                        
+async def encode_record(record, fields=None) -> bytes:
+    if fields is None and record.encoded_payload is not None:
+        return record.encoded_payload
+    frequencies, encoded_payload = await run_cpu_bound(encoded_record, record, fields, size=record.length)
+    # A process pool worker memoized them on its copy of the record
+    if record.frequencies is None:
+        record.frequencies = frequencies
+    if fields is None:
+        record.encoded_payload = encoded_payload
+    return encoded_payload
+
+
+#################################################
+# @encoded_record: the CPU-bound half of        #
+# encode_record                                 #
+# returns: the record's frequencies (None if    #
+# the projection left them out) and the encoded #
+# payload                                       #
+#################################################
+def encoded_record(record, fields) -> tuple:
+    if fields is None:
+        encoded_payload = record.to_json_bytes()
+    else:
+        encoded_payload = encode_json(record.to_payload(fields))
+    return record.frequencies, encoded_payload
 
 
 
 ###########################################################################################
-# Retrieves payloads from the database that match specific query parameters.              #
+# Resolves the ids of the payloads that match specific query parameters.                  #
 # Filters include palindrome status, length range, word count, and character containment. #
-# Args:                                                                                   #  
+# Only the digests are gathered, so the total count is known without building payloads,  #
+# and they are left unsorted: paginate_ids picks out one page without sorting them all.   #
+# Results are served from the query result cache when it is enabled.                      #
+# Args:                                                                                   #
 #     is_palindrome (bool): Whether the string is a palindrome.                           #
 #     min_length (int): The minimum length of the string.                                 #
 #     max_length (int): The maximum length of the string.                                 #
 #     word_count (int): The exact word count of the string.                               #
 #     contains_character (str): A character that must be present in the string.           #
+#     match (str): "all" to require every filter, "any" to require at least one.          #
 # Returns:                                                                                #
-#     list: A list of matching payloads as dictionaries.                                  #  
+#     set: The matching digests. Callers must not modify it; it may be cached.            #
+###########################################################################################
+async def get_matching_ids(converted_payload_dict, match='all') -> set:
+    if QUERY_RESULT_CACHE is not None:
+        cache_key = QUERY_RESULT_CACHE.key(converted_payload_dict, match)
+        cached_ids = QUERY_RESULT_CACHE.get(cache_key)
+        if cached_ids is not None:
+            count_query(match, len(cached_ids))
+            return cached_ids
+        version = QUERY_RESULT_CACHE.version
+
+    with stage_timer('query'):
+        # Plan the filters so the most selective index lookup runs first
+        plan = build_plan(converted_payload_dict, match)
+        matching_ids = await DB_INSTANCE_POOL.query_keys(plan)
+    count_query(match, len(matching_ids))
+    if QUERY_RESULT_CACHE is not None:
+        QUERY_RESULT_CACHE.put(cache_key, plan, matching_ids, version)
+    return matching_ids
+
+
+###########################################################################################
+# Cuts one page out of the matching digests, which are paged in ascending order.          #
+# The cursor is the hex id of the last string of the previous page; the page holds the    #
+# `limit` smallest digests after it. heapq.nsmallest keeps only limit + 1 of them, so a   #
+# page costs one pass over the matches instead of sorting all of them.                    #
+# Args:                                                                                   #
+#     matching_ids (set): The digests returned by get_matching_ids.                       #
+#     limit (int | None): The page size, QUERY_DEFAULT_LIMIT when None and at most        #
+#     QUERY_MAX_LIMIT.                                                                    #
+#     cursor (str | None): The hex id the previous page ended on.                         #
+# Returns:                                                                                #
+#     tuple: The digests of the page in ascending order and the hex cursor of the next    #
+#     page (None on the last page).                                                       #
+# Raises:                                                                                 #
+#     ValueError: If the limit or the cursor is malformed.                                #
+###########################################################################################
+def paginate_ids(matching_ids, limit=None, cursor=None) -> tuple:
+    if limit is None:
+        limit = QUERY_DEFAULT_LIMIT
+    elif not 1 <= limit <= QUERY_MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {QUERY_MAX_LIMIT}')
+    candidates = matching_ids
+    if cursor is not None:
+        if len(cursor) != 64 or any(char not in '0123456789abcdef' for char in cursor):
+            raise ValueError('cursor must be a string id')
+        after = bytes.fromhex(cursor)
+        candidates = (key for key in matching_ids if key > after)
+
+    # One digest past the page tells whether another page follows
+    page_ids = heapq.nsmallest(limit + 1, candidates)
+    next_cursor = None
+    if len(page_ids) > limit:
+        del page_ids[limit:]
+        next_cursor = page_ids[-1].hex()
+    return page_ids, next_cursor
+
+
+###########################################################################################
+# Yields the encoded payloads of one page of a query, in page order.                      #
+# Payloads are encoded one at a time (see encode_record) so that callers can send each    #
+# match before the next one is built.                                                     #
+# Args:                                                                                   #
+#     page_ids (list): The digests returned by paginate_ids.                              #
+#     fields (frozenset | None): The fields to keep in each payload (see parse_fields).  #
+# Yields:                                                                                 #
+#     bytes: The JSON encoding of each matching payload still present in the store.       #
 ###########################################################################################
-async def get_by_query(converted_payload_dict):
-    matching_payload = []
-    ret_db = await DB_INSTANCE_POOL.get_all_db_content()
-
-    # Iterate over the dictionaries (values) in the database result
-    for doc in ret_db.values():
-        value = doc.get('value', '')
-        properties = doc.get('properties', {})
-
-        # Safely retrieve filter values with defaults
-        is_palindrome = properties.get('is_palindrome')
-        length = properties.get('length')
-        word_count = properties.get('word_count')
-        contains_character = converted_payload_dict.get('contains_character', '')
-
-        # Apply filters
-        filters = [
-            is_palindrome == converted_payload_dict['is_palindrome'] if 'is_palindrome' in converted_payload_dict else False,
-            length >= converted_payload_dict['min_length'] if 'min_length' in converted_payload_dict else False,
-            length <= converted_payload_dict['max_length'] if 'max_length' in converted_payload_dict else False,
-            word_count == converted_payload_dict['word_count'] if 'word_count' in converted_payload_dict else False,
-            contains_character in value if 'contains_character' in converted_payload_dict else False
-        ]
-
-        # Check if at least one filter passes
-        if any(filters):
-            matching_payload.append(doc)
-
-    return matching_payload
+async def get_by_query(page_ids, fields=None):
+    for key in page_ids:
+        record = await DB_INSTANCE_POOL.retrieve_from_db(key)
+        # The string may have been deleted since the ids were resolved
+        if record is not None:
+            with stage_timer('serialization'):
+                encoded_payload = await encode_record(record, fields)
+            yield encoded_payload
 
 ###########################################################################################
-# Deletes a payload from the database by its string value.                                #
+# Deletes a payload from the database by its string value or id.                         #
 # The string value is hashed using SHA-256 to locate and delete the corresponding payload.#
 # Args:                                                                                   #      
-#     string_value (str): The string value to delete from the database.                   #
+#     string_value (str): The string value or hex id to delete from the database.         #
 # Returns:                                                                                #          
 #     bool: True if the payload was successfully deleted, False otherwise.                #  
 ###########################################################################################           
 async def delete_payload_by_id(string_value: str) -> bool:
-    string_factory_instance = StringFactory(string_value)
-    generated_hash = string_factory_instance.sha256_hash()
-    payload_state = await DB_INSTANCE_POOL.delete_from_db(generated_hash)
+    if _is_hex_id(string_value):
+        # Deleting by id directly tells whether a string had that id
+        with stage_timer('store'):
+            if await DB_INSTANCE_POOL.delete_from_db(bytes.fromhex(string_value)):
+                return True
+    generated_digest = await _hashed_digest(string_value)
+    with stage_timer('store'):
+        payload_state = await DB_INSTANCE_POOL.delete_from_db(generated_digest)
     return payload_state
\ No newline at end of file
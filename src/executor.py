@@ -0,0 +1,71 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import ANALYSIS_EXECUTOR, ANALYSIS_INLINE_MAX_CHARS, ANALYSIS_THREAD_WORKERS, PROCESS_POOL_WORKERS
+
+_thread_pool = None
+_process_pool = None
+
+
+#################################################
+# @get_thread_pool: the shared thread pool,     #
+# created on first use                          #
+# returns: a ThreadPoolExecutor                 #
+#################################################
+def get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=ANALYSIS_THREAD_WORKERS, thread_name_prefix='string-analysis')
+    return _thread_pool
+
+
+#################################################
+# @get_process_pool: the shared process pool,   #
+# created on first use. Its workers are started #
+# by a forkserver rather than forked from the   #
+# server, whose event loop, locks and threads   #
+# a forked child would inherit mid-use          #
+# returns: a ProcessPoolExecutor                #
+#################################################
+def get_process_pool() -> 'ProcessPoolExecutor':
+    global _process_pool
+    if _process_pool is None:
+        # multiprocessing is only imported once a process pool is needed
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PROCESS_POOL_WORKERS, mp_context=multiprocessing.get_context('forkserver')
+        )
+    return _process_pool
+
+
+###########################################################################################
+# Runs CPU-bound string work without stalling the event loop.                             #
+#                                                                                         #
+# Work on inputs shorter than ANALYSIS_INLINE_MAX_CHARS runs inline, where a pool round   #
+# trip would cost more than the work itself. Larger inputs run in the thread pool or,     #
+# when ANALYSIS_EXECUTOR is "process", in the process pool; func, its arguments and its   #
+# result must then be picklable.                                                          #
+#                                                                                         #
+# The thread pool (the default) does not make CPU-bound Python code run in parallel with  #
+# the event loop: the worker holds the GIL except while C code releases it, which here is #
+# only hashlib hashing large inputs. What it buys is that the loop gets the GIL back      #
+# every sys.getswitchinterval() (5 ms) between bytecodes, instead of waiting for the     #
+# whole analysis; a single long C call such as str.lower() on a large string still holds  #
+# it throughout. Use "process" when large strings arrive concurrently and loop latency   #
+# matters more than the cost of pickling each string to a worker and back.               #
+#                                                                                         #
+# Args:                                                                                   #
+#     func (callable): The function to run.                                               #
+#     *args: The arguments passed to func.                                                #
+#     size (int): The size of the input in characters, compared with the threshold.      #
+#                                                                                         #
+# Returns:                                                                                #
+#     The return value of func.                                                           #
+###########################################################################################
+async def run_cpu_bound(func, *args, size: int):
+    if ANALYSIS_EXECUTOR == 'inline' or size < ANALYSIS_INLINE_MAX_CHARS:
+        return func(*args)
+
+    pool = get_process_pool() if ANALYSIS_EXECUTOR == 'process' else get_thread_pool()
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
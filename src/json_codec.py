@@ -0,0 +1,19 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+#################################################
+# @encode_json: encodes a JSON document to      #
+# UTF-8 bytes with orjson when it is installed, #
+# otherwise with the same compact json.dumps    #
+# settings FastAPI's JSONResponse uses          #
+# returns: the encoded bytes                    #
+#################################################
+def encode_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
@@ -1,72 +1,403 @@
+import threading
+
+from .store_backend import StoreBackend
+from .store_stats import StoreStats, count_changes
+from .string_index import StringIndex
+from .trigram_index import compact_postings
+
+# Pending values split into trigrams per shard lock acquisition by the indexer thread
+INDEX_BATCH = 256
+# Seconds the idle indexer thread waits for new strings before it exits
+INDEXER_IDLE_SECONDS = 1.0
+
+###########################################################################################
+# One lock stripe of a LocalDataStore: the records whose digest falls in it, their        #
+# secondary indexes and statistics, and the lock that guards them.                        #
+#                                                                                         #
+# Attributes:                                                                             #
+#     records (dict): Maps the 32-byte SHA-256 digest of each string to its StringRecord. #
+#     index (StringIndex): Secondary indexes over these records.                          #
+#     stats (StoreStats): Aggregate counters over these records.                          #
+#     lock (threading.Lock): Held by every write to the shard and while it is scanned.    #
+###########################################################################################
+
+class StoreShard:
+    __slots__ = ('records', 'index', 'stats', 'lock')
+
+    def __init__(self, trigram_max_length: int = 1024):
+        self.records = {}
+        self.index = StringIndex(trigram_max_length)
+        self.stats = StoreStats()
+        self.lock = threading.Lock()
+
+
 ###########################################################################################
 # A simple in-memory data store that acts as a local Redis-like storage for storing       #
-# key-value pairs.                                                                        #
+# key-value pairs. The content lives in one process, so it is not shared between          #
+# uvicorn workers; use SQLiteDataStore for that.                                          #
+#                                                                                         #
+# The keys are spread over lock-striped shards by the first byte of the digest, so        #
+# writers to different shards never wait for each other. Every write checks and mutates   #
+# one shard under its lock (an atomic insert-if-absent), lookups read a shard without     #
+# locking, and scans work on copies taken under the shard locks, so a concurrent write    #
+# never changes a dict or an index while it is iterated. Snapshots, queries and           #
+# statistics are consistent per shard only.                                               #
+#                                                                                         #
+# New strings are split into trigrams, and the characters of added and deleted strings    #
+# counted into the statistics, by a background thread started on writes and stopped once  #
+# it has been idle for INDEXER_IDLE_SECONDS. It indexes at most INDEX_BATCH values per    #
+# shard lock acquisition, and counts characters and compacts the posting lists after      #
+# deletes without the lock, so writers and queries never wait long for it; queries check  #
+# the values it has not reached yet directly.                                             #
 #                                                                                         #
 # Attributes:                                                                             #
-#     db (dict): A dictionary to store the key-value pairs in memory.                     #
+#     shards (list): The StoreShards; the shard of a digest is digest[0] % len(shards).   #
+#     persistence (StorePersistence): Optional write-ahead log and snapshots.             #
+#     query_cache (QueryResultCache): Optional query result cache told about each write.  #
 ###########################################################################################
 
-class LocalDataStore:
+class LocalDataStore(StoreBackend):
     #######################################################################################
     # Initializes the LocalDataStore instance with an empty in-memory database.           #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     shard_count (int): The number of lock stripes, from 1 to 256.                   #
+    #     trigram_max_length (int): Longest value split into trigrams for substring       #
+    #     queries; longer values are verified by scanning them (see trigram_index.py).    #
+    #                                                                                     #
+    # Raises:                                                                             #
+    #     ValueError: If shard_count is out of range.                                     #
     #######################################################################################
-    def __init__(self):
-        self.db = {}
+    def __init__(self, shard_count: int = 16, trigram_max_length: int = 1024):
+        if not 1 <= shard_count <= 256:
+            raise ValueError('shard_count must be between 1 and 256')
+        self.shards = [StoreShard(trigram_max_length) for _ in range(shard_count)]
+        self.persistence = None
+        self.query_cache = None
+        self._indexing = threading.Condition()
+        self._index_requested = False
+        self._indexer = None
+        # Held while pending work is drained, so that warm_indexes() waits for the indexer
+        self._drain_lock = threading.Lock()
+
+    def _shard(self, digest: bytes) -> StoreShard:
+        return self.shards[digest[0] % len(self.shards)]
 
     #######################################################################################
-    # Commits a payload to the database using a hash string as the key.                   #
-    # If the hash string already exists, the method returns True without overwriting.     #
+    # Commits a record to the database using its digest as the key.                       #
+    # If the digest already exists, the method returns True without overwriting. The      #
+    # check and the insert happen under the shard lock, so of several concurrent commits  #
+    # of the same string exactly one stores it.                                           #
     #                                                                                     #
     # Args:                                                                               #
-    #     hash_string (str): The hash string to use as the key.                           #
-    #     payload: The value to store in the database.                                    #
+    #     digest (bytes): The SHA-256 digest to use as the key.                           #
+    #     record (StringRecord): The record to store in the database.                     #
     #                                                                                     #
     # Returns:                                                                            #
-    #     bool: True if the key already exists, False if the payload was added.           #
+    #     bool: True if the key already exists, False if the record was added.            #
     #######################################################################################
-    def commit_to_db(self, hash_string: str, payload):
-        if hash_string in self.db:
-            return True
-        else:
-            self.db[hash_string] = payload
-            return False
+    async def commit_to_db(self, digest: bytes, record):
+        shard = self._shard(digest)
+        with shard.lock:
+            exists = self._commit(shard, digest, record)
+        if not exists:
+            self._request_indexing()
+            await self._sync_log()
+        return exists
 
     #######################################################################################
-    # Deletes a payload from the database by its hash string.                             #
+    # Commits several records, taking each shard lock once for all of its records.        #
     #                                                                                     #
     # Args:                                                                               #
-    #     hash_string (str): The hash string to locate and delete the payload.            #
+    #     records (list): The StringRecords to store, keyed by their own digest.          #
     #                                                                                     #
     # Returns:                                                                            #
-    #     bool: True if the payload was successfully deleted, False otherwise.            #
+    #     list: One bool per record, True if its key already existed (nothing stored).    #
     #######################################################################################
-    async def delete_from_db(self, hash_string: str) -> bool:
-        if hash_string in self.db:
-            del self.db[hash_string]
+    async def commit_many(self, records) -> list:
+        by_shard = {}
+        for position, record in enumerate(records):
+            by_shard.setdefault(record.digest[0] % len(self.shards), []).append(position)
+
+        statuses = [False] * len(records)
+        for shard_number, positions in by_shard.items():
+            shard = self.shards[shard_number]
+            with shard.lock:
+                for position in positions:
+                    record = records[position]
+                    statuses[position] = self._commit(shard, record.digest, record)
+        if not all(statuses):
+            self._request_indexing()
+            await self._sync_log()
+        return statuses
+
+    def _commit(self, shard: StoreShard, digest: bytes, record) -> bool:
+        if digest in shard.records:
             return True
-        else:
+        shard.records[digest] = record
+        shard.index.add(digest, record)
+        shard.stats.add(digest, record)
+        if self.persistence is not None:
+            self.persistence.log_commit(record)
+        if self.query_cache is not None:
+            self.query_cache.invalidate(record)
+        return False
+
+    #######################################################################################
+    # Waits until the logged writes are durable, when the persistence log asks for it;    #
+    # called after the shard lock is released.                                            #
+    #######################################################################################
+    async def _sync_log(self):
+        if self.persistence is not None:
+            await self.persistence.sync()
+
+    #######################################################################################
+    # Deletes a record from the database by its digest.                                   #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     digest (bytes): The SHA-256 digest to locate and delete the record.             #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     bool: True if the record was successfully deleted, False otherwise.             #
+    #######################################################################################
+    async def delete_from_db(self, digest: bytes) -> bool:
+        shard = self._shard(digest)
+        with shard.lock:
+            deleted = self._delete(shard, digest)
+        if deleted:
+            self._request_indexing()
+            await self._sync_log()
+        return deleted
+
+    def _delete(self, shard: StoreShard, digest: bytes) -> bool:
+        record = shard.records.pop(digest, None)
+        if record is None:
             return False
+        shard.index.remove(digest, record)
+        shard.stats.remove(digest, record)
+        if self.persistence is not None:
+            self.persistence.log_delete(digest)
+        if self.query_cache is not None:
+            self.query_cache.invalidate(record)
+        return True
 
     #######################################################################################
-    # Retrieves a payload from the database by its hash string.                           #
+    # Bulk-loads records into an empty store, e.g. from a persisted snapshot. Nothing is  #
+    # written to the persistence log.                                                     #
     #                                                                                     #
     # Args:                                                                               #
-    #     hash_string (str): The hash string to locate the payload.                       #
+    #     records (list): The StringRecords to load.                                      #
+    #######################################################################################
+    def load_records(self, records):
+        by_shard = [[] for _ in self.shards]
+        for record in records:
+            by_shard[record.digest[0] % len(self.shards)].append((record.digest, record))
+        for shard, items in zip(self.shards, by_shard):
+            with shard.lock:
+                shard.records.update(items)
+                shard.index.add_many(items)
+                shard.stats.add_many(items)
+        if self.query_cache is not None:
+            self.query_cache.clear()
+        self._request_indexing()
+
+    #######################################################################################
+    # Does all the indexer's pending work now, waiting for the indexer thread if it is    #
+    # running, so that nothing is left for the first queries and stats reads.             #
+    #######################################################################################
+    def warm_indexes(self):
+        self._index_pending()
+
+    def _request_indexing(self):
+        with self._indexing:
+            self._index_requested = True
+            if self._indexer is None:
+                self._indexer = threading.Thread(target=self._run_indexer, name='trigram-indexer', daemon=True)
+                self._indexer.start()
+            else:
+                self._indexing.notify()
+
+    def _run_indexer(self):
+        while True:
+            with self._indexing:
+                if not self._index_requested:
+                    self._indexing.wait(INDEXER_IDLE_SECONDS)
+                if not self._index_requested:
+                    self._indexer = None
+                    return
+                self._index_requested = False
+            self._index_pending()
+
+    def _index_pending(self):
+        with self._drain_lock:
+            for shard in self.shards:
+                more = True
+                while more:
+                    with shard.lock:
+                        more = shard.index.substrings.flush(INDEX_BATCH)
+                while True:
+                    with shard.lock:
+                        added, removed = shard.stats.take_pending()
+                    if not added and not removed:
+                        break
+                    counts = count_changes(added, removed)
+                    with shard.lock:
+                        shard.stats.fold(counts)
+                self._compact(shard)
+
+    #######################################################################################
+    # Rewrites the shard's posting lists without the ids of deleted strings once enough   #
+    # of them are stale. Only the copies in and out take the lock; nothing is indexed     #
+    # meanwhile because the caller holds the drain lock.                                  #
+    #######################################################################################
+    def _compact(self, shard: StoreShard):
+        substrings = shard.index.substrings
+        with shard.lock:
+            if not substrings.needs_compaction:
+                return
+            source = substrings.compaction_source()
+        compacted = compact_postings(*source)
+        with shard.lock:
+            substrings.install_compacted(*compacted)
+
+    #######################################################################################
+    # Re-applies a logged commit or delete while the persistence log is replayed. Both    #
+    # are idempotent and neither is logged again.                                         #
+    #######################################################################################
+    def replay_commit(self, record):
+        shard = self._shard(record.digest)
+        with shard.lock:
+            if record.digest not in shard.records:
+                shard.records[record.digest] = record
+                shard.index.add(record.digest, record)
+                shard.stats.add(record.digest, record)
+                if self.query_cache is not None:
+                    self.query_cache.invalidate(record)
+                self._request_indexing()
+
+    def replay_delete(self, digest: bytes):
+        shard = self._shard(digest)
+        with shard.lock:
+            record = shard.records.pop(digest, None)
+            if record is not None:
+                shard.index.remove(digest, record)
+                shard.stats.remove(digest, record)
+                if self.query_cache is not None:
+                    self.query_cache.invalidate(record)
+                self._request_indexing()
+
+    #######################################################################################
+    # Retrieves a record from the database by its digest. A single dict lookup is atomic, #
+    # so no lock is taken.                                                                #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     digest (bytes): The SHA-256 digest to locate the record.                        #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     StringRecord: The record if found, or None if the key does not exist.           #
+    #######################################################################################
+    async def retrieve_from_db(self, digest: bytes):
+        return self._shard(digest).records.get(digest)
+
+    #######################################################################################
+    # Retrieves, checks or deletes many records at once, in request order.                #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     digests (list): The SHA-256 digests to look up or delete.                       #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     list: mget: the record or None per digest; mexists: whether each digest is      #
+    #     stored; mdelete: True per digest that was deleted (a digest repeated in the     #
+    #     batch is only deleted once).                                                    #
+    #######################################################################################
+    async def mget(self, digests: list) -> list:
+        shards = self.shards
+        shard_count = len(shards)
+        return [shards[digest[0] % shard_count].records.get(digest) for digest in digests]
+
+    async def mexists(self, digests: list) -> list:
+        shards = self.shards
+        shard_count = len(shards)
+        return [digest in shards[digest[0] % shard_count].records for digest in digests]
+
+    async def mdelete(self, digests: list) -> list:
+        by_shard = {}
+        for position, digest in enumerate(digests):
+            by_shard.setdefault(digest[0] % len(self.shards), []).append(position)
+
+        deleted = [False] * len(digests)
+        for shard_number, positions in by_shard.items():
+            shard = self.shards[shard_number]
+            with shard.lock:
+                for position in positions:
+                    deleted[position] = self._delete(shard, digests[position])
+        if any(deleted):
+            self._request_indexing()
+            await self._sync_log()
+        return deleted
+
+    #######################################################################################
+    # Copies the whole content, one shard at a time under its lock, so each shard is      #
+    # copied at one point in time with no half-applied write, and writers to the other    #
+    # shards never wait for the whole copy.                                               #
     #                                                                                     #
     # Returns:                                                                            #
-    #     The payload if found, or None if the key does not exist.                        #
+    #     dict: The records keyed by their digest.                                        #
     #######################################################################################
-    async def retrieve_from_db(self, hash_string: str):
-        if hash_string in self.db:
-            return self.db.get(hash_string)
-        else:
-            return None
+    def snapshot(self) -> dict:
+        content = {}
+        for shard in self.shards:
+            with shard.lock:
+                content.update(shard.records)
+        return content
 
     #######################################################################################
     # Retrieves the entire content of the in-memory database.                             #
     #                                                                                     #
     # Returns:                                                                            #
-    #     dict: The entire database content as a dictionary.                              #
+    #     dict: A copy of the database content, consistent per shard (see snapshot()).    #
     #######################################################################################
     async def get_all_db_content(self):
-        return self.db
+        return self.snapshot()
+
+    #######################################################################################
+    # Resolves the keys matching a query plan. The plan reads the secondary indexes, so   #
+    # records are only touched to verify candidates. Each shard is planned and resolved   #
+    # under its own lock, so its indexes cannot change while they are read.               #
+    #                                                                                     #
+    # The guarantee is per shard, not a point-in-time view of the whole store: shards     #
+    # are locked one after the other, so a write to a shard already resolved is missed    #
+    # and one to a shard not yet resolved is seen. Every key is stored in exactly one     #
+    # shard, so each result is a set of matches that each existed while the query ran.    #
+    # Locking every shard for the whole query, as snapshot() does, would stall all        #
+    # writers for its duration.                                                           #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     plan (PredicateNode): The predicate tree built by the query planner.            #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     set: The digests of the matching records.                                       #
+    #######################################################################################
+    async def query_keys(self, plan) -> set:
+        matching_keys = set()
+        for shard in self.shards:
+            with shard.lock:
+                matching_keys |= plan.candidates(shard.index, shard.records)
+        return matching_keys
+
+    async def count(self) -> int:
+        return sum(len(shard.records) for shard in self.shards)
+
+    #######################################################################################
+    # Merges the statistics of every shard, each read under its own lock, so like         #
+    # query_keys() each shard is consistent but the shards are read one after the other.  #
+    # The cost depends on the number of shards and distinct characters, not on the        #
+    # number of strings or the writes since the last read; the character counts leave out #
+    # the strings the indexer thread has not counted yet (see store_stats.py).            #
+    #######################################################################################
+    async def stats(self) -> StoreStats:
+        merged = StoreStats()
+        for shard in self.shards:
+            with shard.lock:
+                merged.merge(shard.stats)
+        return merged
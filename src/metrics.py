@@ -0,0 +1,302 @@
+"""
+Built-in instrumentation served at GET /metrics in the Prometheus text
+exposition format.
+
+- MetricsMiddleware records the latency of every request per route template,
+  method and status class.
+- stage_timer() times the stages of a request: validation, hashing, analysis,
+  store, query and serialization.
+- The store size, the process resident memory and the query result cache are
+  read when /metrics is scraped; queries and matched ids are counted as they
+  run.
+- With STRING_PROFILE_SLOW_MS set, a background sampler records the stacks of
+  every thread every STRING_PROFILE_INTERVAL_MS. A request slower than the
+  threshold writes the samples taken during it to STRING_PROFILE_DIR in
+  collapsed-stack format (flamegraph.pl, speedscope). Requests that overlap
+  share samples.
+
+Everything is a no-op when STRING_METRICS_ENABLED is 0.
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+from .config import METRICS_ENABLED, PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_SLOW_MS
+
+# Upper bounds in seconds, from 100 microseconds to 10 seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+###########################################################################################
+# A histogram with fixed buckets, one series per label tuple.                             #
+#                                                                                         #
+# Attributes:                                                                             #
+#     name (str): The metric name.                                                        #
+#     help (str): The HELP text.                                                          #
+#     label_names (tuple): The label names, in the order of the label values.            #
+#     buckets (tuple): The bucket upper bounds, in increasing order.                      #
+###########################################################################################
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Bucket counts (the last one is +Inf), then the sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[position] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{label_text}{"," if label_text else ""}le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{_braced(label_text)} {values[-1]}')
+            lines.append(f'{self.name}_count{_braced(label_text)} {cumulative}')
+        return lines
+
+
+###########################################################################################
+# A monotonically increasing counter, one series per label tuple.                         #
+###########################################################################################
+class CounterMetric:
+    def __init__(self, name: str, help: str, label_names: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._series = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: int = 1):
+        with self._lock:
+            self._series[labels] += amount
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = dict(self._series)
+        for labels, value in sorted(series.items()):
+            lines.append(f'{self.name}{_braced(_labels(self.label_names, labels))} {value}')
+        return lines
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _braced(label_text: str) -> str:
+    return '{' + label_text + '}' if label_text else ''
+
+
+def _gauge(name: str, help: str, value) -> list:
+    return [f'# HELP {name} {help}', f'# TYPE {name} gauge', f'{name} {value}']
+
+
+REQUEST_DURATION = Histogram(
+    'string_analyzer_request_duration_seconds', 'Request latency by route template.', ('method', 'route', 'status'),
+)
+STAGE_DURATION = Histogram(
+    'string_analyzer_stage_duration_seconds', 'Time spent in each stage of request handling.', ('stage',),
+)
+QUERIES = CounterMetric('string_analyzer_queries_total', 'Filtered queries resolved, by match mode.', ('match',))
+QUERY_MATCHES = CounterMetric('string_analyzer_query_matches_total', 'Ids returned by filtered queries.')
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage: str):
+        self.stage = (stage,)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_DURATION.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+#################################################
+# @stage_timer: times a block as one stage     #
+# returns: a context manager                    #
+#################################################
+def stage_timer(stage: str):
+    if not METRICS_ENABLED:
+        return _NO_TIMER
+    return _StageTimer(stage)
+
+
+#################################################
+# @count_query: records one resolved query and  #
+# the number of ids it matched                  #
+#################################################
+def count_query(match: str, matches: int):
+    if METRICS_ENABLED:
+        QUERIES.inc((match,))
+        QUERY_MATCHES.inc((), matches)
+
+
+###########################################################################################
+# Samples the stacks of every thread in the background, keeping the most recent samples  #
+# so that they can be attributed to a slow request once it has finished.                  #
+#                                                                                         #
+# Attributes:                                                                             #
+#     interval (float): Seconds between samples.                                          #
+#     directory (str): Where profiles of slow requests are written.                       #
+###########################################################################################
+class SamplingProfiler:
+    def __init__(self, interval: float, directory: str, max_samples: int = 100_000):
+        self.interval = interval
+        self.directory = directory
+        self._samples = deque(maxlen=max_samples)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while True:
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._samples.append((now, ';'.join(reversed(stack))))
+            time.sleep(self.interval)
+
+    #######################################################################################
+    # Writes the samples taken between start and end as collapsed stacks.                 #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     str: The path of the written profile.                                           #
+    #######################################################################################
+    def dump(self, start: float, end: float, label: str) -> str:
+        stacks = Counter(stack for taken_at, stack in list(self._samples) if start <= taken_at <= end)
+        safe_label = ''.join(char if char.isalnum() else '_' for char in label).strip('_')
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%dT%H%M%S")}-{int(end * 1000) % 1000:03d}-{safe_label}.folded')
+        with open(path, 'w', encoding='utf-8') as profile_file:
+            for stack, count in stacks.most_common():
+                profile_file.write(f'{stack} {count}\n')
+        return path
+
+
+PROFILER = SamplingProfiler(PROFILE_INTERVAL_MS / 1000, PROFILE_DIR) if METRICS_ENABLED and PROFILE_SLOW_MS > 0 else None
+
+
+###########################################################################################
+# ASGI middleware recording the latency of each HTTP request and, with the profiler on,  #
+# dumping a profile of requests slower than STRING_PROFILE_SLOW_MS. The route label is    #
+# the matched route template, so path values never become label values.                  #
+###########################################################################################
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        if PROFILER is not None:
+            PROFILER.start()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        response_status = 500
+
+        async def send_with_status(message):
+            nonlocal response_status
+            if message['type'] == 'http.response.start':
+                response_status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            end = time.perf_counter()
+            route = scope.get('route')
+            route_path = getattr(route, 'path', 'unmatched')
+            REQUEST_DURATION.observe((scope['method'], route_path, f'{response_status // 100}xx'), end - start)
+            if PROFILER is not None and (end - start) * 1000 >= PROFILE_SLOW_MS:
+                PROFILER.dump(start, end, f'{scope["method"]} {route_path}')
+
+
+###########################################################################################
+# Renders every metric in the Prometheus text exposition format.                          #
+#                                                                                         #
+# Args:                                                                                   #
+#     store_strings (int): The number of strings in the store.                            #
+#     query_cache (QueryResultCache | None): The query result cache, if enabled.          #
+#                                                                                         #
+# Returns:                                                                                #
+#     str: The exposition text.                                                           #
+###########################################################################################
+def render_metrics(store_strings: int, query_cache=None) -> str:
+    lines = REQUEST_DURATION.render() + STAGE_DURATION.render() + QUERIES.render() + QUERY_MATCHES.render()
+    lines += _gauge('string_analyzer_store_strings', 'Strings in the store.', store_strings)
+    resident_memory = _resident_memory_bytes()
+    if resident_memory is not None:
+        lines += _gauge('string_analyzer_process_resident_memory_bytes', 'Resident memory of this process.', resident_memory)
+    if query_cache is not None:
+        stats = query_cache.stats()
+        lines += _gauge('string_analyzer_query_cache_entries', 'Cached queries.', stats['entries'])
+        lines += _gauge('string_analyzer_query_cache_bytes', 'Size of the cached id sets.', stats['bytes'])
+        for name in ('hits', 'misses', 'evictions', 'invalidations'):
+            metric = f'string_analyzer_query_cache_{name}_total'
+            lines += [f'# HELP {metric} Query result cache {name}.', f'# TYPE {metric} counter', f'{metric} {stats[name]}']
+    return '\n'.join(lines) + '\n'
+
+
+def _resident_memory_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,121 @@
+"""
+Rule-based parser for GET /strings/filter-by-natural-language.
+
+A query such as "single word palindromic strings longer than 10 characters
+containing z" is turned into the same filter dict that GET /strings builds
+from its query parameters. Every rule is a regular expression compiled once at
+import time, and parsed queries are memoized in an LRU cache keyed by the
+normalized query text, so repeated queries cost a dict lookup.
+"""
+
+import re
+from functools import lru_cache
+
+NUMBER_WORDS = {
+    'zero': 0, 'one': 1, 'single': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+}
+NUMBER = r'(\d+|' + '|'.join(NUMBER_WORDS) + r')'
+
+PARSED_QUERY_CACHE_SIZE = 4096
+
+_WHITESPACE = re.compile(r'\s+')
+_NOT_PALINDROME = re.compile(r'\b(?:not|non)[\s-]*palindrom')
+_PALINDROME = re.compile(r'\bpalindrom')
+_WORD_COUNT = re.compile(NUMBER + r'[\s-]+words?\b')
+# A length bound is a number followed by a character unit or by no unit at all; a number
+# of words is never read as a length
+LENGTH = NUMBER + r'\b(?![\s-]*words?\b)'
+_WORD_RANGE = re.compile(
+    r'\b(?:(?:longer|more|shorter|fewer|less|no more|no less) than|at least|at most|minimum(?: of)?|maximum(?: of)?'
+    r'|between ' + NUMBER + r' and) ' + NUMBER + r'[\s-]+words?\b'
+)
+_BETWEEN = re.compile(r'\bbetween ' + NUMBER + r' and ' + LENGTH)
+_LONGER_THAN = re.compile(r'\b(?<!no )(?:longer|more) than ' + LENGTH)
+_SHORTER_THAN = re.compile(r'\b(?<!no )(?:shorter|fewer|less) than ' + LENGTH)
+_AT_LEAST = re.compile(r'\b(?:at least|minimum(?: length)?(?: of)?|no less than) ' + LENGTH)
+_AT_MOST = re.compile(r'\b(?:at most|maximum(?: length)?(?: of)?|no more than) ' + LENGTH)
+_EXACT_LENGTH = re.compile(r'\b(?:exactly ' + NUMBER + r' (?:characters?|chars?|letters?)|(?:of )?length ' + NUMBER + r')')
+_CONTAINS = re.compile(r'\bcontain(?:s|ing)?(?: the)?(?: letter| character| char)? ([^\s"\']|"[^"]"|\'[^\']\')(?=\s|$)')
+_CONTAINS_SUBSTRING = re.compile(
+    r'\bcontain(?:s|ing)?(?: the)?(?: (?:substring|sequence|text|word))? (?:"([^"]{2,})"|\'([^\']{2,})\')'
+    r'|\bcontain(?:s|ing)?(?: the)? (?:substring|sequence) ([^\s"\']{2,})'
+)
+_FIRST_VOWEL = re.compile(r'\bcontain(?:s|ing)?(?: the)? first vowel\b')
+
+
+###########################################################################################
+# Parses a natural language query into the GET /strings filter dict.                      #
+#                                                                                         #
+# Args:                                                                                   #
+#     query (str): The natural language description of the filters.                      #
+#                                                                                         #
+# Returns:                                                                                #
+#     dict: The filters, using the keys of GET /strings (is_palindrome, min_length, ...).  #
+#                                                                                         #
+# Raises:                                                                                 #
+#     ValueError: If no filter can be recognized in the query, or if it asks for a range  #
+#     of word counts ("at least 3 words"), which GET /strings cannot filter on.           #
+#     LookupError: If the recognized filters contradict each other.                       #
+###########################################################################################
+def parse_natural_language_query(query: str) -> dict:
+    normalized = _WHITESPACE.sub(' ', query.strip().lower())
+    return dict(_parse_normalized(normalized))
+
+
+@lru_cache(maxsize=PARSED_QUERY_CACHE_SIZE)
+def _parse_normalized(text: str) -> tuple:
+    filters = {}
+
+    if _WORD_RANGE.search(text):
+        raise ValueError('Only an exact word count is supported')
+
+    if _NOT_PALINDROME.search(text):
+        filters['is_palindrome'] = False
+    elif _PALINDROME.search(text):
+        filters['is_palindrome'] = True
+
+    match = _WORD_COUNT.search(text)
+    if match:
+        filters['word_count'] = _number(match.group(1))
+
+    match = _BETWEEN.search(text)
+    if match:
+        filters['min_length'] = _number(match.group(1))
+        filters['max_length'] = _number(match.group(2))
+    match = _LONGER_THAN.search(text)
+    if match:
+        filters['min_length'] = _number(match.group(1)) + 1
+    match = _SHORTER_THAN.search(text)
+    if match:
+        filters['max_length'] = _number(match.group(1)) - 1
+    match = _AT_LEAST.search(text)
+    if match:
+        filters['min_length'] = _number(match.group(1))
+    match = _AT_MOST.search(text)
+    if match:
+        filters['max_length'] = _number(match.group(1))
+    match = _EXACT_LENGTH.search(text)
+    if match:
+        length = _number(match.group(1) or match.group(2))
+        filters['min_length'] = filters['max_length'] = length
+
+    substring_match = _CONTAINS_SUBSTRING.search(text)
+    if substring_match:
+        filters['contains'] = next(group for group in substring_match.groups() if group)
+    elif _FIRST_VOWEL.search(text):
+        filters['contains_character'] = 'a'
+    else:
+        match = _CONTAINS.search(text)
+        if match:
+            filters['contains_character'] = match.group(1).strip('"\'')
+
+    if not filters:
+        raise ValueError('Unable to parse natural language query')
+    if filters.get('min_length', 0) > filters.get('max_length', filters.get('min_length', 0)):
+        raise LookupError('Query parsed but resulted in conflicting filters')
+    return tuple(filters.items())
+
+
+def _number(token: str) -> int:
+    return NUMBER_WORDS[token] if token in NUMBER_WORDS else int(token)
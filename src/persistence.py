@@ -0,0 +1,297 @@
+"""
+Optional durable persistence for LocalDataStore.
+
+Every commit and delete is appended to a write-ahead log (wal.log) while the
+lock of the store shard it changes is held, so the log holds the operations on
+each key in the order the store applied them.
+Appends are buffered and a background thread flushes and fsyncs the log every
+fsync_interval seconds (group commit); with an interval of 0 every write waits
+for the log to be fsynced in a worker thread, after the shard lock is released,
+before it returns.
+
+Every snapshot_every logged operations the store content is written to a
+compact binary snapshot (snapshot.bin) by a background thread. It first
+rotates the log to wal.old, then copies the store one shard at a time, and
+removes wal.old once the snapshot is in place. Each shard is copied after the
+rotation, so every operation on it is either in the copy or in wal.log (or
+both). After a crash at any point the snapshot plus wal.old plus
+wal.log replays to the latest state: replaying a commit of a present key or a
+delete of a missing key is a no-op, so operations found in both are harmless.
+
+On startup the snapshot is memory-mapped and decoded in place, then the log
+tail is replayed. A torn entry at the end of the log (crash mid-append) is
+detected by its CRC and cut off.
+"""
+
+import asyncio
+import gc
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from .string_record import StringRecord
+
+SNAPSHOT_MAGIC = b'SASNAP01'
+SNAPSHOT_FILE = 'snapshot.bin'
+LOG_FILE = 'wal.log'
+ROTATED_LOG_FILE = 'wal.old'
+
+# digest, created_at, length, word_count, unique_characters, is_palindrome,
+# value size in bytes
+RECORD_HEADER = struct.Struct('<32sqIIIBI')
+# operation, body size, CRC32 of the body
+LOG_ENTRY_HEADER = struct.Struct('<cII')
+SNAPSHOT_HEADER = struct.Struct('<8sQ')
+
+OP_COMMIT = b'C'
+OP_DELETE = b'D'
+
+
+#################################################
+# @encode_record: packs a record into bytes     #
+# returns: the encoded record                   #
+#################################################
+def encode_record(record) -> bytes:
+    value = record.value.encode('utf-8')
+    header = RECORD_HEADER.pack(
+        record.digest,
+        record.created_at,
+        record.length,
+        record.word_count,
+        record.unique_characters,
+        record.is_palindrome,
+        len(value),
+    )
+    return header + value
+
+
+#################################################
+# @decode_record: unpacks one record            #
+# returns: the record and the offset right      #
+# after it                                      #
+#################################################
+def decode_record(buffer, offset: int = 0):
+    (digest, created_at, length, word_count, unique_characters, is_palindrome,
+     value_size) = RECORD_HEADER.unpack_from(buffer, offset)
+    offset += RECORD_HEADER.size
+    value = str(buffer[offset:offset + value_size], 'utf-8')
+    offset += value_size
+    record = StringRecord(digest, value, length, word_count, unique_characters, bool(is_palindrome), created_at)
+    return record, offset
+
+
+###########################################################################################
+# Write-ahead log plus snapshots for one LocalDataStore.                                  #
+#                                                                                         #
+# Attributes:                                                                             #
+#     directory (str): Where the snapshot and the log live.                               #
+#     fsync_interval (float): Seconds between group fsyncs; 0 fsyncs before each write    #
+#     returns (see sync()).                                                               #
+#     snapshot_every (int): Logged operations between snapshots; 0 disables them.         #
+###########################################################################################
+class StorePersistence:
+    def __init__(self, directory: str, fsync_interval: float = 0.05, snapshot_every: int = 100_000):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self._store = None
+        self._log = None
+        self._log_lock = threading.Lock()
+        self._dirty = False
+        self._operations_since_snapshot = 0
+        self._snapshot_thread = None
+        self._snapshot_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    #######################################################################################
+    # Loads the latest snapshot and replays the log tail into an empty store, then starts #
+    # logging the store's writes.                                                         #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     store (LocalDataStore): The store to warm up and persist.                       #
+    #######################################################################################
+    def attach(self, store):
+        self._store = store
+        # Loading allocates millions of objects that all stay alive; pausing the
+        # cyclic collector avoids repeated full-heap scans while they are created.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            records = self._read_snapshot()
+            store.load_records(records)
+            del records
+
+            for name in (ROTATED_LOG_FILE, LOG_FILE):
+                self._replay_log(self._path(name))
+            # The loaded objects live as long as the store; moving them to the permanent
+            # generation keeps the next full collections from scanning them again (while
+            # e.g. the indexer thread holds a shard lock). Records hold no reference
+            # cycles, so deleted ones are still freed by reference counting.
+            gc.freeze()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        self._log = open(self._path(LOG_FILE), 'ab')
+        store.persistence = self
+        if self.fsync_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name='wal-fsync', daemon=True)
+            self._flusher.start()
+
+    def _read_snapshot(self) -> list:
+        path = self._path(SNAPSHOT_FILE)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return []
+        with open(path, 'rb') as snapshot_file, \
+                mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, count = SNAPSHOT_HEADER.unpack_from(mapped, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f'{path} is not a string store snapshot')
+            view = memoryview(mapped)
+            try:
+                offset = SNAPSHOT_HEADER.size
+                records = []
+                for _ in range(count):
+                    record, offset = decode_record(view, offset)
+                    records.append(record)
+            finally:
+                view.release()
+        return records
+
+    def _replay_log(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as log_file:
+            data = log_file.read()
+
+        offset = 0
+        while offset + LOG_ENTRY_HEADER.size <= len(data):
+            operation, size, checksum = LOG_ENTRY_HEADER.unpack_from(data, offset)
+            body_start = offset + LOG_ENTRY_HEADER.size
+            body = data[body_start:body_start + size]
+            if len(body) < size or zlib.crc32(body) != checksum:
+                break
+            if operation == OP_COMMIT:
+                record, _ = decode_record(body)
+                self._store.replay_commit(record)
+            elif operation == OP_DELETE:
+                self._store.replay_delete(body)
+            offset = body_start + size
+
+        if offset < len(data):
+            # Drop the torn tail so new entries are not appended after garbage
+            with open(path, 'r+b') as log_file:
+                log_file.truncate(offset)
+
+    #######################################################################################
+    # Appends operations to the log. Called by the store while it holds the shard lock.   #
+    #######################################################################################
+    def log_commit(self, record):
+        self._append(OP_COMMIT, encode_record(record))
+
+    def log_delete(self, digest: bytes):
+        self._append(OP_DELETE, digest)
+
+    def _append(self, operation: bytes, body: bytes):
+        with self._log_lock:
+            self._log.write(LOG_ENTRY_HEADER.pack(operation, len(body), zlib.crc32(body)))
+            self._log.write(body)
+            self._dirty = True
+            self._operations_since_snapshot += 1
+            snapshot_due = self.snapshot_every and self._operations_since_snapshot >= self.snapshot_every
+        if snapshot_due:
+            self._start_snapshot()
+
+    #######################################################################################
+    # Called by the store after a logged write, without any shard lock held. With an      #
+    # fsync_interval of 0 it waits for the log to be fsynced off the event loop; the     #
+    # fsyncs of concurrent writes are merged, since each flushes whatever is buffered.    #
+    #######################################################################################
+    async def sync(self):
+        if self.fsync_interval == 0:
+            await asyncio.to_thread(self.flush)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.fsync_interval):
+            self.flush()
+
+    #######################################################################################
+    # Flushes and fsyncs the buffered log entries.                                        #
+    #######################################################################################
+    def flush(self):
+        with self._log_lock:
+            if self._dirty and self._log is not None:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._dirty = False
+
+    def _start_snapshot(self):
+        with self._snapshot_lock:
+            if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+                return
+            with self._log_lock:
+                self._operations_since_snapshot = 0
+            # The caller may hold a shard lock, so the rotation (an fsync and
+            # possibly a copy) and the copy of the store run on the snapshot thread.
+            self._snapshot_thread = threading.Thread(target=self._write_snapshot, name='store-snapshot', daemon=True)
+            self._snapshot_thread.start()
+
+    def _rotate_log(self):
+        with self._log_lock:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            rotated = self._path(ROTATED_LOG_FILE)
+            if os.path.exists(rotated):
+                # A previous snapshot did not finish; keep its entries too
+                with open(rotated, 'ab') as rotated_file, open(self._path(LOG_FILE), 'rb') as log_file:
+                    rotated_file.write(log_file.read())
+                    rotated_file.flush()
+                    os.fsync(rotated_file.fileno())
+                os.remove(self._path(LOG_FILE))
+            else:
+                os.replace(self._path(LOG_FILE), rotated)
+            self._log = open(self._path(LOG_FILE), 'ab')
+            self._dirty = False
+
+    def _write_snapshot(self):
+        # Rotate before the store is copied: whatever is applied after the
+        # rotation is logged to the new wal.log, so the copy may include it
+        # but can never miss an operation that only wal.old holds.
+        self._rotate_log()
+        records = list(self._store.snapshot().values())
+        temporary = self._path(SNAPSHOT_FILE + '.tmp')
+        with open(temporary, 'wb') as snapshot_file:
+            snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(records)))
+            for record in records:
+                snapshot_file.write(encode_record(record))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary, self._path(SNAPSHOT_FILE))
+        os.remove(self._path(ROTATED_LOG_FILE))
+
+    #######################################################################################
+    # Takes a snapshot now and waits for it. Useful before a planned shutdown so that the #
+    # next start has no log to replay.                                                    #
+    #######################################################################################
+    def snapshot(self):
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        self._start_snapshot()
+        self._snapshot_thread.join()
+
+    def close(self):
+        self._closed.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        self.flush()
+        with self._log_lock:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,114 @@
+import sys
+import threading
+from collections import OrderedDict
+
+###########################################################################################
+# Bounded LRU cache of GET /strings query results.                                        #
+#                                                                                         #
+# Entries are keyed by the normalized filters and match mode and hold the set of matching #
+# digests together with the query plan that produced them. The store reports every       #
+# committed or deleted record through invalidate(), which drops only the entries whose    #
+# plan matches that record; every other cached result is still exact.                     #
+#                                                                                         #
+# A result computed while a write was being applied must not be cached, so callers read   #
+# `version` before running the query and pass it to put(), which ignores stale results.   #
+#                                                                                         #
+# Attributes:                                                                             #
+#     max_entries (int): The maximum number of cached queries.                            #
+#     max_bytes (int): The maximum total size of the cached digest sets.                  #
+#     version (int): Incremented on every write the store reports.                        #
+#     hits, misses, evictions, invalidations (int): Counters exposed by stats().          #
+###########################################################################################
+
+class QueryResultCache:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(filters: dict, match: str) -> tuple:
+        return match, tuple(sorted(filters.items()))
+
+    #######################################################################################
+    # Returns the cached digests of a query, or None on a miss.                           #
+    #######################################################################################
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    #######################################################################################
+    # Caches the digests of a query unless a write was reported since `version` was read. #
+    # The digest set is shared with callers and must not be modified.                     #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     key (tuple): The key built by key().                                            #
+    #     plan (PredicateNode): The plan of the query, used to invalidate it.             #
+    #     matching_ids (set): The matching digests.                                       #
+    #     version (int): The value of `version` read before the query ran.                #
+    #######################################################################################
+    def put(self, key: tuple, plan, matching_ids: set, version: int):
+        # The digests are the store's own key objects, so only the set itself is counted
+        size = sys.getsizeof(matching_ids)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (plan, matching_ids, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    #######################################################################################
+    # Drops the cached queries a committed or deleted record belongs to.                  #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     record (StringRecord): The record that was added to or removed from the store.  #
+    #######################################################################################
+    def invalidate(self, record):
+        with self._lock:
+            self.version += 1
+            stale = [key for key, (plan, _, _) in self._entries.items() if plan.matches(record)]
+            for key in stale:
+                _, _, size = self._entries.pop(key)
+                self._bytes -= size
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,289 @@
+"""
+A small query planner for GET /strings.
+
+The filter dict built in main.query_string is normalized into a predicate tree:
+an AND ("all") or OR ("any") node whose leaves are single-field predicates.
+Each leaf knows how to estimate its result size from the store statistics,
+how to fetch its matching keys from the secondary indexes and how to narrow an
+existing candidate set. An "all" node drives the lookup with its most
+selective leaf and narrows the candidates with the remaining leaves, cheapest
+and most selective first, so the substring check always runs last and the
+evaluation stops as soon as no candidate is left.
+"""
+
+from abc import ABC, abstractmethod
+
+MATCH_MODES = ('all', 'any')
+# The range of a SQLite INTEGER; a bound outside it is clamped before it is bound, which
+# keeps its meaning since lengths and word counts are far inside it
+SQL_INTEGER_MIN = -1 << 63
+SQL_INTEGER_MAX = (1 << 63) - 1
+
+
+#################################################
+# Base class of every single-field predicate.   #
+# cost: relative cost of checking one record,   #
+# used to order the verification step           #
+#################################################
+class Predicate(ABC):
+    cost = 1
+
+    @abstractmethod
+    def estimate(self, index) -> int:
+        ...
+
+    @abstractmethod
+    def candidates(self, index, records) -> set:
+        ...
+
+    @abstractmethod
+    def matches(self, record) -> bool:
+        ...
+
+    def narrow(self, keys: set, index, records) -> set:
+        return {key for key in keys if self.matches(records[key])}
+
+    # Returns a SQL condition and its parameters, for backends that store the
+    # records in SQL tables with one column per property.
+    @abstractmethod
+    def to_sql(self) -> tuple:
+        ...
+
+
+class PalindromePredicate(Predicate):
+    def __init__(self, is_palindrome: bool):
+        self.is_palindrome = is_palindrome
+
+    def estimate(self, index) -> int:
+        return index.count_palindrome(self.is_palindrome)
+
+    def candidates(self, index, records) -> set:
+        return index.with_palindrome(self.is_palindrome)
+
+    def matches(self, record) -> bool:
+        return record.is_palindrome == self.is_palindrome
+
+    def narrow(self, keys: set, index, records) -> set:
+        return keys & index.palindrome_bucket(self.is_palindrome)
+
+    def to_sql(self) -> tuple:
+        return 'is_palindrome = ?', [int(self.is_palindrome)]
+
+
+class LengthRangePredicate(Predicate):
+    def __init__(self, min_length=None, max_length=None):
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def estimate(self, index) -> int:
+        return index.count_length_range(self.min_length, self.max_length)
+
+    def candidates(self, index, records) -> set:
+        return index.length_range(self.min_length, self.max_length)
+
+    def matches(self, record) -> bool:
+        length = record.length
+        if self.min_length is not None and length < self.min_length:
+            return False
+        if self.max_length is not None and length > self.max_length:
+            return False
+        return True
+
+    def to_sql(self) -> tuple:
+        clauses, params = [], []
+        if self.min_length is not None:
+            clauses.append('length >= ?')
+            params.append(_sql_integer(self.min_length))
+        if self.max_length is not None:
+            clauses.append('length <= ?')
+            params.append(_sql_integer(self.max_length))
+        return ' AND '.join(clauses) or '1', params
+
+
+class WordCountPredicate(Predicate):
+    def __init__(self, word_count: int):
+        self.word_count = word_count
+
+    def estimate(self, index) -> int:
+        return index.count_word_count(self.word_count)
+
+    def candidates(self, index, records) -> set:
+        return index.with_word_count(self.word_count)
+
+    def matches(self, record) -> bool:
+        return record.word_count == self.word_count
+
+    def narrow(self, keys: set, index, records) -> set:
+        return keys & index.word_count_bucket(self.word_count)
+
+    def to_sql(self) -> tuple:
+        return 'word_count = ?', [_sql_integer(self.word_count)]
+
+
+class ContainsCharacterPredicate(Predicate):
+    # A substring scan of the value: always verified last
+    cost = 10
+
+    def __init__(self, char: str):
+        self.char = char
+
+    def estimate(self, index) -> int:
+        return index.count_character(self.char)
+
+    def candidates(self, index, records) -> set:
+        return index.with_character(self.char)
+
+    def matches(self, record) -> bool:
+        return self.char in record.value
+
+    def narrow(self, keys: set, index, records) -> set:
+        # The posting set answers the substring check without scanning the values
+        return keys & index.character_bucket(self.char)
+
+    def to_sql(self) -> tuple:
+        return 'instr(value, ?) > 0', [self.char]
+
+
+class ContainsSubstringPredicate(Predicate):
+    # Verifies candidates with a substring scan of the value
+    cost = 10
+
+    def __init__(self, substring: str):
+        self.substring = substring
+
+    def estimate(self, index) -> int:
+        return index.count_substring(self.substring)
+
+    def candidates(self, index, records) -> set:
+        # The index only narrows the search; every candidate is verified
+        substring = self.substring
+        return {key for key in index.substring_candidates(substring) if substring in records[key].value}
+
+    def matches(self, record) -> bool:
+        return self.substring in record.value
+
+    def to_sql(self) -> tuple:
+        return 'instr(value, ?) > 0', [self.substring]
+
+
+###########################################################################################
+# An inner node of the predicate tree combining its children with AND ("all") or OR      #
+# ("any").                                                                                #
+#                                                                                         #
+# Attributes:                                                                             #
+#     mode (str): Either "all" or "any".                                                  #
+#     children (list): The child predicates or nodes.                                     #
+###########################################################################################
+class PredicateNode(Predicate):
+    def __init__(self, mode: str, children: list):
+        self.mode = mode
+        self.children = children
+        self.cost = sum(child.cost for child in children)
+
+    def estimate(self, index) -> int:
+        if not self.children:
+            return index.size() if self.mode == 'all' else 0
+        estimates = [child.estimate(index) for child in self.children]
+        if self.mode == 'all':
+            return min(estimates)
+        return min(sum(estimates), index.size())
+
+    #######################################################################################
+    # Resolves the keys matching this node.                                               #
+    #                                                                                     #
+    # For "all", the child with the smallest estimate produces the candidate keys and the #
+    # remaining children narrow them, ordered by cost and then selectivity, stopping as   #
+    # soon as the candidates run out. For "any", the children's index lookups are united. #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     index (StringIndex): The store's secondary indexes and statistics.              #
+    #     records (dict): The stored records keyed by their digest.                       #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     set: The matching keys.                                                         #
+    #######################################################################################
+    def candidates(self, index, records) -> set:
+        if self.mode == 'any':
+            matching_keys = set()
+            for child in self.children:
+                matching_keys |= child.candidates(index, records)
+            return matching_keys
+
+        if not self.children:
+            return set(records)
+
+        estimated = sorted(((child.estimate(index), child) for child in self.children), key=lambda pair: pair[0])
+        if estimated[0][0] == 0:
+            return set()
+
+        driver = estimated[0][1]
+        remaining = [child for _, child in sorted(estimated[1:], key=lambda pair: (pair[1].cost, pair[0]))]
+        keys = driver.candidates(index, records)
+        for child in remaining:
+            if not keys:
+                break
+            keys = child.narrow(keys, index, records)
+        return keys
+
+    def to_sql(self) -> tuple:
+        if not self.children:
+            return ('1' if self.mode == 'all' else '0'), []
+        clauses, params = [], []
+        # Cheap comparisons first; the database may short-circuit on them
+        for child in sorted(self.children, key=lambda child: child.cost):
+            clause, child_params = child.to_sql()
+            clauses.append(f'({clause})')
+            params.extend(child_params)
+        joiner = ' AND ' if self.mode == 'all' else ' OR '
+        return joiner.join(clauses), params
+
+    def matches(self, record) -> bool:
+        if self.mode == 'all':
+            return all(child.matches(record) for child in sorted(self.children, key=lambda child: child.cost))
+        return any(child.matches(record) for child in self.children)
+
+
+###########################################################################################
+# Normalizes the validated filter dict into a predicate tree.                             #
+# Under "all", min_length and max_length collapse into a single range predicate; under   #
+# "any" they stay separate so that either bound on its own is enough to match.           #
+#                                                                                         #
+# Args:                                                                                   #
+#     filters (dict): The validated filters built from the query parameters.              #
+#     match (str): "all" to require every filter, "any" to require at least one.          #
+#                                                                                         #
+# Returns:                                                                                #
+#     PredicateNode: The root of the predicate tree.                                      #
+#                                                                                         #
+# Raises:                                                                                 #
+#     ValueError: If the match mode is not supported.                                     #
+###########################################################################################
+def build_plan(filters: dict, match: str = 'all') -> PredicateNode:
+    if match not in MATCH_MODES:
+        raise ValueError(f'Unsupported match mode: {match}')
+
+    children = []
+    if 'is_palindrome' in filters:
+        children.append(PalindromePredicate(filters['is_palindrome']))
+
+    if match == 'all':
+        if 'min_length' in filters or 'max_length' in filters:
+            children.append(LengthRangePredicate(filters.get('min_length'), filters.get('max_length')))
+    else:
+        if 'min_length' in filters:
+            children.append(LengthRangePredicate(min_length=filters['min_length']))
+        if 'max_length' in filters:
+            children.append(LengthRangePredicate(max_length=filters['max_length']))
+
+    if 'word_count' in filters:
+        children.append(WordCountPredicate(filters['word_count']))
+    if 'contains_character' in filters:
+        children.append(ContainsCharacterPredicate(filters['contains_character']))
+    if 'contains' in filters:
+        children.append(ContainsSubstringPredicate(filters['contains']))
+
+    return PredicateNode(match, children)
+
+
+def _sql_integer(value: int) -> int:
+    return min(max(value, SQL_INTEGER_MIN), SQL_INTEGER_MAX)
@@ -0,0 +1,46 @@
+from .json_codec import encode_json
+
+###########################################################################################
+# Streams query matches as newline-delimited JSON, one payload per line.                  #
+#                                                                                         #
+# Args:                                                                                   #
+#     payloads (async iterator): The encoded payloads yielded by get_by_query.            #
+#                                                                                         #
+# Yields:                                                                                 #
+#     bytes: One encoded line per payload.                                                #
+###########################################################################################
+async def stream_ndjson(payloads):
+    async for payload in payloads:
+        yield payload + b'\n'
+
+
+###########################################################################################
+# Streams query matches as a single JSON document, written incrementally. The matches    #
+# are emitted under "data" as they are produced, followed by the remaining fields.        #
+#                                                                                         #
+# Args:                                                                                   #
+#     payloads (async iterator): The encoded payloads yielded by get_by_query.            #
+#     trailer (dict): The fields written after "data" (count, filters_applied, ...).      #
+#                                                                                         #
+# Yields:                                                                                 #
+#     bytes: Consecutive fragments of the JSON document.                                  #
+###########################################################################################
+async def stream_json(payloads, trailer: dict):
+    yield b'{"data":['
+    separator = b''
+    async for payload in payloads:
+        yield separator + payload
+        separator = b','
+    yield b']'
+    for key, value in trailer.items():
+        yield b',' + encode_json(key) + b':' + encode_json(value)
+    yield b'}'
+
+
+#################################################
+# @join_json: the JSON document stream_json     #
+# writes, built in one piece                    #
+# returns: the encoded document                 #
+#################################################
+def join_json(payloads: list, trailer: dict) -> bytes:
+    return b'{"data":[%s],%s' % (b','.join(payloads), encode_json(trailer)[1:])
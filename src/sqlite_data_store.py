@@ -0,0 +1,301 @@
+import asyncio
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from .store_backend import StoreBackend
+from .store_stats import StoreStats
+from .string_record import StringRecord
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS strings (
+        digest BLOB PRIMARY KEY,
+        value TEXT NOT NULL,
+        length INTEGER NOT NULL,
+        word_count INTEGER NOT NULL,
+        unique_characters INTEGER NOT NULL,
+        is_palindrome INTEGER NOT NULL,
+        created_at INTEGER NOT NULL
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS strings_length ON strings (length)',
+    'CREATE INDEX IF NOT EXISTS strings_word_count ON strings (word_count)',
+    'CREATE INDEX IF NOT EXISTS strings_is_palindrome ON strings (is_palindrome)',
+    # The counters of GET /strings/stats, changed in the same transaction as the rows: one
+    # row per total ('total', 'palindromes', 'total_length' with key ''), per histogram
+    # bucket ('length_bucket', 'word_count_bucket') and per character ('character')
+    '''CREATE TABLE IF NOT EXISTS string_stats (
+        name TEXT NOT NULL,
+        key NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (name, key)
+    ) WITHOUT ROWID''',
+)
+
+UPSERT_STAT = ('INSERT INTO string_stats (name, key, count) VALUES (?, ?, ?) '
+               'ON CONFLICT (name, key) DO UPDATE SET count = count + excluded.count')
+
+# Digests bound per IN (...) lookup; older SQLite builds allow 999 parameters
+MAX_BATCH_PARAMETERS = 900
+
+COLUMNS = 'digest, value, length, word_count, unique_characters, is_palindrome, created_at'
+
+
+###########################################################################################
+# A string store kept in a local SQLite database file.                                    #
+#                                                                                         #
+# Several processes (e.g. uvicorn --workers N) can open the same file: SQLite's file      #
+# locking serializes writers, and WAL journaling lets readers proceed while one process   #
+# writes. Filtered queries are compiled from the query plan to a WHERE clause served by   #
+# the column indexes. The statistics are counters in the string_stats table, updated in   #
+# the transaction of every insert and delete, so any process reads them without a scan.   #
+#                                                                                         #
+# sqlite3 calls block: on disk I/O and, for a writer, for up to busy_timeout_ms while     #
+# another process holds the write lock. The async methods therefore run them in a         #
+# dedicated pool of `threads` threads and never on the event loop; each pool thread       #
+# opens its own connection. At most `threads` statements run at once, and further calls   #
+# wait for a free thread without blocking other requests.                                 #
+#                                                                                         #
+# Attributes:                                                                             #
+#     path (str): The database file.                                                      #
+#     busy_timeout_ms (int): How long a writer waits for another process's lock.          #
+#     threads (int): Size of the thread pool running the sqlite3 calls.                   #
+###########################################################################################
+
+class SQLiteDataStore(StoreBackend):
+    def __init__(self, path: str, busy_timeout_ms: int = 5000, threads: int = 4):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.threads = threads
+        self._local = threading.local()
+        self._pool = None
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    #######################################################################################
+    # Runs a blocking function in the store's thread pool, created on first use.          #
+    #######################################################################################
+    async def _run(self, func, *args):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='sqlite-store')
+        return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Only ever used by this thread, but closed by close() from another one
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # The file is only touched once the store is used, not when it is created
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    async def commit_to_db(self, digest: bytes, record) -> bool:
+        return await self._run(self._commit, record)
+
+    def _commit(self, record) -> bool:
+        with self._connection() as connection:
+            changes = Counter()
+            exists = self._insert(connection, record, changes)
+            _update_stats(connection, changes)
+        return exists
+
+    async def commit_many(self, records) -> list:
+        return await self._run(self._commit_many, records)
+
+    def _commit_many(self, records) -> list:
+        # One transaction, so the write lock is taken once per chunk
+        with self._connection() as connection:
+            changes = Counter()
+            statuses = [self._insert(connection, record, changes) for record in records]
+            _update_stats(connection, changes)
+        return statuses
+
+    #######################################################################################
+    # Inserts a row unless its digest is stored, adding the counters of a new string to   #
+    # changes; returns True if the digest was already stored.                             #
+    #######################################################################################
+    def _insert(self, connection, record, changes: Counter) -> bool:
+        cursor = connection.execute(
+            f'INSERT OR IGNORE INTO strings ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            _to_row(record),
+        )
+        if cursor.rowcount == 0:
+            return True
+        _stat_changes(changes, record, 1)
+        return False
+
+    async def retrieve_from_db(self, digest: bytes):
+        return await self._run(self._retrieve, digest)
+
+    def _retrieve(self, digest: bytes):
+        row = self._connection().execute(f'SELECT {COLUMNS} FROM strings WHERE digest = ?', (digest,)).fetchone()
+        if row is None:
+            return None
+        return _from_row(row)
+
+    async def delete_from_db(self, digest: bytes) -> bool:
+        return await self._run(self._delete, digest)
+
+    def _delete(self, digest: bytes) -> bool:
+        with self._connection() as connection:
+            changes = Counter()
+            deleted = _remove(connection, digest, changes)
+            _update_stats(connection, changes)
+        return deleted
+
+    async def mget(self, digests: list) -> list:
+        return await self._run(self._mget, digests)
+
+    def _mget(self, digests: list) -> list:
+        found = {}
+        connection = self._connection()
+        for start in range(0, len(digests), MAX_BATCH_PARAMETERS):
+            chunk = digests[start:start + MAX_BATCH_PARAMETERS]
+            rows = connection.execute(
+                f'SELECT {COLUMNS} FROM strings WHERE digest IN ({", ".join("?" * len(chunk))})', chunk
+            )
+            for row in rows:
+                found[row[0]] = _from_row(row)
+        return [found.get(digest) for digest in digests]
+
+    async def mexists(self, digests: list) -> list:
+        return await self._run(self._mexists, digests)
+
+    def _mexists(self, digests: list) -> list:
+        found = set()
+        connection = self._connection()
+        for start in range(0, len(digests), MAX_BATCH_PARAMETERS):
+            chunk = digests[start:start + MAX_BATCH_PARAMETERS]
+            rows = connection.execute(
+                f'SELECT digest FROM strings WHERE digest IN ({", ".join("?" * len(chunk))})', chunk
+            )
+            found.update(digest for (digest,) in rows)
+        return [digest in found for digest in digests]
+
+    async def mdelete(self, digests: list) -> list:
+        return await self._run(self._mdelete, digests)
+
+    def _mdelete(self, digests: list) -> list:
+        # One transaction; each digest reports whether its own row was deleted
+        with self._connection() as connection:
+            changes = Counter()
+            deleted = [_remove(connection, digest, changes) for digest in digests]
+            _update_stats(connection, changes)
+        return deleted
+
+    async def query_keys(self, plan) -> set:
+        return await self._run(self._query_keys, plan)
+
+    def _query_keys(self, plan) -> set:
+        clause, params = plan.to_sql()
+        rows = self._connection().execute(f'SELECT digest FROM strings WHERE {clause}', params)
+        return {digest for (digest,) in rows}
+
+    async def count(self) -> int:
+        return await self._run(self._count)
+
+    def _count(self) -> int:
+        (count,) = self._connection().execute('SELECT COUNT(*) FROM strings').fetchone()
+        return count
+
+    #######################################################################################
+    # Reads the statistics from the string_stats counters, in time proportional to the    #
+    # number of distinct characters and buckets, not to the number of strings.            #
+    #######################################################################################
+    async def stats(self) -> StoreStats:
+        return await self._run(self._stats)
+
+    def _stats(self) -> StoreStats:
+        stats = StoreStats()
+        rows = self._connection().execute('SELECT name, key, count FROM string_stats WHERE count != 0')
+        for name, key, count in rows:
+            if name == 'character':
+                stats.characters[key] = count
+            elif name == 'length_bucket':
+                stats.length_buckets[key] = count
+            elif name == 'word_count_bucket':
+                stats.word_count_buckets[key] = count
+            elif name == 'total':
+                stats.total = count
+            elif name == 'palindromes':
+                stats.palindromes = count
+            elif name == 'total_length':
+                stats.total_length = count
+        return stats
+
+    #######################################################################################
+    # Stops the thread pool and closes every connection. The store can still be used      #
+    # afterwards; it then starts a new pool and opens new connections.                    #
+    #######################################################################################
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+def _to_row(record) -> tuple:
+    return (
+        record.digest,
+        record.value,
+        record.length,
+        record.word_count,
+        record.unique_characters,
+        int(record.is_palindrome),
+        record.created_at,
+    )
+
+
+def _from_row(row) -> StringRecord:
+    digest, value, length, word_count, unique_characters, is_palindrome, created_at = row
+    return StringRecord(digest, value, length, word_count, unique_characters, bool(is_palindrome), created_at)
+
+
+#################################################
+# @_remove: deletes a row and adds the negated  #
+# counters of its string to changes             #
+# returns: whether this call deleted the row    #
+#################################################
+def _remove(connection, digest: bytes, changes: Counter) -> bool:
+    row = connection.execute(f'SELECT {COLUMNS} FROM strings WHERE digest = ?', (digest,)).fetchone()
+    if row is None:
+        return False
+    # Another connection may delete the row between the read and the delete; only the
+    # delete that removed it counts it out
+    if connection.execute('DELETE FROM strings WHERE digest = ?', (digest,)).rowcount != 1:
+        return False
+    _stat_changes(changes, _from_row(row), -1)
+    return True
+
+
+#################################################
+# @_stat_changes: adds the counters of a string #
+# to changes, keyed by (name, key) of the       #
+# string_stats row; sign is 1 for an insert     #
+# and -1 for a delete                           #
+# returns: changes                              #
+#################################################
+def _stat_changes(changes: Counter, record, sign: int) -> Counter:
+    changes['total', ''] += sign
+    changes['palindromes', ''] += sign * record.is_palindrome
+    changes['total_length', ''] += sign * record.length
+    changes['length_bucket', record.length.bit_length()] += sign
+    changes['word_count_bucket', record.word_count.bit_length()] += sign
+    for char, count in Counter(record.value).items():
+        changes['character', char] += sign * count
+    return changes
+
+
+def _update_stats(connection, changes: Counter):
+    connection.executemany(UPSERT_STAT, [(name, key, count) for (name, key), count in changes.items() if count])
@@ -0,0 +1,118 @@
+"""
+Startup and shutdown of the service, run by the FastAPI lifespan hook.
+
+Importing the app only builds an empty store; the persisted data of the
+memory store (STRING_STORE_DATA_DIR) is loaded here, once the server starts.
+With STRING_STORE_WARMUP=blocking (the default) it is loaded, and its trigram
+index and statistics built, before the first request is served. With
+"background" the server answers right away: a thread loads the snapshot,
+replays the log and builds the trigram index and statistics, while /ready
+answers 503 and WarmupGate turns away every other request except /metrics.
+Either way the store is only reported ready once all of it is done. On
+shutdown the write-ahead log is flushed and closed.
+"""
+
+import threading
+from contextlib import asynccontextmanager
+
+from .config import (DB_INSTANCE_POOL, STORE_BACKEND, STORE_DATA_DIR, STORE_FSYNC_INTERVAL_MS,
+                     STORE_SNAPSHOT_EVERY, STORE_WARMUP)
+
+# Paths served while the store warms up in the background
+WARMUP_EXEMPT_PATHS = frozenset(('/ready', '/metrics'))
+
+
+###########################################################################################
+# The progress of the store warm-up.                                                      #
+#                                                                                         #
+# Attributes:                                                                             #
+#     ready (threading.Event): Set once the store holds every persisted string and has    #
+#     indexed it.                                                                         #
+#     error (BaseException | None): Why the warm-up failed, if it did.                    #
+###########################################################################################
+class WarmupState:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error = None
+
+
+WARMUP = WarmupState()
+
+
+#################################################
+# @open_store: loads the persisted strings into #
+# the memory store, starts logging its writes   #
+# and builds its trigram index and statistics;  #
+# nothing to do for SQLite                      #
+#################################################
+def open_store():
+    if STORE_BACKEND != 'memory':
+        return
+    if STORE_DATA_DIR:
+        from .persistence import StorePersistence
+        StorePersistence(
+            STORE_DATA_DIR,
+            fsync_interval=STORE_FSYNC_INTERVAL_MS / 1000,
+            snapshot_every=STORE_SNAPSHOT_EVERY,
+        ).attach(DB_INSTANCE_POOL)
+    DB_INSTANCE_POOL.warm_indexes()
+
+
+def close_store():
+    persistence = getattr(DB_INSTANCE_POOL, 'persistence', None)
+    if persistence is not None:
+        persistence.close()
+    if STORE_BACKEND == 'sqlite':
+        DB_INSTANCE_POOL.close()
+
+
+def _warm_up_in_background():
+    try:
+        open_store()
+    except BaseException as error:
+        WARMUP.error = error
+        raise
+    WARMUP.ready.set()
+
+
+###########################################################################################
+# The lifespan hook of the app: opens the store on startup, in the background when        #
+# STRING_STORE_WARMUP is "background", and closes it on shutdown.                         #
+###########################################################################################
+@asynccontextmanager
+async def lifespan(app):
+    warmup_thread = None
+    if STORE_WARMUP == 'background':
+        warmup_thread = threading.Thread(target=_warm_up_in_background, name='store-warmup', daemon=True)
+        warmup_thread.start()
+    else:
+        open_store()
+        WARMUP.ready.set()
+    try:
+        yield
+    finally:
+        if warmup_thread is not None:
+            warmup_thread.join()
+        close_store()
+
+
+###########################################################################################
+# ASGI middleware answering 503 while the store warms up in the background, so that no   #
+# request reads or writes a partly loaded store. Once the store is ready each request    #
+# costs one Event check.                                                                  #
+###########################################################################################
+class WarmupGate:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or WARMUP.ready.is_set() or scope['path'] in WARMUP_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [(b'content-type', b'application/json'), (b'retry-after', b'1')],
+        })
+        await send({'type': 'http.response.body', 'body': b'{"detail":"The store is warming up"}'})
@@ -0,0 +1,93 @@
+from abc import ABC, abstractmethod
+
+###########################################################################################
+# The interface every string store backend implements.                                    #
+#                                                                                         #
+# Keys are the raw 32-byte SHA-256 digests of the (lowercased) strings and values are     #
+# StringRecords. LocalDataStore keeps everything in the memory of one process;            #
+# SQLiteDataStore keeps it in a file that several worker processes can share.             #
+#                                                                                         #
+# Every operation is a coroutine, so that a backend doing blocking I/O can run it off the  #
+# event loop (SQLiteDataStore uses a thread pool) while the memory store, which never     #
+# blocks, simply returns.                                                                  #
+###########################################################################################
+
+class StoreBackend(ABC):
+    #######################################################################################
+    # Commits a record unless its digest is already stored.                               #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     bool: True if the key already exists, False if the record was added.            #
+    #######################################################################################
+    @abstractmethod
+    async def commit_to_db(self, digest: bytes, record) -> bool:
+        ...
+
+    #######################################################################################
+    # Commits several records as one unit of work.                                        #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     list: One bool per record, True if its key already existed.                     #
+    #######################################################################################
+    @abstractmethod
+    async def commit_many(self, records) -> list:
+        ...
+
+    #######################################################################################
+    # Retrieves a record by its digest, or None if it is not stored.                      #
+    #######################################################################################
+    @abstractmethod
+    async def retrieve_from_db(self, digest: bytes):
+        ...
+
+    #######################################################################################
+    # Deletes a record by its digest.                                                     #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     bool: True if the record was deleted, False if it was not stored.               #
+    #######################################################################################
+    @abstractmethod
+    async def delete_from_db(self, digest: bytes) -> bool:
+        ...
+
+    #######################################################################################
+    # Batched counterparts of retrieve_from_db and delete_from_db, plus a batched         #
+    # existence check. Each takes a list of digests and returns one result per digest,    #
+    # in the same order, so that a backend can serve the whole batch in one round trip.   #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     list: mget: the record or None; mdelete: True if the record was deleted;        #
+    #     mexists: True if the digest is stored.                                          #
+    #######################################################################################
+    @abstractmethod
+    async def mget(self, digests: list) -> list:
+        ...
+
+    @abstractmethod
+    async def mdelete(self, digests: list) -> list:
+        ...
+
+    @abstractmethod
+    async def mexists(self, digests: list) -> list:
+        ...
+
+    #######################################################################################
+    # Resolves the digests of the records matching a query plan (see query_planner.py).   #
+    #######################################################################################
+    @abstractmethod
+    async def query_keys(self, plan) -> set:
+        ...
+
+    #######################################################################################
+    # Returns the number of stored strings.                                               #
+    #######################################################################################
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    #######################################################################################
+    # Returns the aggregate statistics of the stored strings as a StoreStats.             #
+    #######################################################################################
+    @abstractmethod
+    async def stats(self):
+        ...
@@ -0,0 +1,204 @@
+"""
+Aggregate statistics of the stored strings for GET /strings/stats, kept up to
+date as strings are committed and deleted instead of computed by scanning.
+
+LocalDataStore keeps one StoreStats per shard and changes it under the shard
+lock together with the records, so each write updates a few counters: the
+totals, the palindrome count and one bucket of the length and word count
+histograms. Buckets are powers of two (0, 1, 2-3, 4-7, ...), so a bucket is
+found with int.bit_length() and the histograms stay small whatever the
+lengths.
+
+Counting the characters of a value costs time proportional to its length, so
+writes only queue the value: add() records it as pending and remove() as
+removed. LocalDataStore's background indexer takes the queued values a
+bounded batch at a time with take_pending(), counts them with
+collections.Counter (in C) without holding the shard lock, and folds the
+counts back in with fold(). A read therefore costs time proportional to the
+number of distinct characters whatever the size of the corpus and the writes
+since the last read; its character counts trail the writes by the indexer's
+backlog.
+"""
+
+from collections import Counter
+
+TOP_CHARACTERS = 10
+# Characters of queued values counted per take_pending() batch
+FLUSH_CHARS = 1 << 16
+
+
+###########################################################################################
+# Counters and histograms over a set of stored strings.                                   #
+#                                                                                         #
+# Attributes:                                                                             #
+#     total (int): Number of strings.                                                     #
+#     palindromes (int): Number of palindromes among them.                                #
+#     total_length (int): Sum of their lengths.                                           #
+#     length_buckets (dict): Maps each length bucket to its number of strings.            #
+#     word_count_buckets (dict): Maps each word count bucket to its number of strings.    #
+#     characters (Counter): Occurrences of each character over the folded in strings.     #
+#     pending (dict): Values added but not counted yet, keyed by their digest.            #
+#     removed (list): Values removed after they were counted, to subtract.                #
+###########################################################################################
+class StoreStats:
+    def __init__(self):
+        self.total = 0
+        self.palindromes = 0
+        self.total_length = 0
+        self.length_buckets = {}
+        self.word_count_buckets = {}
+        self.characters = Counter()
+        self.pending = {}
+        self.removed = []
+
+    def add(self, key, record):
+        self.total += 1
+        self.palindromes += record.is_palindrome
+        self.total_length += record.length
+        bucket = record.length.bit_length()
+        self.length_buckets[bucket] = self.length_buckets.get(bucket, 0) + 1
+        bucket = record.word_count.bit_length()
+        self.word_count_buckets[bucket] = self.word_count_buckets.get(bucket, 0) + 1
+        self.pending[key] = record.value
+
+    #######################################################################################
+    # Adds many (key, record) pairs at once, e.g. when a snapshot is loaded.              #
+    #######################################################################################
+    def add_many(self, items):
+        length_buckets = self.length_buckets
+        word_count_buckets = self.word_count_buckets
+        pending = self.pending
+        for key, record in items:
+            self.palindromes += record.is_palindrome
+            self.total_length += record.length
+            bucket = record.length.bit_length()
+            length_buckets[bucket] = length_buckets.get(bucket, 0) + 1
+            bucket = record.word_count.bit_length()
+            word_count_buckets[bucket] = word_count_buckets.get(bucket, 0) + 1
+            pending[key] = record.value
+            self.total += 1
+
+    def remove(self, key, record):
+        self.total -= 1
+        self.palindromes -= record.is_palindrome
+        self.total_length -= record.length
+        _decrement(self.length_buckets, record.length.bit_length())
+        _decrement(self.word_count_buckets, record.word_count.bit_length())
+        if self.pending.pop(key, None) is None:
+            self.removed.append(record.value)
+
+    #######################################################################################
+    # Takes queued values off the queues, to be counted by count_changes() and folded     #
+    # in by fold(). Values are popped from the end of the pending dict, which is O(1)     #
+    # whatever was popped before.                                                         #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     max_chars (int): Stop once the values taken hold this many characters; at       #
+    #     least one value is taken if any is queued.                                      #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     tuple: The added and the removed values taken, both empty once nothing is       #
+    #     queued.                                                                         #
+    #######################################################################################
+    def take_pending(self, max_chars: int = FLUSH_CHARS) -> tuple:
+        added = []
+        removed = []
+        taken = 0
+        pending = self.pending
+        while pending and taken < max_chars:
+            value = pending.popitem()[1]
+            added.append(value)
+            taken += len(value)
+        queue = self.removed
+        while queue and taken < max_chars:
+            value = queue.pop()
+            removed.append(value)
+            taken += len(value)
+        return added, removed
+
+    def fold(self, counts: Counter):
+        characters = self.characters
+        characters.update(counts)
+        for char in counts:
+            if characters[char] <= 0:
+                del characters[char]
+
+    #######################################################################################
+    # Counts every queued value right away, e.g. for a StoreStats built by a scan.        #
+    #######################################################################################
+    def flush(self):
+        while True:
+            added, removed = self.take_pending()
+            if not added and not removed:
+                return
+            self.fold(count_changes(added, removed))
+
+    #######################################################################################
+    # Adds the counters of another StoreStats (e.g. of one shard) to this one. Values     #
+    # still queued in the other are left for its indexer.                                 #
+    #######################################################################################
+    def merge(self, other):
+        self.total += other.total
+        self.palindromes += other.palindromes
+        self.total_length += other.total_length
+        for bucket, count in other.length_buckets.items():
+            self.length_buckets[bucket] = self.length_buckets.get(bucket, 0) + count
+        for bucket, count in other.word_count_buckets.items():
+            self.word_count_buckets[bucket] = self.word_count_buckets.get(bucket, 0) + count
+        self.characters.update(other.characters)
+
+    #######################################################################################
+    # Builds the GET /strings/stats response.                                             #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     top (int): Number of most common characters to list.                            #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     dict: The totals, the length and word count histograms (one entry per           #
+    #     non-empty bucket, with its inclusive "min" and "max") and the most common       #
+    #     characters with their number of occurrences.                                    #
+    #######################################################################################
+    def to_payload(self, top: int = TOP_CHARACTERS) -> dict:
+        self.flush()
+        return {
+            "total_strings": self.total,
+            "palindromes": self.palindromes,
+            "non_palindromes": self.total - self.palindromes,
+            "total_characters": self.total_length,
+            "average_length": self.total_length / self.total if self.total else 0.0,
+            "length_histogram": _histogram(self.length_buckets),
+            "word_count_histogram": _histogram(self.word_count_buckets),
+            "distinct_characters": len(self.characters),
+            "most_common_characters": [
+                {"character": char, "count": count} for char, count in self.characters.most_common(top)
+            ],
+        }
+
+
+#################################################
+# @count_changes: counts the characters of      #
+# values taken by take_pending(); the slow part #
+# of a flush, run without the shard lock        #
+# returns: a Counter, negative for the removed  #
+# values                                        #
+#################################################
+def count_changes(added: list, removed: list) -> Counter:
+    counts = Counter(''.join(added))
+    counts.subtract(''.join(removed))
+    return counts
+
+
+def _decrement(buckets: dict, bucket: int):
+    count = buckets[bucket] - 1
+    if count:
+        buckets[bucket] = count
+    else:
+        del buckets[bucket]
+
+
+def _histogram(buckets: dict) -> list:
+    # Bucket b holds the values whose bit length is b: 0 alone, then 2**(b-1) to 2**b - 1
+    return [
+        {"min": 1 << bucket >> 1, "max": (1 << bucket) - 1, "count": buckets[bucket]}
+        for bucket in sorted(buckets)
+    ]
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from fastapi import HTTPException, status
+
+from .config import ANALYSIS_INLINE_MAX_CHARS, DB_INSTANCE_POOL
+from .executor import get_thread_pool
+from .json_codec import encode_json
+from .metrics import stage_timer
+from .string_analysis import StreamingAnalyzer
+from .string_record import StringRecord
+
+
+###########################################################################################
+# Creates and saves a string uploaded as a raw UTF-8 request body.                        #
+#                                                                                         #
+# The body is analyzed piece by piece while it is received, so it is never held as one   #
+# bytes object, one decoded str and one lowercased str at the same time. The final join   #
+# and palindrome check of a large value run in the thread pool. The analyzer keeps a      #
+# hashlib object, which cannot be pickled, so the process pool is never used here.        #
+#                                                                                         #
+# Args:                                                                                   #
+#     chunks (async iterator): The body chunks, e.g. Request.stream().                    #
+#                                                                                         #
+# Returns:                                                                                #
+#     bytes: The JSON encoded response payload. Encoding it here spares the route the     #
+#     extra copies of the value jsonable_encoder and json.dumps would make.               #
+#                                                                                         #
+# Raises:                                                                                 #
+#     HTTPException: 400 if the body is blank, 422 if it is not valid UTF-8 and 409 if    #
+#     the string already exists.                                                          #
+###########################################################################################
+async def create_and_save_stream(chunks) -> bytes:
+    analyzer = StreamingAnalyzer()
+    try:
+        async for chunk in chunks:
+            with stage_timer('analysis'):
+                analyzer.feed(chunk)
+        with stage_timer('analysis'):
+            if analyzer.length < ANALYSIS_INLINE_MAX_CHARS:
+                analysis = analyzer.finish()
+            else:
+                analysis = await asyncio.get_running_loop().run_in_executor(get_thread_pool(), analyzer.finish)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail='Invalid data type for "value" (must be UTF-8 text)'
+        )
+
+    if analysis.word_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid request body or missing "value" field'
+        )
+
+    record = StringRecord.from_analysis(analysis, time.time_ns() // 1_000_000)
+    del analysis
+    with stage_timer('store'):
+        already_exists = await DB_INSTANCE_POOL.commit_to_db(record.digest, record)
+    if already_exists:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="String already exists in the system"
+        )
+    # The response counts the character frequencies without memoizing them on the stored
+    # record, in the thread pool for a large value
+    with stage_timer('serialization'):
+        if record.length < ANALYSIS_INLINE_MAX_CHARS:
+            return _encode_response(record)
+        return await asyncio.get_running_loop().run_in_executor(get_thread_pool(), _encode_response, record)
+
+
+def _encode_response(record) -> bytes:
+    return encode_json(record.to_payload(memoize=False))
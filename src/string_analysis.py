@@ -0,0 +1,236 @@
+"""
+The analysis engine behind StringFactory.
+
+analyze_string() computes every property of a string in a single call. Each
+property is derived with one C-level primitive over the string instead of a
+Python loop: the value is encoded and hashed slice by slice, palindromes are
+checked by comparing mirrored slices, words are counted chunk by chunk
+without building the full word list, and the distinct characters are
+counted with one set(). Working slice by slice keeps the temporary copies of a
+huge string to one slice each.
+
+The character frequency map is not part of the analysis: stored records count
+it on first use with count_characters(), either per distinct character with
+str.count (small alphabets) or with collections.Counter (large alphabets).
+
+StreamingAnalyzer computes the same properties from UTF-8 bytes fed in
+arbitrary pieces, for uploads that are never held as one request body.
+"""
+
+import codecs
+import hashlib
+from collections import Counter
+
+# Size of the slices split() works on when counting words. Bounds the
+# temporary word list to one slice instead of the whole string.
+WORD_COUNT_CHUNK_SIZE = 1 << 16
+
+# Size of the slices encoded for hashing and compared for palindromes, and the
+# amount of decoded text StreamingAnalyzer processes at a time.
+SLICE_SIZE = 1 << 20
+
+# Above this many distinct characters one str.count() per character costs
+# more than a single Counter pass.
+COUNT_PER_CHARACTER_LIMIT = 64
+
+
+###########################################################################################
+# The properties of one analyzed string.                                                  #
+#                                                                                         #
+# Attributes:                                                                             #
+#     value (str): The analyzed string.                                                   #
+#     digest (bytes): The SHA-256 digest of the UTF-8 encoded value.                      #
+#     length (int): Length of the string.                                                 #
+#     is_palindrome (bool): Whether the string reads the same backward.                   #
+#     unique_characters (int): Number of distinct characters.                             #
+#     word_count (int): Number of whitespace separated words.                             #
+###########################################################################################
+class StringAnalysis:
+    __slots__ = ('value', 'digest', 'length', 'is_palindrome', 'unique_characters', 'word_count')
+
+    def __init__(self, value, digest, length, is_palindrome, unique_characters, word_count):
+        self.value = value
+        self.digest = digest
+        self.length = length
+        self.is_palindrome = is_palindrome
+        self.unique_characters = unique_characters
+        self.word_count = word_count
+
+
+#################################################
+# @analyze_string: computes every property of   #
+# the string                                    #
+# returns: a StringAnalysis                     #
+#################################################
+def analyze_string(value: str) -> StringAnalysis:
+    return StringAnalysis(
+        value,
+        sha256_digest(value),
+        len(value),
+        is_palindrome(value),
+        len(set(value)),
+        count_words(value),
+    )
+
+
+#################################################
+# @sha256_digest: hashes the UTF-8 encoding of  #
+# the string, one slice at a time               #
+# returns: the 32-byte digest                   #
+#################################################
+def sha256_digest(value: str) -> bytes:
+    if len(value) <= SLICE_SIZE:
+        return hashlib.sha256(value.encode('utf-8')).digest()
+
+    hasher = hashlib.sha256()
+    for start in range(0, len(value), SLICE_SIZE):
+        hasher.update(value[start:start + SLICE_SIZE].encode('utf-8'))
+    return hasher.digest()
+
+
+#################################################
+# @is_palindrome: compares each slice of the    #
+# first half with the reversed mirror slice of  #
+# the second half                               #
+# returns: True if the string reads the same    #
+# backward                                      #
+#################################################
+def is_palindrome(value: str) -> bool:
+    if len(value) <= SLICE_SIZE:
+        return value == value[::-1]
+
+    length = len(value)
+    half = length // 2
+    for start in range(0, half, SLICE_SIZE):
+        end = min(start + SLICE_SIZE, half)
+        if value[start:end] != value[length - end:length - start][::-1]:
+            return False
+    return True
+
+
+#################################################
+# @count_words: counts whitespace separated     #
+# words the way str.split() does, one slice at  #
+# a time                                        #
+# returns: the number of words                  #
+#################################################
+def count_words(value: str) -> int:
+    if len(value) <= WORD_COUNT_CHUNK_SIZE:
+        return len(value.split())
+
+    word_count = 0
+    previous_ends_in_word = False
+    for start in range(0, len(value), WORD_COUNT_CHUNK_SIZE):
+        chunk = value[start:start + WORD_COUNT_CHUNK_SIZE]
+        word_count += len(chunk.split())
+        # A word cut in two by the slice boundary was counted twice
+        if previous_ends_in_word and not chunk[0].isspace():
+            word_count -= 1
+        previous_ends_in_word = not chunk[-1].isspace()
+    return word_count
+
+
+#################################################
+# @count_characters: counts every character     #
+# returns: a dict of character counts, in order #
+# of first occurrence                           #
+#################################################
+def count_characters(value: str) -> dict:
+    distinct = set(value)
+    if len(distinct) > COUNT_PER_CHARACTER_LIMIT:
+        return dict(Counter(value))
+    return {char: value.count(char) for char in sorted(distinct, key=value.index)}
+
+
+# Characters of surrounding text used to lowercase a capital sigma (the only
+# character whose lowercase form depends on its neighbours) at a piece edge.
+SIGMA_CONTEXT = 64
+
+
+###########################################################################################
+# Analyzes a string delivered as UTF-8 bytes in pieces of any size.                       #
+#                                                                                         #
+# The bytes are decoded incrementally one slice at a time. Each slice is lowercased and   #
+# the digest, length, word count and distinct characters are updated from it. The         #
+# lowercased slices are kept only to become the stored value. While they arrive, memory   #
+# holds them plus a few raw slices. finish() joins them once, so it briefly holds both    #
+# the slices and the joined value: about twice the size of the value. The slices are      #
+# released right after the join.                                                          #
+#                                                                                         #
+# Attributes:                                                                             #
+#     length (int): Characters analyzed so far.                                           #
+#     word_count (int): Words seen so far.                                                #
+#                                                                                         #
+# Raises:                                                                                 #
+#     UnicodeDecodeError: From feed() or finish(), if the bytes are not valid UTF-8.      #
+###########################################################################################
+class StreamingAnalyzer:
+    def __init__(self):
+        self.length = 0
+        self.word_count = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._hasher = hashlib.sha256()
+        self._distinct = set()
+        self._pieces = []
+        self._pending = []
+        self._pending_size = 0
+        self._before = ''
+        self._held = ''
+        self._ends_in_word = False
+
+    def feed(self, data: bytes):
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= SLICE_SIZE:
+            self._receive(self._decoder.decode(b''.join(self._pending)))
+            self._pending.clear()
+            self._pending_size = 0
+
+    def _receive(self, text: str):
+        # Decoded text is held back by one piece so that a sigma at the end of
+        # a piece can be lowercased knowing the text that follows it
+        if self._held:
+            self._process(self._held, text[:SIGMA_CONTEXT])
+            self._before = (self._before + self._held)[-SIGMA_CONTEXT:]
+        self._held = text
+
+    def _process(self, text: str, after: str):
+        if '\u03a3' in text:
+            before = self._before
+            lowered = (before + text + after).lower()
+            # Lowercasing never changes the length of a sigma, so the lengths
+            # of the lowercased context give the bounds of the piece
+            piece = lowered[len(before.lower()):len(lowered) - len(after.lower())]
+        else:
+            piece = text.lower()
+
+        self._hasher.update(piece.encode('utf-8'))
+        self._pieces.append(piece)
+        self.length += len(piece)
+        self._distinct.update(piece)
+        # A word cut in two by the piece boundary would be counted twice
+        self.word_count += count_words(piece)
+        if self._ends_in_word and not piece[0].isspace():
+            self.word_count -= 1
+        self._ends_in_word = not piece[-1].isspace()
+
+    #######################################################################################
+    # Analyzes the remaining bytes and returns the analysis of the whole string. Peak     #
+    # memory is reached here: the join holds the slices and the value at once.            #
+    #######################################################################################
+    def finish(self) -> StringAnalysis:
+        self._receive(self._decoder.decode(b''.join(self._pending), final=True))
+        self._pending.clear()
+        if self._held:
+            self._process(self._held, '')
+            self._held = ''
+        value = ''.join(self._pieces)
+        self._pieces = []
+        return StringAnalysis(
+            value,
+            self._hasher.digest(),
+            self.length,
+            is_palindrome(value),
+            len(self._distinct),
+            self.word_count,
+        )
@@ -1,10 +1,11 @@
 """
 Using a full-fledged database for this task would be overkill. 
 Instead, we will use a dictionary data structure to store the data, where:
-- The key is the hash of the string.
-- The value is a dictionary containing the required properties of the string.
+- The key is the raw SHA-256 digest of the string.
+- The value is a compact StringRecord (see string_record.py) holding the
+  required properties of the string.
 
-EXAMPLE STRUCTURE OF THE DATA STORED:
+EXAMPLE STRUCTURE OF THE DATA RETURNED BY THE API (rebuilt from the record):
 {
     "id": "sha256_hash_value",  # Unique identifier (hash) for the string
     "value": "string to analyze",  # The original string
@@ -26,9 +27,12 @@ EXAMPLE STRUCTURE OF THE DATA STORED:
 """
 
 import hashlib
-from datetime import datetime, timezone
+import time
 from .config import DB_INSTANCE_POOL
 from fastapi import HTTPException, status
+from .json_codec import encode_json
+from .string_analysis import analyze_string, count_characters, count_words
+from .string_record import StringRecord
 
 """
     A utility class for handling and analyzing valid strings.
@@ -44,42 +48,58 @@ from fastapi import HTTPException, status
 class StringFactory:
     def __init__(self, valid_string):
         self.string = valid_string.lower()
+        self._analysis = None
+        self._digest = None
     
   
 #################################################
-# @create_response_payload: creates a dictionary#
-# containing the analyzed properties of the     #
-# string, including its hash, length, etc.      #
-# returns: a dictionary with the string's data  #
-#################################################
-    def create_response_payload(self) -> dict:
-        utc_now = datetime.now(timezone.utc)
-        iso_8601_utc_time = utc_now.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
-        generated_hash = self.sha256_hash()
-
-        payload = {
-            "id": self.sha256_hash(),
-            "value": self.string,
-            "properties": {
-                "length": self.length_of_string(),
-                "is_palindrome": self.is_palindrome(),
-                "unique_characters": self.unique_characters(),
-                "word_count": self.word_count(),
-                "sha256_hash": self.sha256_hash(),
-                "character_frequency_map": self.character_frequency_map(),
-            },
-            "created_at": str(iso_8601_utc_time)
-        }
-        save_status = DB_INSTANCE_POOL.commit_to_db(generated_hash, payload)
-        if save_status is not True:
-            return payload
-        else:
+# @create_response_payload: builds the record   #
+# and its encoded JSON payload, counting the    #
+# character frequencies without memoizing them  #
+# on the record; the CPU-bound half of a POST   #
+# returns: a (StringRecord, bytes) tuple        #
+#################################################
+    def create_response_payload(self) -> tuple:
+        record = self.create_record()
+        return record, encode_json(record.to_payload(memoize=False))
+
+
+#################################################
+# @save_record: stores a record built by        #
+# create_response_payload                       #
+# raises: HTTPException 409 if the string       #
+# already exists                                #
+#################################################
+    @staticmethod
+    async def save_record(record):
+        save_status = await DB_INSTANCE_POOL.commit_to_db(record.digest, record)
+        if save_status is True:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="String already exists in the system"
             )
-            
-      
+
+
+#################################################
+# @create_record: builds the compact record the #
+# store keeps for the string                    #
+# returns: a StringRecord                       #
+#################################################
+    def create_record(self) -> StringRecord:
+        return StringRecord.from_analysis(self.analysis(), time.time_ns() // 1_000_000)
+
+
+#################################################
+# @analysis: computes every property in one     #
+# call to the analysis engine, once per string  #
+# returns: a StringAnalysis                     #
+#################################################
+    def analysis(self):
+        if self._analysis is None:
+            self._analysis = analyze_string(self.string)
+        return self._analysis
+
+
 #################################################
 # @length_of_string: calculates the length of   #
 # the string                                    #
@@ -104,19 +124,7 @@ class StringFactory:
         Returns:
             bool: True if the string is a palindrome, False otherwise.
         """
-        start = 0
-        end = len(self.string) - 1
-        while start < end:
-            if self.string[start] == self.string[end]:
-                start += 1
-                end -= 1
-                continue
-            else:
-                return False
-        return True
-
-
-
+        return self.string == self.string[::-1]
 
 
       
@@ -135,8 +143,7 @@ class StringFactory:
 #                                               #
 #################################################
     def word_count(self) -> int:
-        words = self.string.split()
-        return len(words)
+        return count_words(self.string)
 
 
 
@@ -147,12 +154,24 @@ class StringFactory:
 #                                               #
 #################################################
     def sha256_hash(self) -> str:
-        # Convert the string to bytes using UTF-8 encoding,
-        # as the hashing algorithm requires a byte input.
-        byte_string = self.string.encode("utf-8")
-        # Generate the SHA-256 hash of the byte-encoded string
-        # and return its hexadecimal representation.
-        return hashlib.sha256(byte_string).hexdigest()
+        return self.sha256_digest().hex()
+
+
+#################################################
+# @sha256_digest: hashes a string               #
+# returns: the raw 32-byte digest, used as the  #
+# store key                                     #
+#################################################
+    def sha256_digest(self) -> bytes:
+        # The digest is computed once per string and reused by
+        # every caller, whether it came from the analysis or not.
+        if self._analysis is not None:
+            return self._analysis.digest
+        if self._digest is None:
+            # Convert the string to bytes using UTF-8 encoding,
+            # as the hashing algorithm requires a byte input.
+            self._digest = hashlib.sha256(self.string.encode("utf-8")).digest()
+        return self._digest
 
     
 
@@ -164,10 +183,4 @@ class StringFactory:
 #                                                  #
 ####################################################
     def character_frequency_map(self)-> dict:
-        frequency_map = {}
-        for char in self.string:
-            if char not in frequency_map:
-                frequency_map[char] = 1
-            elif char in frequency_map:
-                frequency_map[char] += 1
-        return frequency_map
+        return count_characters(self.string)
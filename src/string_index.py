@@ -0,0 +1,187 @@
+from bisect import bisect_left, insort
+from itertools import islice
+
+from .trigram_index import TrigramIndex
+
+###########################################################################################
+# Secondary indexes kept alongside the LocalDataStore so that filtered queries can be     #
+# answered without walking every stored record.                                           #
+#                                                                                         #
+# Attributes:                                                                             #
+#     lengths (dict): Hash buckets mapping a length to the set of keys.                   #
+#     sorted_lengths (list): The distinct lengths in lengths, sorted for range lookups.   #
+#     word_counts (dict): Hash buckets mapping a word count to the set of keys.           #
+#     palindromes (dict): Hash buckets mapping True/False to the set of keys.             #
+#     characters (dict): Posting sets mapping a single character to the set of keys.      #
+#     substrings (TrigramIndex): Trigram posting lists for longer substring queries.      #
+###########################################################################################
+
+class StringIndex:
+    def __init__(self, trigram_max_length: int = 1024):
+        self.lengths = {}
+        self.sorted_lengths = []
+        self.word_counts = {}
+        self.palindromes = {True: set(), False: set()}
+        self.characters = {}
+        self.substrings = TrigramIndex(trigram_max_length)
+
+    #######################################################################################
+    # Adds a record to every index.                                                       #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     key (bytes): The digest the record is stored under.                             #
+    #     record (StringRecord): The stored record.                                       #
+    #######################################################################################
+    def add(self, key, record):
+        self._add_length(record.length, key)
+        self.word_counts.setdefault(record.word_count, set()).add(key)
+        self.palindromes[record.is_palindrome].add(key)
+        for char in record.distinct_characters():
+            self.characters.setdefault(char, set()).add(key)
+        self.substrings.add(key, record.value)
+
+    #######################################################################################
+    # Adds many records at once. The distinct lengths are sorted once at the end instead  #
+    # of inserting each new one in order.                                                 #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     items (iterable): (key, record) pairs.                                          #
+    #######################################################################################
+    def add_many(self, items):
+        lengths = self.lengths
+        for key, record in items:
+            lengths.setdefault(record.length, set()).add(key)
+            self.word_counts.setdefault(record.word_count, set()).add(key)
+            self.palindromes[record.is_palindrome].add(key)
+            for char in record.distinct_characters():
+                self.characters.setdefault(char, set()).add(key)
+            self.substrings.add(key, record.value)
+        self.sorted_lengths = sorted(lengths)
+
+    #######################################################################################
+    # Removes a record from every index. Empty buckets are dropped so that the indexes    #
+    # do not grow with keys that are no longer stored.                                    #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     key (bytes): The digest the record is stored under.                             #
+    #     record (StringRecord): The stored record.                                       #
+    #######################################################################################
+    def remove(self, key, record):
+        bucket = self.lengths.get(record.length)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self.lengths[record.length]
+                del self.sorted_lengths[bisect_left(self.sorted_lengths, record.length)]
+
+        _discard(self.word_counts, record.word_count, key)
+        self.palindromes[record.is_palindrome].discard(key)
+        for char in record.distinct_characters():
+            _discard(self.characters, char, key)
+        self.substrings.remove(key, record.value)
+
+    #######################################################################################
+    # Returns the keys whose length lies within the inclusive range. Either bound may be  #
+    # None to leave that side of the range open.                                          #
+    #######################################################################################
+    def length_range(self, min_length=None, max_length=None) -> set:
+        keys = set()
+        for length in self._lengths_within(min_length, max_length):
+            keys |= self.lengths[length]
+        return keys
+
+    #######################################################################################
+    # Returns the keys with exactly the given word count.                                 #
+    #######################################################################################
+    def with_word_count(self, word_count: int) -> set:
+        return set(self.word_count_bucket(word_count))
+
+    #######################################################################################
+    # Returns the keys with the given palindrome status.                                  #
+    #######################################################################################
+    def with_palindrome(self, is_palindrome: bool) -> set:
+        return set(self.palindrome_bucket(is_palindrome))
+
+    #######################################################################################
+    # Returns the keys whose value contains the given character.                          #
+    #######################################################################################
+    def with_character(self, char: str) -> set:
+        return set(self.character_bucket(char))
+
+    #######################################################################################
+    # Returns the keys whose value may contain the substring, to be verified by the      #
+    # caller. One or two characters are answered from the character posting sets,        #
+    # longer substrings from the trigram index.                                           #
+    #######################################################################################
+    def substring_candidates(self, substring: str) -> set:
+        if len(substring) >= 3:
+            return self.substrings.candidates(substring)
+        keys = set(self.character_bucket(substring[0]))
+        for char in substring[1:]:
+            keys &= self.character_bucket(char)
+        return keys
+
+    #######################################################################################
+    # Live, read-only views of the hash buckets. Callers must not mutate them; they exist #
+    # so that candidate sets can be intersected without copying the bucket first.        #
+    #######################################################################################
+    def word_count_bucket(self, word_count: int):
+        return self.word_counts.get(word_count, frozenset())
+
+    def palindrome_bucket(self, is_palindrome: bool):
+        return self.palindromes[is_palindrome]
+
+    def character_bucket(self, char: str):
+        return self.characters.get(char, frozenset())
+
+    #######################################################################################
+    # Per-field statistics used by the query planner to estimate selectivity. Each count  #
+    # is read straight from the index without building a key set.                         #
+    #######################################################################################
+    def size(self) -> int:
+        return len(self.palindromes[True]) + len(self.palindromes[False])
+
+    def count_length_range(self, min_length=None, max_length=None) -> int:
+        lengths = self.lengths
+        return sum(len(lengths[length]) for length in self._lengths_within(min_length, max_length))
+
+    def count_word_count(self, word_count: int) -> int:
+        return len(self.word_counts.get(word_count, ()))
+
+    def count_palindrome(self, is_palindrome: bool) -> int:
+        return len(self.palindromes[is_palindrome])
+
+    def count_character(self, char: str) -> int:
+        return len(self.characters.get(char, ()))
+
+    def count_substring(self, substring: str) -> int:
+        if len(substring) >= 3:
+            return self.substrings.estimate(substring)
+        return min(self.count_character(char) for char in substring)
+
+    #######################################################################################
+    # Length buckets hold every key of one length, so a commit costs a set insert, plus   #
+    # an insort into sorted_lengths only when the length is new. Inserting each key into  #
+    # one sorted list of (length, key) instead is O(n) per commit.                        #
+    #######################################################################################
+    def _add_length(self, length: int, key):
+        bucket = self.lengths.get(length)
+        if bucket is None:
+            self.lengths[length] = bucket = set()
+            insort(self.sorted_lengths, length)
+        bucket.add(key)
+
+    def _lengths_within(self, min_length, max_length):
+        sorted_lengths = self.sorted_lengths
+        start = 0 if min_length is None else bisect_left(sorted_lengths, min_length)
+        end = len(sorted_lengths) if max_length is None else bisect_left(sorted_lengths, max_length + 1)
+        return islice(sorted_lengths, start, max(end, start))
+
+
+def _discard(buckets, bucket_key, key):
+    bucket = buckets.get(bucket_key)
+    if bucket is None:
+        return
+    bucket.discard(key)
+    if not bucket:
+        del buckets[bucket_key]
@@ -1,5 +1,5 @@
-from fastapi import FastAPI, HTTPException, status
-from pydantic import BaseModel, ValidationError
+from fastapi import HTTPException, status
+from pydantic import BaseModel
 
 ###########################################################################################
 # Represents a payload containing a string value.                                         #
@@ -0,0 +1,199 @@
+from array import array
+from datetime import datetime, timezone
+
+from .json_codec import encode_json
+from .string_analysis import count_characters
+
+# The names GET /strings and GET /strings/{string_value} accept in "fields": the
+# top-level keys of the payload and the keys of its "properties"
+PAYLOAD_FIELDS = ('id', 'value', 'properties', 'created_at')
+PROPERTY_FIELDS = ('length', 'is_palindrome', 'unique_characters', 'word_count', 'sha256_hash',
+                   'character_frequency_map')
+
+###########################################################################################
+# Compact in-memory representation of one analyzed string.                                #
+#                                                                                         #
+# The store keeps one StringRecord per string instead of the nested payload dict. The     #
+# SHA-256 digest is kept once as 32 raw bytes and the creation time as epoch              #
+# milliseconds. The character frequencies are not computed when the string is stored:     #
+# they are counted from the value the first time a read asks for them and memoized as     #
+# one unsigned int array of (code point, count) pairs; the response to the POST that      #
+# creates the string counts them without memoizing. The API payload is rebuilt by         #
+# to_payload() only when a response is serialized; the encoded JSON of                    #
+# GET /strings/{string_value} is built on the first lookup and kept until the record is   #
+# deleted.                                                                                #
+#                                                                                         #
+# Attributes:                                                                             #
+#     digest (bytes): The 32-byte SHA-256 digest of the value; also the store key.        #
+#     value (str): The analyzed (lowercased) string.                                      #
+#     length (int): Length of the string.                                                 #
+#     word_count (int): Number of whitespace separated words.                             #
+#     unique_characters (int): Number of distinct characters.                             #
+#     is_palindrome (bool): Whether the string reads the same backward.                   #
+#     created_at (int): Creation time in milliseconds since the epoch (UTC).              #
+#     frequencies (array | None): Each distinct character's code point followed by its    #
+#     count, in order of first occurrence; None until first needed.                       #
+#     encoded_payload (bytes | None): The cached JSON encoding of the payload.            #
+###########################################################################################
+
+class StringRecord:
+    __slots__ = (
+        'digest',
+        'value',
+        'length',
+        'word_count',
+        'unique_characters',
+        'is_palindrome',
+        'created_at',
+        'frequencies',
+        'encoded_payload',
+    )
+
+    def __init__(self, digest, value, length, word_count, unique_characters, is_palindrome,
+                 created_at):
+        self.digest = digest
+        self.value = value
+        self.length = length
+        self.word_count = word_count
+        self.unique_characters = unique_characters
+        self.is_palindrome = is_palindrome
+        self.created_at = created_at
+        self.frequencies = None
+        self.encoded_payload = None
+
+    #######################################################################################
+    # Builds a record from a StringAnalysis.                                              #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     analysis (StringAnalysis): The analyzed string.                                 #
+    #     created_at (int): Creation time in milliseconds since the epoch.                #
+    #######################################################################################
+    @classmethod
+    def from_analysis(cls, analysis, created_at: int):
+        return cls(
+            analysis.digest,
+            analysis.value,
+            analysis.length,
+            analysis.word_count,
+            analysis.unique_characters,
+            analysis.is_palindrome,
+            created_at,
+        )
+
+    @property
+    def id(self) -> str:
+        return self.digest.hex()
+
+    #######################################################################################
+    # Returns the count of each character, in order of first occurrence. The counts are   #
+    # computed on the first call and memoized in the compact form, unless memoize is      #
+    # False.                                                                              #
+    #######################################################################################
+    def character_frequency_map(self, memoize: bool = True) -> dict:
+        frequencies = self.frequencies
+        if frequencies is None:
+            if not memoize:
+                return count_characters(self.value)
+            frequencies = array('I')
+            for char, count in count_characters(self.value).items():
+                frequencies.append(ord(char))
+                frequencies.append(count)
+            self.frequencies = frequencies
+        return dict(zip(map(chr, frequencies[::2]), frequencies[1::2]))
+
+    #######################################################################################
+    # Returns the distinct characters of the value, from the memoized frequencies when    #
+    # they were already computed.                                                         #
+    #######################################################################################
+    def distinct_characters(self):
+        frequencies = self.frequencies
+        if frequencies is None:
+            return set(self.value)
+        return map(chr, frequencies[::2])
+
+    def created_at_iso(self) -> str:
+        created_at = datetime.fromtimestamp(self.created_at / 1000, timezone.utc)
+        return created_at.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+    #######################################################################################
+    # Rebuilds the API representation of the record.                                      #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     fields (frozenset | None): The names returned by parse_fields() to keep, or     #
+    #     None for the whole payload. Properties that are left out, such as the           #
+    #     character frequency map, are not computed at all.                               #
+    #     memoize (bool): False to count the character frequencies without keeping them   #
+    #     on the record.                                                                  #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     dict: The payload in the shape documented in string_factory.py.                 #
+    #######################################################################################
+    def to_payload(self, fields=None, memoize: bool = True) -> dict:
+        hex_digest = self.id
+        if fields is not None:
+            return self._project(fields, hex_digest, memoize)
+        return {
+            "id": hex_digest,
+            "value": self.value,
+            "properties": {
+                "length": self.length,
+                "is_palindrome": self.is_palindrome,
+                "unique_characters": self.unique_characters,
+                "word_count": self.word_count,
+                "sha256_hash": hex_digest,
+                "character_frequency_map": self.character_frequency_map(memoize),
+            },
+            "created_at": self.created_at_iso(),
+        }
+
+    def _project(self, fields, hex_digest: str, memoize: bool) -> dict:
+        payload = {}
+        if 'id' in fields:
+            payload["id"] = hex_digest
+        if 'value' in fields:
+            payload["value"] = self.value
+        properties = {}
+        every_property = 'properties' in fields
+        if every_property or 'length' in fields:
+            properties["length"] = self.length
+        if every_property or 'is_palindrome' in fields:
+            properties["is_palindrome"] = self.is_palindrome
+        if every_property or 'unique_characters' in fields:
+            properties["unique_characters"] = self.unique_characters
+        if every_property or 'word_count' in fields:
+            properties["word_count"] = self.word_count
+        if every_property or 'sha256_hash' in fields:
+            properties["sha256_hash"] = hex_digest
+        if every_property or 'character_frequency_map' in fields:
+            properties["character_frequency_map"] = self.character_frequency_map(memoize)
+        if properties:
+            payload["properties"] = properties
+        if 'created_at' in fields:
+            payload["created_at"] = self.created_at_iso()
+        return payload
+
+    #######################################################################################
+    # Returns the payload encoded as JSON bytes, encoding it on the first call only. A    #
+    # record never changes once stored, so the bytes stay valid for its lifetime.         #
+    #######################################################################################
+    def to_json_bytes(self) -> bytes:
+        encoded_payload = self.encoded_payload
+        if encoded_payload is None:
+            encoded_payload = self.encoded_payload = encode_json(self.to_payload())
+        return encoded_payload
+
+
+#################################################
+# @parse_fields: parses the comma separated     #
+# "fields" query parameter                      #
+# returns: a frozenset of field names, or None  #
+# for the whole payload                         #
+# raises: ValueError for an unknown name        #
+#################################################
+def parse_fields(fields_param):
+    if fields_param is None:
+        return None
+    fields = frozenset(name.strip() for name in fields_param.split(','))
+    if not fields or not fields.issubset(PAYLOAD_FIELDS + PROPERTY_FIELDS):
+        raise ValueError('fields must be a comma separated list of payload or property names')
+    return fields
@@ -0,0 +1,329 @@
+"""
+A trigram inverted index answering substring queries ("strings containing
+'abc'") without scanning every stored value.
+
+Each indexed string gets a small integer document id, handed out in increasing
+order, and every distinct three-character substring (trigram) of the string
+keeps a posting list of the ids containing it. A substring of three or more
+characters can only occur in strings that contain all of its trigrams, so the
+candidates are the intersection of those posting lists; the caller verifies
+each candidate with a real substring check.
+
+Posting lists are compressed. Since ids are appended in increasing order, each
+list is a run of sealed blocks of BLOCK_SIZE ids stored as the first id plus
+the gaps to the following ids, in the narrowest array type that holds the
+largest gap (usually one or two bytes per id), followed by an uncompressed
+tail of the newest ids. A block is decoded with itertools.accumulate, in C.
+
+Strings are split into trigrams outside the write path: add() only records
+them as pending, and LocalDataStore indexes the pending values a bounded batch
+at a time with flush(limit) from a background thread. Until a value is
+indexed, lookups check it directly, so a query after a bulk load costs at most
+a scan of what is still pending, never the work of indexing it.
+
+Deleting a string only drops its id from the id table, so its postings become
+stale and are skipped at query time. Once more than half of the ids are stale
+needs_compaction is set, and the owner rewrites the lists without them and
+renumbers the live ids: compaction_source() and install_compacted() are quick
+copies under the owner's lock, and compact_postings() does the rewrite between
+them without it.
+
+Strings longer than max_length are not split into trigrams (their insert would
+cost time proportional to their length under the store lock); they are kept
+in a separate set and always returned as candidates.
+"""
+
+import struct
+from array import array
+from itertools import accumulate
+
+BLOCK_SIZE = 128
+# first id, gap array typecode, number of gaps
+BLOCK_HEADER = struct.Struct('<IcH')
+# Stale ids tolerated before the posting lists are compacted
+MIN_COMPACTION = 1024
+
+
+###########################################################################################
+# The sorted document ids of one trigram, delta-encoded in blocks.                        #
+#                                                                                         #
+# Attributes:                                                                             #
+#     blocks (bytearray): The sealed blocks, each a BLOCK_HEADER then the gap array.     #
+#     tail (array): The ids appended since the last block was sealed. Writers append to  #
+#     it directly and call seal() once it holds BLOCK_SIZE ids.                           #
+#     sealed (int): The number of ids in the sealed blocks.                               #
+###########################################################################################
+class PostingList:
+    __slots__ = ('blocks', 'tail', 'sealed')
+
+    def __init__(self):
+        self.blocks = bytearray()
+        self.tail = array('I')
+        self.sealed = 0
+
+    #######################################################################################
+    # The number of ids, stale ones included.                                             #
+    #######################################################################################
+    @property
+    def count(self) -> int:
+        return self.sealed + len(self.tail)
+
+    #######################################################################################
+    # Appends an id larger than every id already in the list.                             #
+    #######################################################################################
+    def append(self, doc_id: int):
+        self.tail.append(doc_id)
+        if len(self.tail) == BLOCK_SIZE:
+            self.seal()
+
+    def seal(self):
+        tail = self.tail
+        gaps = [following - current for current, following in zip(tail, tail[1:])]
+        largest = max(gaps, default=0)
+        typecode = 'B' if largest < 1 << 8 else 'H' if largest < 1 << 16 else 'I'
+        self.blocks += BLOCK_HEADER.pack(tail[0], typecode.encode(), len(gaps))
+        self.blocks += array(typecode, gaps).tobytes()
+        self.sealed += len(tail)
+        self.tail = array('I')
+
+    #######################################################################################
+    # Decodes the list.                                                                   #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     list: The ids in increasing order.                                              #
+    #######################################################################################
+    def decode(self) -> list:
+        ids = []
+        blocks = self.blocks
+        offset = 0
+        while offset < len(blocks):
+            first, typecode, gap_count = BLOCK_HEADER.unpack_from(blocks, offset)
+            offset += BLOCK_HEADER.size
+            gaps = array(typecode.decode())
+            end = offset + gap_count * gaps.itemsize
+            gaps.frombytes(blocks[offset:end])
+            ids.extend(accumulate(gaps, initial=first))
+            offset = end
+        ids.extend(self.tail)
+        return ids
+
+    def size_bytes(self) -> int:
+        return len(self.blocks) + len(self.tail) * self.tail.itemsize
+
+
+###########################################################################################
+# Trigram posting lists over the values of one store shard.                               #
+#                                                                                         #
+# Attributes:                                                                             #
+#     max_length (int): Longer values are not split into trigrams; 0 indexes none.        #
+#     postings (dict): Maps each trigram to its PostingList.                              #
+#     doc_ids (dict): Maps the key of each indexed value to its document id.              #
+#     doc_keys (list): Maps each document id to its key, or None once it is stale.        #
+#     unindexed (set): Keys of values longer than max_length.                             #
+#     pending (dict): Values not split into trigrams yet, keyed by their key.             #
+###########################################################################################
+class TrigramIndex:
+    def __init__(self, max_length: int = 1024):
+        self.max_length = max_length
+        self.postings = {}
+        self.doc_ids = {}
+        self.doc_keys = []
+        self.unindexed = set()
+        self.pending = {}
+        self._stale = 0
+
+    #######################################################################################
+    # Adds a value under its key; it is split into trigrams by a later flush(). Values    #
+    # shorter than three characters contain no substring of three or more and are left   #
+    # out.                                                                                #
+    #######################################################################################
+    def add(self, key, value: str):
+        if len(value) < 3:
+            return
+        if len(value) > self.max_length:
+            self.unindexed.add(key)
+            return
+        self.pending[key] = value
+
+    #######################################################################################
+    # Splits pending values into trigrams. They are popped from the end of the dict,      #
+    # which is O(1) whatever was popped before.                                           #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     limit (int | None): The most values to index; None indexes all of them.         #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     bool: Whether values are still pending.                                         #
+    #######################################################################################
+    def flush(self, limit: int = None) -> bool:
+        pending = self.pending
+        for _ in range(len(pending) if limit is None else min(limit, len(pending))):
+            self._index(*pending.popitem())
+        return bool(pending)
+
+    def _index(self, key, value: str):
+        doc_id = len(self.doc_keys)
+        self.doc_keys.append(key)
+        self.doc_ids[key] = doc_id
+        postings = self.postings
+        # The hottest loop of an insert, so PostingList.append is inlined
+        for trigram in {value[start:start + 3] for start in range(len(value) - 2)}:
+            posting_list = postings.get(trigram)
+            if posting_list is None:
+                posting_list = postings[trigram] = PostingList()
+            tail = posting_list.tail
+            tail.append(doc_id)
+            if len(tail) == BLOCK_SIZE:
+                posting_list.seal()
+
+    def remove(self, key, value: str):
+        if len(value) > self.max_length:
+            self.unindexed.discard(key)
+            return
+        if self.pending.pop(key, None) is not None:
+            return
+        doc_id = self.doc_ids.pop(key, None)
+        if doc_id is None:
+            return
+        self.doc_keys[doc_id] = None
+        self._stale += 1
+
+    #######################################################################################
+    # Whether more than half of the document ids are stale, so compacting pays off.       #
+    #######################################################################################
+    @property
+    def needs_compaction(self) -> bool:
+        return self._stale >= MIN_COMPACTION and self._stale * 2 > len(self.doc_keys)
+
+    #######################################################################################
+    # Compacts the posting lists in place, in one step.                                   #
+    #######################################################################################
+    def compact(self):
+        self.install_compacted(*compact_postings(*self.compaction_source()))
+
+    #######################################################################################
+    # Copies what compact_postings() reads. Posting lists are only appended to by         #
+    # flush(), so they may be read without the lock as long as no flush() runs until      #
+    # install_compacted().                                                                #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     tuple: The id table and the (trigram, PostingList) pairs.                       #
+    #######################################################################################
+    def compaction_source(self) -> tuple:
+        return list(self.doc_keys), list(self.postings.items())
+
+    #######################################################################################
+    # Replaces the posting lists with the output of compact_postings(). Values removed    #
+    # while they were rewritten are marked stale again.                                   #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     doc_keys (list): The renumbered id table.                                       #
+    #     postings (dict): The rewritten posting lists.                                   #
+    #     indexed (int): The size of the id table the rewrite started from.               #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     bool: False, and nothing is replaced, if values were indexed in the meantime.   #
+    #######################################################################################
+    def install_compacted(self, doc_keys: list, postings: dict, indexed: int) -> bool:
+        if len(self.doc_keys) != indexed:
+            return False
+        live = self.doc_ids
+        doc_ids = {}
+        stale = 0
+        for doc_id, key in enumerate(doc_keys):
+            if key in live:
+                doc_ids[key] = doc_id
+            else:
+                doc_keys[doc_id] = None
+                stale += 1
+        self.postings = postings
+        self.doc_keys = doc_keys
+        self.doc_ids = doc_ids
+        self._stale = stale
+        return True
+
+    #######################################################################################
+    # Estimates how many keys candidates() returns, from the shortest posting list.       #
+    #######################################################################################
+    def estimate(self, substring: str) -> int:
+        counts = [self.postings[trigram].count if trigram in self.postings else 0 for trigram in _trigrams(substring)]
+        return min(counts) + len(self.unindexed) + len(self.pending)
+
+    #######################################################################################
+    # Returns the keys whose value may contain the substring. The posting lists are       #
+    # intersected from the shortest, and a list much longer than the current candidates   #
+    # is not decoded at all: verifying the few candidates is cheaper. Values not indexed  #
+    # yet are checked directly.                                                           #
+    #                                                                                     #
+    # Args:                                                                               #
+    #     substring (str): At least three characters.                                     #
+    #                                                                                     #
+    # Returns:                                                                            #
+    #     set: A superset of the matching keys; each must still be verified.              #
+    #######################################################################################
+    def candidates(self, substring: str) -> set:
+        keys = {key for key, value in self.pending.items() if substring in value}
+        keys |= self.unindexed
+        posting_lists = []
+        for trigram in _trigrams(substring):
+            posting_list = self.postings.get(trigram)
+            if posting_list is None:
+                return keys
+            posting_lists.append(posting_list)
+        posting_lists.sort(key=lambda posting_list: posting_list.count)
+
+        doc_ids = set(posting_lists[0].decode())
+        for posting_list in posting_lists[1:]:
+            if not doc_ids or posting_list.count > 8 * len(doc_ids):
+                break
+            doc_ids.intersection_update(posting_list.decode())
+
+        doc_keys = self.doc_keys
+        keys.update(doc_keys[doc_id] for doc_id in doc_ids)
+        keys.discard(None)
+        return keys
+
+    #######################################################################################
+    # The compressed size of the posting lists and the number of ids they hold.           #
+    #######################################################################################
+    def stats(self) -> dict:
+        return {
+            "trigrams": len(self.postings),
+            "postings": sum(posting_list.count for posting_list in self.postings.values()),
+            "posting_bytes": sum(posting_list.size_bytes() for posting_list in self.postings.values()),
+            "documents": len(self.doc_ids),
+            "unindexed": len(self.unindexed),
+            "pending": len(self.pending),
+        }
+
+
+#################################################
+# @compact_postings: rewrites posting lists     #
+# without the stale ids (None in doc_keys) and  #
+# renumbers the live ones in their current      #
+# order, so the lists stay sorted               #
+# returns: the renumbered id table, the new     #
+# posting lists and the size of the old table   #
+#################################################
+def compact_postings(doc_keys: list, posting_items: list) -> tuple:
+    renumbered = {}
+    live_keys = []
+    for doc_id, key in enumerate(doc_keys):
+        if key is not None:
+            renumbered[doc_id] = len(live_keys)
+            live_keys.append(key)
+
+    postings = {}
+    for trigram, posting_list in posting_items:
+        compacted = PostingList()
+        for doc_id in posting_list.decode():
+            new_id = renumbered.get(doc_id)
+            if new_id is not None:
+                compacted.append(new_id)
+        if compacted.count:
+            postings[trigram] = compacted
+    return live_keys, postings, len(doc_keys)
+
+
+def _trigrams(substring: str) -> set:
+    return {substring[start:start + 3] for start in range(len(substring) - 2)}
@@ -0,0 +1,65 @@
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+import src.batch_ingest as batch_ingest
+import src.executor as executor
+from main import app
+
+client = TestClient(app)
+
+
+def post_batch(items: list) -> dict:
+    response = client.post("/strings/batch", json=items)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_items_get_their_own_status():
+    client.post("/strings", json={"value": "batch duplicate"})
+    body = post_batch(["batch one", "batch duplicate", {"value": "batch two"}, " ", 5])
+
+    assert [result["status"] for result in body["results"]] == [201, 409, 201, 400, 422]
+    assert (body["created"], body["conflicts"], body["invalid"]) == (2, 1, 2)
+    assert client.get("/strings/batch two").status_code == 200
+
+
+def test_unencodable_item_does_not_fail_the_batch():
+    # A lone surrogate is valid JSON but has no UTF-8 encoding to hash
+    response = client.post("/strings/batch", content='["valid item", "\\ud800"]',
+                           headers={"content-type": "application/json"})
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == [201, 422]
+    assert client.get("/strings/valid item").status_code == 200
+
+
+def test_offloaded_chunks_keep_request_order(monkeypatch):
+    monkeypatch.setattr(executor, "ANALYSIS_INLINE_MAX_CHARS", 10)
+    monkeypatch.setattr(batch_ingest, "BATCH_CHUNK_SIZE", 7)
+    items = json.dumps([f"pooled {number}" for number in range(30)] + ["\ud800 pooled"])
+    response = client.post("/strings/batch", content=items, headers={"content-type": "application/json"})
+    body = response.json()
+
+    assert [result["index"] for result in body["results"]] == list(range(31))
+    assert body["created"] == 30 and body["results"][-1]["status"] == 422
+
+
+def test_chunks_are_offloaded_by_total_characters(monkeypatch):
+    monkeypatch.setattr(executor, "ANALYSIS_INLINE_MAX_CHARS", 1000)
+    analyze_chunk = batch_ingest.analyze_chunk
+    analyzed_on = []
+
+    def recording_analyze_chunk(values):
+        offloaded = threading.current_thread().name.startswith("string-analysis")
+        analyzed_on.append((len(values), offloaded))
+        return analyze_chunk(values)
+
+    monkeypatch.setattr(batch_ingest, "analyze_chunk", recording_analyze_chunk)
+    body = post_batch([f"short {number}" for number in range(20)])
+    body_large = post_batch(["large " + "x" * 2000, "large " + "y" * 2000])
+
+    assert body["created"] == 20 and body_large["created"] == 2
+    # Twenty short strings stay inline; two large ones are offloaded, though fewer
+    assert analyzed_on == [(20, False), (2, True)]
@@ -0,0 +1,69 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+from src.create_string import digest_of
+
+client = TestClient(app)
+
+
+def store(*values: str):
+    for value in values:
+        assert client.post("/strings", json={"value": value}).status_code in (201, 409)
+
+
+def test_lookup_reports_each_item_in_request_order():
+    store("bulk found", "Bulk Level")
+    response = client.post("/strings/lookup", json=[
+        "bulk found", {"value": "bulk never stored"}, 7, digest_of("bulk level").hex(), {"value": None},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3, 4]
+    assert [result["status"] for result in body["results"]] == [200, 404, 422, 200, 422]
+    assert body["results"][0]["data"] == client.get("/strings/bulk found").json()
+    assert body["results"][3]["data"]["value"] == "bulk level"
+    assert (body["found"], body["missing"], body["invalid"]) == (2, 1, 2)
+
+
+def test_lookup_exists_only_returns_ids():
+    store("bulk exists")
+    response = client.post("/strings/lookup", params={"exists_only": "true"},
+                           json=["bulk exists", "bulk does not exist"])
+    first, second = response.json()["results"]
+
+    assert first == {"index": 0, "status": 200, "id": digest_of("bulk exists").hex()}
+    assert second["status"] == 404
+
+
+def test_lookup_accepts_ndjson():
+    store("bulk ndjson")
+    body = "\n".join(json.dumps(item) for item in ("bulk ndjson", {"value": "bulk ndjson"}, "bulk nothing"))
+    response = client.post("/strings/lookup", content=body, headers={"content-type": "application/x-ndjson"})
+
+    assert [result["status"] for result in response.json()["results"]] == [200, 200, 404]
+
+
+def test_delete_reports_each_item_and_removes_the_strings():
+    store("bulk delete one", "bulk delete two")
+    response = client.post("/strings/delete", json=[
+        "bulk delete one", digest_of("bulk delete two").hex(), "bulk delete missing", ["not", "a", "string"],
+    ])
+    assert response.status_code == 200
+    body = response.json()
+
+    assert [result["status"] for result in body["results"]] == [204, 204, 404, 422]
+    assert (body["deleted"], body["missing"], body["invalid"]) == (2, 1, 1)
+    assert client.get("/strings/bulk delete one").status_code == 404
+    assert client.get("/strings/bulk delete two").status_code == 404
+    # Deleting again finds nothing
+    assert client.post("/strings/delete", json=["bulk delete one"]).json()["missing"] == 1
+
+
+def test_malformed_bodies_are_rejected():
+    for path in ("/strings/lookup", "/strings/delete"):
+        assert client.post(path, json={"value": "not an array"}).status_code == 400
+        assert client.post(path, content=b"[not json").status_code == 400
+        assert client.post(path, content=b'"a"\n{bad', headers={"content-type": "application/x-ndjson"}).status_code == 400
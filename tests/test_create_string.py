@@ -0,0 +1,141 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+import src.create_string as create_string
+import src.executor as executor
+from main import app
+from src.config import DB_INSTANCE_POOL
+from src.create_string import digest_of
+
+client = TestClient(app)
+
+
+def stored_record(value: str):
+    return asyncio.run(DB_INSTANCE_POOL.retrieve_from_db(digest_of(value)))
+
+
+def test_post_response_does_not_memoize_the_frequency_map():
+    response = client.post("/strings", json={"value": "Post Response"})
+
+    assert response.status_code == 201
+    assert response.json()["properties"]["character_frequency_map"] == {
+        "p": 2, "o": 2, "s": 3, "t": 1, " ": 1, "r": 1, "e": 2, "n": 1}
+    assert stored_record("Post Response").frequencies is None
+    # A read still computes the map, and keeps it
+    assert client.get("/strings/post response").json() == response.json()
+    assert stored_record("Post Response").frequencies is not None
+
+
+def test_streamed_post_response_does_not_memoize_the_frequency_map():
+    response = client.post("/strings/stream", content="streamed response".encode(),
+                           headers={"content-type": "text/plain"})
+
+    assert response.status_code == 201
+    assert response.json()["properties"]["character_frequency_map"]["s"] == 3
+    assert stored_record("streamed response").frequencies is None
+
+
+def test_post_conflict_and_unencodable_value():
+    assert client.post("/strings", json={"value": "posted twice"}).status_code == 201
+    assert client.post("/strings", json={"value": "Posted Twice"}).status_code == 409
+    # A lone surrogate is valid JSON but has no UTF-8 encoding to hash
+    response = client.post("/strings", content='{"value": "\\ud800"}', headers={"content-type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_fields_projection_keeps_only_the_requested_fields():
+    created = client.post("/strings", json={"value": "projected value"}).json()
+    page = client.get("/strings", params={"contains": "projected", "fields": "value,is_palindrome"}).json()
+    assert page["data"] == [{"value": "projected value", "properties": {"is_palindrome": False}}]
+    # A projection without the frequency map does not compute it
+    assert stored_record("projected value").frequencies is None
+
+    response = client.get("/strings/projected value", params={"fields": "id,length,character_frequency_map"})
+    assert response.json() == {
+        "id": created["id"],
+        "properties": {
+            "length": 15,
+            "character_frequency_map": created["properties"]["character_frequency_map"],
+        },
+    }
+    assert client.get("/strings/projected value", params={"fields": "properties"}).json() == \
+        {"properties": created["properties"]}
+    assert client.get("/strings/projected value", params={"fields": "id,colour"}).status_code == 400
+
+
+def test_first_read_of_a_large_record_is_encoded_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(executor, "ANALYSIS_INLINE_MAX_CHARS", 1000)
+    value = "large read " * 200
+    assert client.post("/strings", json={"value": value}).status_code == 201
+    threads = []
+    encoded_record = create_string.encoded_record
+
+    def recording_encoded_record(record, fields):
+        threads.append(threading.current_thread())
+        return encoded_record(record, fields)
+
+    monkeypatch.setattr(create_string, "encoded_record", recording_encoded_record)
+    payload = client.get("/strings", params={"contains": "large read"}).json()["data"][0]
+
+    assert payload["properties"]["character_frequency_map"]["l"] == 200
+    assert threads and threading.main_thread() not in threads
+    # The thread pool memoized them on the stored record; later reads reuse them
+    record = stored_record(value)
+    assert record.frequencies is not None and record.encoded_payload is not None
+    threads.clear()
+    assert client.get(f"/strings/{payload['id']}").json() == payload
+    assert threads == []
+
+
+def counting_store_calls(monkeypatch) -> list:
+    calls = []
+    for name in ("retrieve_from_db", "delete_from_db", "mexists"):
+        original = getattr(DB_INSTANCE_POOL, name)
+
+        async def counted(*args, name=name, original=original):
+            calls.append(name)
+            return await original(*args)
+
+        monkeypatch.setattr(DB_INSTANCE_POOL, name, counted)
+    return calls
+
+
+def test_lookup_by_hex_id_reads_the_record_once(monkeypatch):
+    created = client.post("/strings", json={"value": "looked up by id"}).json()
+    calls = counting_store_calls(monkeypatch)
+
+    response = client.get(f"/strings/{created['id']}")
+
+    assert response.status_code == 200 and response.json()["value"] == "looked up by id"
+    assert calls == ["retrieve_from_db"]
+
+
+def test_value_of_64_hex_characters_is_found_as_a_value(monkeypatch):
+    value = "ab" * 32
+    created = client.post("/strings", json={"value": value}).json()
+    assert created["id"] != value
+    calls = counting_store_calls(monkeypatch)
+
+    response = client.get(f"/strings/{value}")
+
+    assert response.status_code == 200 and response.json()["id"] == created["id"]
+    # Looked up as an id first, then as a value
+    assert calls == ["retrieve_from_db", "retrieve_from_db"]
+    assert client.delete(f"/strings/{value}").status_code == 204
+    assert client.get(f"/strings/{created['id']}").status_code == 404
+
+
+def test_missing_value_or_id_is_not_found():
+    assert client.get("/strings/never stored").status_code == 404
+    assert client.get("/strings/" + "0" * 64).status_code == 404
+    assert client.delete("/strings/" + "0" * 64).status_code == 404
+
+
+def test_delete_by_hex_id():
+    created = client.post("/strings", json={"value": "deleted by id"}).json()
+
+    assert client.delete(f"/strings/{created['id']}").status_code == 204
+    assert client.get("/strings/deleted by id").status_code == 404
+    assert client.delete(f"/strings/{created['id']}").status_code == 404
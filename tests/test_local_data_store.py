@@ -0,0 +1,330 @@
+"""
+Guarantees of LocalDataStore under contention: atomic insert-if-absent,
+point-in-time snapshots while strings are written, and secondary indexes,
+queries, statistics and the persisted log that stay equal to the records.
+"""
+
+import asyncio
+import random
+import string
+import sys
+import threading
+
+import pytest
+
+from src.local_data_store import LocalDataStore
+from src.persistence import StorePersistence
+from src.query_planner import build_plan
+from src.store_stats import StoreStats
+from src.string_factory import StringFactory
+from src.string_index import StringIndex
+from src.trigram_index import compact_postings
+
+THREADS = 8
+SHARDS = 16
+
+QUERIES = (
+    ({"is_palindrome": False}, "all"),
+    ({"word_count": 2}, "all"),
+    ({"min_length": 10, "max_length": 20}, "all"),
+    ({"contains_character": "e", "word_count": 1}, "all"),
+    ({"is_palindrome": True, "contains_character": "z"}, "any"),
+    ({"contains": "ab"}, "all"),
+    ({"contains": "e a", "min_length": 10}, "all"),
+    ({}, "all"),
+)
+
+
+def random_records(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + "   "
+    values = set()
+    while len(values) < count:
+        value = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 30))).strip()
+        if value:
+            values.add(value)
+    records = [StringFactory(value).create_record() for value in sorted(values)]
+    return [(record.digest, record) for record in records]
+
+
+def run_threads(target, count: int):
+    errors = []
+
+    def guarded(number):
+        try:
+            target(number)
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=guarded, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    # Switch threads often so that operations interleave as much as possible
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.fixture
+def persisted_store(tmp_path):
+    store = LocalDataStore(SHARDS)
+    # Frequent snapshots so that several rotate while the store is written
+    StorePersistence(str(tmp_path), fsync_interval=0.01, snapshot_every=500).attach(store)
+    yield store
+    store.persistence.close()
+
+
+def assert_queries_match_a_scan(store: LocalDataStore) -> dict:
+    content = store.snapshot()
+    for filters, match in QUERIES:
+        plan = build_plan(filters, match)
+        expected = {digest for digest, record in content.items() if plan.matches(record)}
+        assert asyncio.run(store.query_keys(plan)) == expected, f"query {match} {filters} differs from a scan"
+    return content
+
+
+def assert_consistent(store: LocalDataStore):
+    for shard in store.shards:
+        rebuilt = StringIndex()
+        rebuilt.add_many(shard.records.items())
+        for field in ("lengths", "sorted_lengths", "word_counts", "characters"):
+            assert getattr(shard.index, field) == getattr(rebuilt, field), f"{field} index out of sync"
+        assert shard.index.palindromes == rebuilt.palindromes, "palindrome index out of sync"
+
+    content = assert_queries_match_a_scan(store)
+    recounted = StoreStats()
+    for digest, record in content.items():
+        recounted.add(digest, record)
+    # The character counts trail the writes until the indexer thread has counted them
+    store.warm_indexes()
+    live = asyncio.run(store.stats())
+    # The character counts are compared whole, since ties make most_common's order arbitrary
+    assert live.to_payload(top=0) == recounted.to_payload(top=0)
+    assert live.characters == recounted.characters
+
+
+def test_concurrent_commits_store_each_string_once(persisted_store):
+    records = random_records(2000, seed=11)
+    inserted = [0] * THREADS
+
+    async def commit(number):
+        order = list(records)
+        random.Random(number).shuffle(order)
+        for start in range(0, len(order), 100):
+            chunk = order[start:start + 100]
+            if number % 2:
+                statuses = await persisted_store.commit_many([record for _, record in chunk])
+            else:
+                statuses = [await persisted_store.commit_to_db(digest, record) for digest, record in chunk]
+            inserted[number] += statuses.count(False)
+
+    run_threads(lambda number: asyncio.run(commit(number)), THREADS)
+    assert sum(inserted) == len(records)
+    assert asyncio.run(persisted_store.count()) == len(records)
+    assert_consistent(persisted_store)
+
+
+def test_scans_during_writes_see_a_consistent_store(persisted_store, tmp_path):
+    records = random_records(2000, seed=12)
+    asyncio.run(persisted_store.commit_many([record for _, record in records]))
+    shard_of = lambda digest: digest[0] % SHARDS
+    loose = records[:1000]
+    # Pairs in one shard are swapped so that one of each pair is always stored; a
+    # snapshot copies each shard at one point in time, so it always holds one of them
+    paired = sorted(records[1000:], key=lambda item: shard_of(item[0]))
+    pairs = [(first, second) for first, second in zip(paired[::2], paired[1::2])
+             if shard_of(first[0]) == shard_of(second[0])][:200]
+    plans = [build_plan(filters, match) for filters, match in QUERIES]
+    stop = threading.Event()
+    snapshots = [0]
+
+    def write(number):
+        loop = asyncio.new_event_loop()
+        rng = random.Random(100 + number)
+        while not stop.is_set():
+            if number == 0:
+                for (first_digest, first), (second_digest, second) in pairs:
+                    loop.run_until_complete(persisted_store.commit_to_db(second_digest, second))
+                    loop.run_until_complete(persisted_store.delete_from_db(first_digest))
+                    loop.run_until_complete(persisted_store.commit_to_db(first_digest, first))
+                    loop.run_until_complete(persisted_store.delete_from_db(second_digest))
+            else:
+                digest, record = rng.choice(loose)
+                if not loop.run_until_complete(persisted_store.delete_from_db(digest)):
+                    loop.run_until_complete(persisted_store.commit_to_db(digest, record))
+        loop.close()
+
+    def read(number):
+        loop = asyncio.new_event_loop()
+        while not stop.is_set():
+            loop.run_until_complete(persisted_store.query_keys(plans[number % len(plans)]))
+            content = persisted_store.snapshot()
+            for (first_digest, _), (second_digest, _) in pairs:
+                assert first_digest in content or second_digest in content, "snapshot lost both strings of a pair"
+            snapshots[0] += 1
+        loop.close()
+
+    def work(number):
+        if number <= THREADS // 2:
+            write(number)
+        else:
+            read(number)
+
+    timer = threading.Timer(1.0, stop.set)
+    timer.start()
+    try:
+        run_threads(work, THREADS)
+    finally:
+        timer.cancel()
+        stop.set()
+    assert snapshots[0] > 0
+
+    assert_consistent(persisted_store)
+    # The store rebuilt from the snapshot and the log equals the live one
+    persisted_store.persistence.snapshot()
+    reloaded = LocalDataStore(SHARDS)
+    StorePersistence(str(tmp_path), fsync_interval=0).attach(reloaded)
+    assert reloaded.snapshot().keys() == persisted_store.snapshot().keys()
+    reloaded.persistence.close()
+
+
+def test_deletes_keep_indexes_and_statistics_in_sync():
+    store = LocalDataStore(4)
+    records = random_records(500, seed=13)
+    store.load_records([record for _, record in records[:250]])
+    asyncio.run(store.commit_many([record for _, record in records[250:]]))
+    asyncio.run(store.mdelete([digest for digest, _ in records[::3]]))
+    assert asyncio.run(store.count()) == len(records) - len(records[::3])
+    assert_consistent(store)
+
+
+def test_substring_queries_do_not_wait_for_the_trigram_index(monkeypatch):
+    store = LocalDataStore(4)
+    # No indexer thread, so every loaded string stays pending until warm_indexes()
+    monkeypatch.setattr(store, "_request_indexing", lambda: None)
+    records = random_records(1000, seed=14)
+    store.load_records([record for _, record in records])
+    assert sum(len(shard.index.substrings.pending) for shard in store.shards) > 0
+
+    assert_queries_match_a_scan(store)
+    assert sum(len(shard.index.substrings.pending) for shard in store.shards) > 0, "a query indexed pending strings"
+    store.warm_indexes()
+    assert sum(len(shard.index.substrings.pending) for shard in store.shards) == 0
+    assert_consistent(store)
+
+
+def test_indexer_thread_indexes_new_strings_and_stops_when_idle(monkeypatch):
+    monkeypatch.setattr("src.local_data_store.INDEXER_IDLE_SECONDS", 0.05)
+    store = LocalDataStore(4)
+    asyncio.run(store.commit_many([record for _, record in random_records(1000, seed=15)]))
+    indexer = store._indexer
+    if indexer is not None:
+        indexer.join(timeout=10)
+        assert not indexer.is_alive()
+    assert store._indexer is None
+    assert sum(len(shard.index.substrings.pending) for shard in store.shards) == 0
+    assert_consistent(store)
+
+
+def test_stats_reads_do_not_count_characters(monkeypatch):
+    store = LocalDataStore(4)
+    monkeypatch.setattr(store, "_request_indexing", lambda: None)
+    records = random_records(1000, seed=16)
+    store.load_records([record for _, record in records])
+    asyncio.run(store.mdelete([digest for digest, _ in records[:100]]))
+
+    payload = asyncio.run(store.stats()).to_payload()
+    assert payload["total_strings"] == 900
+    assert payload["total_characters"] == sum(record.length for _, record in records[100:])
+    assert sum(len(shard.stats.pending) for shard in store.shards) == 900, "a read counted pending characters"
+    assert_consistent(store)
+    assert sum(len(shard.stats.pending) for shard in store.shards) == 0
+
+
+def substring_results(store: LocalDataStore) -> list:
+    plans = [build_plan(filters, match) for filters, match in QUERIES if "contains" in filters]
+    return [asyncio.run(store.query_keys(plan)) for plan in plans]
+
+
+def test_deletes_leave_compaction_to_the_indexer(monkeypatch):
+    monkeypatch.setattr("src.trigram_index.MIN_COMPACTION", 10)
+    store = LocalDataStore(4)
+    monkeypatch.setattr(store, "_request_indexing", lambda: None)
+    records = random_records(1000, seed=17)
+    store.load_records([record for _, record in records])
+    store.warm_indexes()
+    asyncio.run(store.mdelete([digest for digest, _ in records if digest[1] % 3]))
+
+    substrings = [shard.index.substrings for shard in store.shards]
+    assert all(index.needs_compaction for index in substrings), "a delete compacted the posting lists"
+    before = substring_results(store)
+    assert_queries_match_a_scan(store)
+
+    store.warm_indexes()
+    for index in substrings:
+        assert not index.needs_compaction
+        assert None not in index.doc_keys
+        assert len(index.doc_keys) == len(index.doc_ids)
+    assert substring_results(store) == before
+    assert_consistent(store)
+
+
+def test_compaction_skips_strings_deleted_while_it_rewrites(monkeypatch):
+    store = LocalDataStore(1)
+    monkeypatch.setattr(store, "_request_indexing", lambda: None)
+    records = random_records(300, seed=18)
+    store.load_records([record for _, record in records])
+    store.warm_indexes()
+    asyncio.run(store.mdelete([digest for digest, _ in records[:200]]))
+
+    index = store.shards[0].index.substrings
+    source = index.compaction_source()
+    indexed = len(index.doc_ids)
+    asyncio.run(store.mdelete([digest for digest, _ in records[200:220]]))
+    deleted = indexed - len(index.doc_ids)
+    assert deleted > 0
+    assert index.install_compacted(*compact_postings(*source))
+    assert len(index.doc_keys) == indexed
+    assert index.doc_keys.count(None) == deleted
+    assert_queries_match_a_scan(store)
+    assert_consistent(store)
+
+
+def test_log_rotation_and_fsync_stay_off_the_writers(tmp_path, monkeypatch):
+    store = LocalDataStore(4)
+    persistence = StorePersistence(str(tmp_path), fsync_interval=0, snapshot_every=100)
+    persistence.attach(store)
+    writer = threading.current_thread()
+    rotated_on, flushed_on = [], []
+    rotate_log, flush = persistence._rotate_log, persistence.flush
+
+    def recording_rotate_log():
+        rotated_on.append(threading.current_thread())
+        rotate_log()
+
+    def recording_flush():
+        flushed_on.append(threading.current_thread())
+        flush()
+
+    monkeypatch.setattr(persistence, "_rotate_log", recording_rotate_log)
+    monkeypatch.setattr(persistence, "flush", recording_flush)
+    records = random_records(250, seed=19)
+    for digest, record in records:
+        asyncio.run(store.commit_to_db(digest, record))
+    assert len(flushed_on) == len(records) and writer not in flushed_on
+    persistence.close()
+
+    assert rotated_on and writer not in rotated_on
+    reloaded = LocalDataStore(4)
+    StorePersistence(str(tmp_path), fsync_interval=0).attach(reloaded)
+    assert reloaded.snapshot().keys() == {digest for digest, _ in records}
+    reloaded.persistence.close()
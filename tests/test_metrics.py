@@ -0,0 +1,73 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from main import app
+from src.config import DB_INSTANCE_POOL
+from src.metrics import CounterMetric, Histogram
+
+client = TestClient(app)
+
+
+def scrape() -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_requests_are_labelled_by_route_template():
+    client.post("/strings", json={"value": "metrics route"})
+    before = scrape()
+    client.get("/strings/metrics route")
+    client.get("/strings/not stored for metrics")
+    after = scrape()
+
+    found = 'string_analyzer_request_duration_seconds_count{method="GET",route="/strings/{string_value}",status="2xx"}'
+    missing = found.replace("2xx", "4xx")
+    assert after[found] - before.get(found, 0) == 1
+    assert after[missing] - before.get(missing, 0) == 1
+    # Path values never become label values
+    assert not any("metrics route" in name for name in after)
+
+
+def test_stages_queries_and_store_size_are_reported():
+    client.post("/strings", json={"value": "metrics query"})
+    before = scrape()
+    client.get("/strings", params={"contains": "metrics query", "match": "any"})
+    after = scrape()
+
+    queries = 'string_analyzer_queries_total{match="any"}'
+    assert after[queries] - before.get(queries, 0) == 1
+    assert after["string_analyzer_query_matches_total"] - before.get("string_analyzer_query_matches_total", 0) >= 1
+    for stage in ("hashing", "analysis", "store", "serialization"):
+        assert after[f'string_analyzer_stage_duration_seconds_count{{stage="{stage}"}}'] > 0
+    assert after["string_analyzer_store_strings"] == asyncio.run(DB_INSTANCE_POOL.count())
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "A test histogram.", ("kind",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(("a",), value)
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP test_seconds A test histogram.", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{kind="a",le="0.1"} 1',
+        'test_seconds_bucket{kind="a",le="1.0"} 3',
+        'test_seconds_bucket{kind="a",le="+Inf"} 4',
+        'test_seconds_sum{kind="a"} 6.05',
+        'test_seconds_count{kind="a"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = CounterMetric("test_total", "A test counter.", ("path",))
+    counter.inc(('a "quoted"\\path\n',), 2)
+
+    assert counter.render()[-1] == 'test_total{path="a \\"quoted\\"\\\\path\\n"} 2'
@@ -0,0 +1,65 @@
+import pytest
+
+from src.natural_language import parse_natural_language_query
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("all single word palindromic strings", {"word_count": 1, "is_palindrome": True}),
+    ("strings that are not palindromes", {"is_palindrome": False}),
+    ("strings with 3 words", {"word_count": 3}),
+    ("strings with exactly three words", {"word_count": 3}),
+    ("strings longer than 10 characters", {"min_length": 11}),
+    ("strings longer than 10", {"min_length": 11}),
+    ("strings with more than 4 letters", {"min_length": 5}),
+    ("strings shorter than 5 chars", {"max_length": 4}),
+    ("strings with fewer than 5 characters", {"max_length": 4}),
+    ("strings of at least 3 characters", {"min_length": 3}),
+    ("strings of at most 8 characters", {"max_length": 8}),
+    ("strings of no more than 8 characters", {"max_length": 8}),
+    ("strings of no less than 2 characters", {"min_length": 2}),
+    ("strings with a minimum length of 4", {"min_length": 4}),
+    ("strings between 5 and 20 characters", {"min_length": 5, "max_length": 20}),
+    ("strings of exactly 7 characters", {"min_length": 7, "max_length": 7}),
+    ("two word strings longer than 10 characters", {"word_count": 2, "min_length": 11}),
+    ("single word palindromic strings longer than 10 characters containing z",
+     {"word_count": 1, "is_palindrome": True, "min_length": 11, "contains_character": "z"}),
+    ("strings containing the letter q", {"contains_character": "q"}),
+    ("palindromic strings that contain the first vowel", {"is_palindrome": True, "contains_character": "a"}),
+    ('strings containing "abc"', {"contains": "abc"}),
+])
+def test_parses_filters(query, expected):
+    assert parse_natural_language_query(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "strings with at least 3 words",
+    "strings with more than 2 words",
+    "strings with fewer than 3 words",
+    "strings with at most two words",
+    "strings with no more than 4 words",
+    "strings between 2 and 5 words",
+    "strings with a minimum of 2 words",
+])
+def test_rejects_word_count_ranges(query):
+    # GET /strings only filters on an exact word count
+    with pytest.raises(ValueError):
+        parse_natural_language_query(query)
+
+
+def test_a_number_of_words_is_never_a_length():
+    filters = parse_natural_language_query("palindromes longer than 3 characters with 2 words")
+    assert filters == {"is_palindrome": True, "min_length": 4, "word_count": 2}
+
+
+def test_rejects_unrecognized_queries():
+    with pytest.raises(ValueError):
+        parse_natural_language_query("show me something nice")
+
+
+def test_rejects_conflicting_filters():
+    with pytest.raises(LookupError):
+        parse_natural_language_query("strings longer than 10 characters and shorter than 5 characters")
+
+
+def test_normalizes_case_and_whitespace():
+    assert parse_natural_language_query("  Strings   LONGER than 10 ") == {"min_length": 11}
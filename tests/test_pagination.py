@@ -0,0 +1,70 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+from src.config import QUERY_DEFAULT_LIMIT, QUERY_MAX_LIMIT
+from src.create_string import digest_of
+
+client = TestClient(app)
+
+VALUES = [f"paged value {number}" for number in range(250)]
+
+
+def created_ids() -> set:
+    # A 409 for strings stored by an earlier test is fine
+    assert client.post("/strings/batch", json=VALUES).status_code == 200
+    return {digest_of(value).hex() for value in VALUES}
+
+
+def page(**params) -> dict:
+    response = client.get("/strings", params={"contains": "paged value", **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_pages_follow_the_cursor_in_a_stable_order():
+    ids = created_ids()
+    seen = []
+    cursor = None
+    while True:
+        body = page(limit=70, **({"cursor": cursor} if cursor else {}))
+        assert body["count"] == len(ids)
+        page_ids = [item["id"] for item in body["data"]]
+        assert page_ids == sorted(page_ids)
+        # The same request returns the same page
+        assert page(limit=70, **({"cursor": cursor} if cursor else {}))["data"] == body["data"]
+        seen.extend(page_ids)
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+        assert cursor == page_ids[-1]
+
+    assert seen == sorted(ids)
+    assert len(seen) == len(set(seen))
+
+
+def test_default_page_size():
+    created_ids()
+    body = page()
+
+    assert len(body["data"]) == QUERY_DEFAULT_LIMIT == 100
+    assert body["next_cursor"] == body["data"][-1]["id"]
+
+
+def test_streamed_pages_send_the_cursor_in_a_header():
+    created_ids()
+    response = client.get("/strings", params={"contains": "paged value", "limit": 10, "stream": "ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["X-Total-Count"] == "250"
+    assert response.headers["X-Next-Cursor"] == lines[-1]["id"]
+    following = page(limit=10, cursor=response.headers["X-Next-Cursor"])["data"]
+    assert following[0]["id"] > lines[-1]["id"]
+
+
+def test_malformed_cursor_or_limit_is_rejected():
+    for params in ({"cursor": "not a cursor"}, {"cursor": "A" * 64}, {"cursor": "0" * 63},
+                   {"limit": 0}, {"limit": QUERY_MAX_LIMIT + 1}, {"limit": "ten"}):
+        response = client.get("/strings", params={"contains": "paged value", **params})
+        assert response.status_code == 400, params
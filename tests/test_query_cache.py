@@ -0,0 +1,82 @@
+import asyncio
+
+from src.local_data_store import LocalDataStore
+from src.query_cache import QueryResultCache
+from src.query_planner import build_plan
+from src.string_factory import StringFactory
+
+QUERIES = {
+    "palindromes": ({"is_palindrome": True}, "all"),
+    "two words": ({"word_count": 2}, "all"),
+    "long or z": ({"min_length": 20, "contains_character": "z"}, "any"),
+}
+
+
+def make_record(value: str):
+    return StringFactory(value).create_record()
+
+
+def cached_store(values: list) -> tuple:
+    store = LocalDataStore(4)
+    cache = QueryResultCache()
+    store.query_cache = cache
+    asyncio.run(store.commit_many([make_record(value) for value in values]))
+    for filters, match in QUERIES.values():
+        plan = build_plan(filters, match)
+        version = cache.version
+        cache.put(cache.key(filters, match), plan, asyncio.run(store.query_keys(plan)), version)
+    return store, cache
+
+
+def cached(cache: QueryResultCache) -> set:
+    return {name for name, (filters, match) in QUERIES.items() if cache.get(cache.key(filters, match)) is not None}
+
+
+def commit(store: LocalDataStore, value: str):
+    record = make_record(value)
+    assert asyncio.run(store.commit_to_db(record.digest, record)) is False
+
+
+def test_a_commit_evicts_only_the_queries_it_matches():
+    store, cache = cached_store(["level", "two words", "a long string of several words"])
+    assert cached(cache) == set(QUERIES)
+
+    commit(store, "noon")
+    assert cached(cache) == {"two words", "long or z"}
+
+    commit(store, "zz top")
+    assert cached(cache) == set()
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_a_delete_evicts_only_the_queries_it_matches():
+    store, cache = cached_store(["level", "two words", "a long string of several words"])
+
+    assert asyncio.run(store.delete_from_db(make_record("two words").digest))
+    assert cached(cache) == {"palindromes", "long or z"}
+    # Deleting a missing string changes nothing
+    assert not asyncio.run(store.delete_from_db(make_record("never stored").digest))
+    assert cached(cache) == {"palindromes", "long or z"}
+
+
+def test_a_write_that_matches_no_query_keeps_the_cache():
+    store, cache = cached_store(["level", "two words"])
+
+    asyncio.run(store.commit_many([make_record("short"), make_record("three short words")]))
+    assert cached(cache) == set(QUERIES)
+
+
+def test_a_result_computed_before_a_write_is_not_cached():
+    store, cache = cached_store(["level"])
+    filters, match = {"word_count": 1}, "all"
+    plan = build_plan(filters, match)
+    version = cache.version
+    stale_ids = asyncio.run(store.query_keys(plan))
+
+    asyncio.run(store.commit_many([make_record("racecar")]))
+    cache.put(cache.key(filters, match), plan, stale_ids, version)
+    assert cache.get(cache.key(filters, match)) is None
+
+    version = cache.version
+    cache.put(cache.key(filters, match), plan, asyncio.run(store.query_keys(plan)), version)
+    assert len(cache.get(cache.key(filters, match))) == 2
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from src.local_data_store import LocalDataStore
+from src.query_planner import (ContainsSubstringPredicate, PalindromePredicate, Predicate, WordCountPredicate,
+                               build_plan)
+from src.sqlite_data_store import SQLiteDataStore
+from src.string_factory import StringFactory
+from src.string_index import StringIndex
+
+VALUES = [f"common value {number}" for number in range(40)] + [
+    "level", "noon", "racecar", "a man a plan", "rare three words", "one two three", "abcba", "x", "zz top",
+]
+
+QUERIES = [
+    {"is_palindrome": True},
+    {"word_count": 3},
+    {"is_palindrome": False, "word_count": 3},
+    {"min_length": 20, "max_length": 5},
+    {"min_length": 5, "max_length": 12},
+    {"contains_character": "z", "word_count": 2},
+    {"contains": "value 1", "max_length": 14},
+    {"contains": "three", "is_palindrome": True},
+    {},
+]
+
+
+def indexed(values: list) -> tuple:
+    records = {}
+    for value in values:
+        record = StringFactory(value).create_record()
+        records[record.digest] = record
+    index = StringIndex()
+    index.add_many(records.items())
+    index.substrings.flush()
+    return index, records
+
+
+def scan(records: dict, check) -> set:
+    return {digest for digest, record in records.items() if check(record)}
+
+
+def test_predicates_must_implement_the_whole_interface():
+    class OnlyMatches(Predicate):
+        def matches(self, record) -> bool:
+            return True
+
+    with pytest.raises(TypeError):
+        OnlyMatches()
+
+
+def test_all_is_driven_by_the_most_selective_predicate(monkeypatch):
+    index, records = indexed(VALUES)
+    called = []
+    for predicate_class in (PalindromePredicate, WordCountPredicate):
+        original = predicate_class.candidates
+        monkeypatch.setattr(predicate_class, "candidates",
+                            lambda self, *args, original=original: called.append(type(self)) or original(self, *args))
+
+    plan = build_plan({"is_palindrome": False, "word_count": 4})
+    keys = plan.candidates(index, records)
+
+    assert called == [WordCountPredicate], "the common palindrome filter drove the lookup"
+    assert keys == scan(records, lambda record: not record.is_palindrome and record.word_count == 4)
+
+
+def test_all_stops_when_a_predicate_matches_nothing(monkeypatch):
+    index, records = indexed(VALUES)
+    monkeypatch.setattr(ContainsSubstringPredicate, "candidates", lambda *args: pytest.fail("substring was scanned"))
+    monkeypatch.setattr(ContainsSubstringPredicate, "narrow", lambda *args: pytest.fail("substring was scanned"))
+
+    assert build_plan({"word_count": 7, "contains": "value"}).candidates(index, records) == set()
+
+
+def test_any_unites_and_all_intersects():
+    index, records = indexed(VALUES)
+    filters = {"is_palindrome": True, "word_count": 3}
+
+    either = build_plan(filters, "any").candidates(index, records)
+    both = build_plan(filters, "all").candidates(index, records)
+
+    assert either == scan(records, lambda record: record.is_palindrome or record.word_count == 3)
+    assert both == scan(records, lambda record: record.is_palindrome and record.word_count == 3)
+    assert both < either
+
+
+def test_length_bounds_stay_separate_under_any():
+    index, records = indexed(VALUES)
+    filters = {"min_length": 20, "max_length": 5}
+
+    assert build_plan(filters, "all").candidates(index, records) == set()
+    assert build_plan(filters, "any").candidates(index, records) == scan(
+        records, lambda record: record.length >= 20 or record.length <= 5)
+
+
+def test_memory_and_sqlite_stores_return_the_same_keys(tmp_path):
+    records = [StringFactory(value).create_record() for value in VALUES]
+    memory = LocalDataStore(4)
+    sqlite = SQLiteDataStore(str(tmp_path / "strings.sqlite3"))
+
+    async def scenario():
+        await memory.commit_many(records)
+        await sqlite.commit_many(records)
+        for filters in QUERIES:
+            for match in ("all", "any"):
+                plan = build_plan(filters, match)
+                expected = {record.digest for record in records if plan.matches(record)}
+                assert await memory.query_keys(plan) == expected, f"memory {match} {filters}"
+                assert await sqlite.query_keys(plan) == expected, f"sqlite {match} {filters}"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        sqlite.close()
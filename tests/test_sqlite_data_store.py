@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from collections import Counter
+
+from src.query_planner import build_plan
+from src.sqlite_data_store import SQLiteDataStore
+from src.store_stats import StoreStats
+from src.string_factory import StringFactory
+
+
+def make_record(value: str):
+    return StringFactory(value).create_record()
+
+
+def test_async_calls_run_off_the_event_loop(tmp_path, monkeypatch):
+    store = SQLiteDataStore(str(tmp_path / "strings.sqlite3"), threads=2)
+    record = make_record("sqlite value")
+    threads = set()
+    connection = store._connection
+
+    def recording_connection():
+        threads.add(threading.current_thread().name)
+        return connection()
+
+    monkeypatch.setattr(store, "_connection", recording_connection)
+
+    async def scenario():
+        loop_thread = threading.current_thread().name
+        assert await store.commit_to_db(record.digest, record) is False
+        assert await store.commit_many([record]) == [True]
+        assert await store.count() == 1
+        found = await store.retrieve_from_db(record.digest)
+        assert found.value == "sqlite value"
+        assert await store.mexists([record.digest, b"\0" * 32]) == [True, False]
+        assert await store.delete_from_db(record.digest) is True
+        return loop_thread
+
+    loop_thread = asyncio.run(scenario())
+    store.close()
+    assert threads and loop_thread not in threads
+    assert all(name.startswith("sqlite-store") for name in threads)
+
+
+def test_close_closes_the_connections_of_every_thread(tmp_path):
+    store = SQLiteDataStore(str(tmp_path / "strings.sqlite3"))
+
+    async def scenario():
+        await asyncio.gather(*(store.retrieve_from_db(bytes([number]) * 32) for number in range(8)))
+
+    asyncio.run(scenario())
+    assert store._connections
+    store.close()
+    assert store._connections == [] and store._pool is None
+    # The store reopens on the next call
+    assert asyncio.run(store.retrieve_from_db(b"\0" * 32)) is None
+    store.close()
+
+
+def scanned_stats(records) -> dict:
+    stats = StoreStats()
+    for record in records:
+        stats.add(record.digest, record)
+    return stats.to_payload(top=0)
+
+
+def test_stats_counters_follow_inserts_and_deletes(tmp_path):
+    store = SQLiteDataStore(str(tmp_path / "strings.sqlite3"))
+    records = [make_record(value) for value in ("level", "two words", "Kayak", "a longer string of text", "ñandú")]
+
+    async def scenario():
+        await store.commit_many(records[:3])
+        await store.commit_to_db(records[3].digest, records[3])
+        await store.commit_many(records[3:])
+        assert await store.delete_from_db(records[0].digest) is True
+        assert await store.mdelete([records[1].digest, records[1].digest, b"\0" * 32]) == [True, False, False]
+        return await store.stats()
+
+    live = asyncio.run(scenario())
+    store.close()
+    assert live.to_payload(top=0) == scanned_stats(records[2:])
+    assert live.characters == Counter("".join(record.value for record in records[2:]))
+
+
+def test_concurrent_deletes_remove_and_count_each_row_once(tmp_path):
+    path = str(tmp_path / "strings.sqlite3")
+    # Two stores on one file stand for two workers, each with its own thread pool
+    stores = [SQLiteDataStore(path, threads=4) for _ in range(2)]
+    records = [make_record(f"deleted concurrently {number}") for number in range(200)]
+    asyncio.run(stores[0].commit_many(records))
+    digests = [record.digest for record in records]
+
+    async def delete_everything(store):
+        single = await asyncio.gather(*(store.delete_from_db(digest) for digest in digests[::2]))
+        return list(single) + await store.mdelete(digests[1::2])
+
+    async def scenario():
+        return await asyncio.gather(*(delete_everything(store) for store in stores))
+
+    reported = asyncio.run(scenario())
+    stats = asyncio.run(stores[0].stats()).to_payload(top=0)
+    for store in stores:
+        store.close()
+    # Each row is reported deleted by exactly one of the two stores
+    assert [first + second for first, second in zip(*reported)] == [1] * len(digests)
+    assert stats["total_strings"] == 0 and stats["total_characters"] == 0 and stats["distinct_characters"] == 0
+
+
+def test_out_of_range_integer_filters_match_like_the_memory_store(tmp_path):
+    store = SQLiteDataStore(str(tmp_path / "strings.sqlite3"))
+    records = [make_record(value) for value in ("short", "a longer value")]
+    asyncio.run(store.commit_many(records))
+    huge = 10 ** 20
+
+    def query(filters):
+        return asyncio.run(store.query_keys(build_plan(filters)))
+
+    assert query({"min_length": huge}) == set()
+    assert query({"max_length": huge}) == {record.digest for record in records}
+    assert query({"min_length": -huge, "max_length": 5}) == {records[0].digest}
+    assert query({"word_count": huge}) == set()
+    store.close()
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+import src.startup as startup
+
+
+@pytest.fixture
+def warmup(monkeypatch):
+    state = startup.WarmupState()
+    monkeypatch.setattr(startup, "WARMUP", state)
+    ready_while_warming = []
+    monkeypatch.setattr(startup.DB_INSTANCE_POOL, "warm_indexes",
+                        lambda: ready_while_warming.append(state.ready.is_set()))
+    return state, ready_while_warming
+
+
+def test_background_warmup_is_ready_only_after_the_indexes_are_built(warmup):
+    state, ready_while_warming = warmup
+    startup._warm_up_in_background()
+    assert ready_while_warming == [False]
+    assert state.ready.is_set()
+
+
+def test_blocking_warmup_builds_the_indexes_before_serving(warmup, monkeypatch):
+    state, ready_while_warming = warmup
+    monkeypatch.setattr(startup, "STORE_WARMUP", "blocking")
+    monkeypatch.setattr(startup, "close_store", lambda: None)
+
+    async def start():
+        async with startup.lifespan(None):
+            assert state.ready.is_set()
+
+    asyncio.run(start())
+    assert ready_while_warming == [False]
@@ -0,0 +1,90 @@
+import main
+import pytest
+from fastapi.testclient import TestClient
+
+from src import batch_ingest, bulk_access, create_string, stream_ingest, string_factory
+from src.local_data_store import LocalDataStore
+from src.sqlite_data_store import SQLiteDataStore
+from src.store_stats import StoreStats
+from src.string_factory import StringFactory
+
+client = TestClient(main.app)
+
+VALUES = ["level", "two words", "Racecar", "a longer string of five words", "x", "noon at noon", "zz"]
+DELETED = ["two words", "Racecar", "x"]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        store = LocalDataStore(4)
+    else:
+        store = SQLiteDataStore(str(tmp_path / "strings.sqlite3"))
+    for module in (main, create_string, string_factory, bulk_access, batch_ingest, stream_ingest):
+        monkeypatch.setattr(module, "DB_INSTANCE_POOL", store)
+    yield store
+    if request.param == "sqlite":
+        store.close()
+
+
+def stats_payload(store) -> dict:
+    if isinstance(store, LocalDataStore):
+        # Character counts trail the writes by the indexer's backlog
+        store.warm_indexes()
+    response = client.get("/strings/stats", params={"top": 100})
+    assert response.status_code == 200
+    return comparable(response.json())
+
+
+def comparable(payload: dict) -> dict:
+    # Characters with equal counts may come in any order
+    characters = payload.pop("most_common_characters")
+    payload["characters"] = {item["character"]: item["count"] for item in characters}
+    return payload
+
+
+def recount(values: list) -> dict:
+    stats = StoreStats()
+    records = [StringFactory(value).create_record() for value in values]
+    stats.add_many((record.digest, record) for record in records)
+    return comparable(stats.to_payload(100))
+
+
+def test_an_empty_store_reports_zeros(store):
+    payload = stats_payload(store)
+
+    assert payload == recount([])
+    assert payload["total_strings"] == 0 and payload["average_length"] == 0.0
+
+
+def test_stats_follow_inserts_and_deletes(store):
+    for value in VALUES:
+        assert client.post("/strings", json={"value": value}).status_code == 201
+    assert stats_payload(store) == recount(VALUES)
+
+    for value in DELETED:
+        assert client.delete(f"/strings/{value}").status_code == 204
+    remaining = [value for value in VALUES if value not in DELETED]
+    payload = stats_payload(store)
+
+    assert payload == recount(remaining)
+    assert payload["total_strings"] == 4
+    assert payload["palindromes"] == 2
+    assert set(payload["characters"]) == set("".join(remaining).lower())
+
+    # A second delete of the same string changes nothing
+    assert client.delete("/strings/level").status_code == 204
+    assert client.delete("/strings/level").status_code == 404
+    assert stats_payload(store) == recount([value for value in remaining if value != "level"])
+
+
+def test_batch_and_bulk_writes_are_counted(store):
+    assert client.post("/strings/batch", json=VALUES).status_code == 200
+    assert client.post("/strings/delete", json=DELETED).json()["deleted"] == len(DELETED)
+
+    assert stats_payload(store) == recount([value for value in VALUES if value not in DELETED])
+
+
+def test_negative_top_is_rejected(store):
+    assert client.get("/strings/stats", params={"top": -1}).status_code == 400
+    assert client.get("/strings/stats", params={"top": "ten"}).status_code == 400
@@ -0,0 +1,69 @@
+import hashlib
+import random
+from collections import Counter
+
+import pytest
+
+import src.string_analysis as string_analysis
+from src.string_analysis import StreamingAnalyzer, analyze_string, count_characters
+
+# Mixed scripts, combining marks, astral characters and Unicode whitespace
+UNICODE_ALPHABET = "abcxyz \t\n  　éßσςİ̇中文\U0001f600\U0001d400"
+
+
+def unicode_strings(count: int, max_length: int = 30, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    values = []
+    for _ in range(count):
+        value = "".join(rng.choice(UNICODE_ALPHABET) for _ in range(rng.randint(0, max_length)))
+        if rng.random() < 0.2:
+            value += value[::-1]
+        values.append(value.lower())
+    return values
+
+
+def expected_properties(value: str) -> tuple:
+    return (
+        value,
+        hashlib.sha256(value.encode("utf-8")).digest(),
+        len(value),
+        value == value[::-1],
+        len(set(value)),
+        len(value.split()),
+    )
+
+
+def properties(analysis) -> tuple:
+    return tuple(getattr(analysis, field) for field in string_analysis.StringAnalysis.__slots__)
+
+
+@pytest.fixture
+def small_slices(monkeypatch):
+    # Forces the slice by slice code paths on short strings
+    monkeypatch.setattr(string_analysis, "SLICE_SIZE", 7)
+    monkeypatch.setattr(string_analysis, "WORD_COUNT_CHUNK_SIZE", 5)
+
+
+@pytest.mark.parametrize("sliced", [False, True])
+def test_analyze_string_matches_the_definitions(request, sliced):
+    if sliced:
+        request.getfixturevalue("small_slices")
+    for value in unicode_strings(2000) + ["", " ", "a", "aa", "ab a", "  two  words  "]:
+        assert properties(analyze_string(value)) == expected_properties(value), repr(value)
+
+
+def test_count_characters_matches_counter():
+    for value in unicode_strings(500) + ["".join(chr(code) for code in range(200, 400)) * 3]:
+        assert count_characters(value) == dict(Counter(value))
+
+
+@pytest.mark.parametrize("piece_size", [1, 3, 64])
+def test_streaming_analyzer_matches_analyze_string(small_slices, piece_size):
+    # Upper case sigmas lowercase differently at the end of a word
+    for value in unicode_strings(300, max_length=60) + ["ΟΔΟΣ ΣΑΣ ΣΣ", "wordΣ Σword Σ"]:
+        raw = value.upper().encode("utf-8")
+        analyzer = StreamingAnalyzer()
+        for start in range(0, len(raw), piece_size):
+            analyzer.feed(raw[start:start + piece_size])
+        lowered = value.upper().lower()
+        assert properties(analyzer.finish()) == expected_properties(lowered), repr(value)